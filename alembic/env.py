@@ -16,6 +16,7 @@ from sqlalchemy.ext.asyncio import AsyncEngine
 from app.config import settings
 from app.config.sqla.migrations import RendersMigrationType
 from app.config.sqla.models import Base
+from app.config.sqla.partitions import partition_parent
 
 model_paths = [
     *glob.glob(f"{settings.package_name}/models/*.py"),
@@ -87,6 +88,16 @@ def render_item(type_: str, obj: typing.Any, autogen_context: AutogenContext) ->
     return False
 
 
+def include_name(name: str | None, type_: str, parent_names: typing.Mapping[str, str | None]) -> bool:
+    """Skip partitions of partitioned tables, they are managed by migrations and the retention job."""
+    if type_ == "table" and name and name not in target_metadata.tables:
+        parent = partition_parent(name)
+        table = target_metadata.tables.get(parent or "")
+        if table is not None and table.dialect_options["postgresql"]["partition_by"]:
+            return False
+    return True
+
+
 def run_migrations_offline() -> None:
     """
     Run migrations in 'offline' mode.
@@ -105,6 +116,7 @@ def run_migrations_offline() -> None:
         compare_type=True,
         compare_server_default=True,
         render_item=render_item,
+        include_name=include_name,
         process_revision_directives=process_revision_directives,
     )
 
@@ -120,6 +132,7 @@ def do_run_migrations(connection: Connection) -> None:
         compare_type=True,
         compare_server_default=True,
         render_item=render_item,
+        include_name=include_name,
         include_object=None,
         process_revision_directives=process_revision_directives,
     )
@@ -0,0 +1,50 @@
+"""query_indexes
+
+Revision ID: 6d1f0b3a9c47
+Revises: f8c22076a12f
+Create Date: 2026-10-19 16:20:41.512034
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "6d1f0b3a9c47"
+down_revision = "f8c22076a12f"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # build indexes without locking tables for writes, CONCURRENTLY cannot run inside a transaction
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "users_email_lower_idx",
+            "users",
+            [sa.text("lower(email)")],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "team_members_active_user_id_idx",
+            "team_members",
+            ["user_id"],
+            postgresql_where=sa.text("suspended_at IS NULL AND NOT is_service"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+        op.create_index(
+            "team_invites_token_idx",
+            "team_invites",
+            ["token"],
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index("team_invites_token_idx", table_name="team_invites", postgresql_concurrently=True)
+        op.drop_index("team_members_active_user_id_idx", table_name="team_members", postgresql_concurrently=True)
+        op.drop_index("users_email_lower_idx", table_name="users", postgresql_concurrently=True)
@@ -0,0 +1,26 @@
+"""subscription_price
+
+Revision ID: 3b9e57c1d2a8
+Revises: 6d1f0b3a9c47
+Create Date: 2026-10-19 17:05:12.734219
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "3b9e57c1d2a8"
+down_revision = "6d1f0b3a9c47"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("subscriptions", sa.Column("price_cents", sa.BigInteger(), server_default="0", nullable=False))
+    op.add_column("subscriptions", sa.Column("price_currency", sa.Text(), server_default="usd", nullable=False))
+
+
+def downgrade() -> None:
+    op.drop_column("subscriptions", "price_currency")
+    op.drop_column("subscriptions", "price_cents")
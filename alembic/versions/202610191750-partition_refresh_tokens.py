@@ -0,0 +1,88 @@
+"""partition_refresh_tokens
+
+Revision ID: 8a4c2e6f1b93
+Revises: 3b9e57c1d2a8
+Create Date: 2026-10-19 17:50:08.125904
+
+"""
+
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+from app.config.sqla.partitions import create_default_partition_ddl, create_partition_ddl, months_between
+
+# revision identifiers, used by Alembic.
+revision = "8a4c2e6f1b93"
+down_revision = "3b9e57c1d2a8"
+branch_labels = None
+depends_on = None
+
+# tokens live 30 days by default, the retention job creates later partitions
+_PREMADE_MONTHS = datetime.timedelta(days=62)
+
+
+def upgrade() -> None:
+    # a regular table cannot be turned into a partitioned one, create a new table and copy live tokens
+    op.rename_table("refresh_tokens", "refresh_tokens_old")
+    op.execute("ALTER TABLE refresh_tokens_old RENAME CONSTRAINT refresh_tokens_pkey TO refresh_tokens_old_pkey")
+    op.execute("ALTER INDEX refresh_tokens_jit_udx RENAME TO refresh_tokens_old_jit_udx")
+
+    op.create_table(
+        "refresh_tokens",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("jit", sa.String(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id", "expires_at"),
+        postgresql_partition_by="RANGE (expires_at)",
+    )
+    op.create_index("refresh_tokens_jit_udx", "refresh_tokens", ["jit", "expires_at"], unique=True)
+
+    now = datetime.datetime.now(datetime.UTC)
+    for month in months_between(now, now + _PREMADE_MONTHS):
+        op.execute(create_partition_ddl("refresh_tokens", month))
+    op.execute(create_default_partition_ddl("refresh_tokens"))
+
+    op.execute(
+        "INSERT INTO refresh_tokens (id, jit, expires_at, created_at, user_id) "
+        "SELECT id, jit, expires_at, created_at, user_id FROM refresh_tokens_old WHERE expires_at > now()"
+    )
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('refresh_tokens', 'id'), "
+        "(SELECT coalesce(max(id), 0) + 1 FROM refresh_tokens_old), false)"
+    )
+    op.drop_table("refresh_tokens_old")
+
+
+def downgrade() -> None:
+    op.rename_table("refresh_tokens", "refresh_tokens_partitioned")
+    op.execute(
+        "ALTER TABLE refresh_tokens_partitioned RENAME CONSTRAINT refresh_tokens_pkey TO refresh_tokens_partitioned_pkey"
+    )
+    op.execute("ALTER INDEX refresh_tokens_jit_udx RENAME TO refresh_tokens_partitioned_jit_udx")
+
+    op.create_table(
+        "refresh_tokens",
+        sa.Column("id", sa.BigInteger(), autoincrement=True, nullable=False),
+        sa.Column("jit", sa.String(), nullable=False),
+        sa.Column("expires_at", sa.DateTime(timezone=True), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.ForeignKeyConstraint(["user_id"], ["users.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("refresh_tokens_jit_udx", "refresh_tokens", ["jit"], unique=True)
+    op.execute(
+        "INSERT INTO refresh_tokens (id, jit, expires_at, created_at, user_id) "
+        "SELECT id, jit, expires_at, created_at, user_id FROM refresh_tokens_partitioned"
+    )
+    op.execute(
+        "SELECT setval(pg_get_serial_sequence('refresh_tokens', 'id'), "
+        "(SELECT coalesce(max(id), 0) + 1 FROM refresh_tokens_partitioned), false)"
+    )
+    # dropping the parent drops all partitions
+    op.drop_table("refresh_tokens_partitioned")
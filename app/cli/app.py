@@ -1,5 +1,6 @@
 import click
 
+from app.cli.db import db_group
 from app.cli.locale import locale_group
 from app.cli.mails import mails_group
 from app.cli.queue import queue_group
@@ -7,6 +8,7 @@ from app.cli.settings import settings_group
 from app.cli.stripe import stripe_group
 
 console_app = click.Group()
+console_app.add_command(db_group)
 console_app.add_command(locale_group)
 console_app.add_command(mails_group)
 console_app.add_command(settings_group)
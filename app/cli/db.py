@@ -0,0 +1,188 @@
+import json
+import time
+import typing
+
+import anyio
+import click
+import sqlalchemy as sa
+from rich import box
+from rich.table import Table
+from sqlalchemy.dialects.postgresql import psycopg
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import joinedload
+
+from app.cli.console import console
+from app.config.database import new_dbsession
+from app.contexts.auth.models import RefreshToken
+from app.contexts.auth.repos import RefreshTokenRepo
+from app.contexts.billing.models import Subscription
+from app.contexts.billing.repo import SubscriptionRepo
+from app.contexts.teams.repo import TeamRepo
+from app.contexts.users.models import User
+from app.contexts.users.repo import UserRepo
+from app.contrib.replicas import use_primary
+
+db_group = click.Group("db", help="Database commands")
+
+_StatementFactory = typing.Callable[[], sa.ClauseElement]
+
+
+def _hot_statements() -> dict[str, tuple[_StatementFactory, _StatementFactory]]:
+    """Plain and lambda versions of the repository hot lookups."""
+    jit, email, team_id = "jit", "user@example.com", 1
+    return {
+        "RefreshTokenRepo.find_by_jit": (
+            lambda: sa.select(RefreshToken).where(RefreshToken.jit == jit),
+            lambda: sa.lambda_stmt(lambda: sa.select(RefreshToken).where(RefreshToken.jit == jit)),
+        ),
+        "UserRepo.find_by_email": (
+            lambda: sa.select(User).where(User.deleted_at.is_(None), sa.func.lower(User.email) == email),
+            lambda: sa.lambda_stmt(
+                lambda: sa.select(User).where(User.deleted_at.is_(None), sa.func.lower(User.email) == email)
+            ),
+        ),
+        "SubscriptionRepo.get_team_subscription": (
+            lambda: (
+                sa.select(Subscription).where(Subscription.team_id == team_id).options(joinedload(Subscription.plan))
+            ),
+            lambda: sa.lambda_stmt(
+                lambda: (
+                    sa.select(Subscription)
+                    .where(Subscription.team_id == team_id)
+                    .options(joinedload(Subscription.plan))
+                )
+            ),
+        ),
+    }
+
+
+def _generate_cache_key(statement: sa.ClauseElement) -> object:
+    """Build the key SQLAlchemy looks compiled statements up by."""
+    return statement._generate_cache_key()
+
+
+def _measure(callback: typing.Callable[[], object], iterations: int) -> float:
+    """Return mean duration of a call in microseconds."""
+    started_at = time.perf_counter()
+    for _ in range(iterations):
+        callback()
+    return (time.perf_counter() - started_at) / iterations * 1_000_000
+
+
+@db_group.command("benchmark-statements")
+@click.option("--iterations", default=10_000, show_default=True, help="Calls per measurement.")
+def benchmark_statements_command(iterations: int) -> None:
+    """Measure per call cost of hot repository statements before they reach the database.
+
+    "compile" is what every call would cost without SQLAlchemy compiled cache,
+    "plain" is building a select() and its cache key (a compiled cache hit),
+    "lambda" is the cache key lookup of a lambda statement."""
+    dialect = psycopg.dialect()  # type: ignore[no-untyped-call]
+    table = Table(box=box.MINIMAL)
+    table.add_column("Statement")
+    table.add_column("compile, µs", justify="right")
+    table.add_column("plain, µs", justify="right")
+    table.add_column("lambda, µs", justify="right")
+    table.add_column("saved per call, µs", justify="right")
+
+    for name, (plain, cached) in _hot_statements().items():
+        compile_time = _measure(lambda: plain().compile(dialect=dialect), iterations)
+        plain_time = _measure(lambda: _generate_cache_key(plain()), iterations)  # noqa: B023
+        lambda_time = _measure(lambda: _generate_cache_key(cached()), iterations)  # noqa: B023
+        table.add_row(
+            name,
+            f"{compile_time:.1f}",
+            f"{plain_time:.1f}",
+            f"{lambda_time:.1f}",
+            f"{plain_time - lambda_time:.1f}",
+        )
+
+    console.print(table)
+
+
+# repository calls checked by "db explain", arguments do not need to match existing rows
+_explained_calls: dict[str, typing.Callable[[AsyncSession], typing.Awaitable[typing.Any]]] = {
+    "UserRepo.find_by_email": lambda s: UserRepo(s).find_by_email("user@example.com"),
+    "RefreshTokenRepo.find_by_jit": lambda s: RefreshTokenRepo(s).find_by_jit("jit"),
+    "SubscriptionRepo.get_team_subscription": lambda s: SubscriptionRepo(s).get_team_subscription(1),
+    "TeamRepo.get_active_memberships": lambda s: TeamRepo(s).get_active_memberships(1),
+    "TeamRepo.get_team_member": lambda s: TeamRepo(s).get_team_member(1, 1),
+    "TeamRepo.get_team_members_by_cursor": lambda s: TeamRepo(s).get_team_members_by_cursor(1),
+    "TeamRepo.get_invites_by_cursor": lambda s: TeamRepo(s).get_invites_by_cursor(1),
+    "TeamRepo.get_invitation_by_token": lambda s: TeamRepo(s).get_invitation_by_token("token"),
+    "TeamRepo.get_roles": lambda s: TeamRepo(s).get_roles(1),
+}
+
+
+def _find_seq_scans(plan: dict[str, typing.Any]) -> list[str]:
+    relations = [plan["Relation Name"]] if plan["Node Type"] == "Seq Scan" else []
+    for child in plan.get("Plans", []):
+        relations.extend(_find_seq_scans(child))
+    return relations
+
+
+async def _explain_call(
+    dbsession: AsyncSession, call: typing.Callable[[AsyncSession], typing.Awaitable[typing.Any]]
+) -> list[tuple[str, list[str]]]:
+    """Run the repository call, then EXPLAIN every SELECT it issued.
+    Returns statements with tables they scan sequentially."""
+    connection = await dbsession.connection()
+    # planner falls back to a sequential scan only when no index can serve the query,
+    # regardless of table size, so the check works on an empty database too
+    await connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+
+    statements: list[tuple[str, typing.Any]] = []
+
+    def capture(
+        conn: sa.Connection, cursor: typing.Any, statement: str, parameters: typing.Any, *args: typing.Any
+    ) -> None:
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    sa.event.listen(connection.sync_connection, "before_cursor_execute", capture)
+    try:
+        await call(dbsession)
+    finally:
+        sa.event.remove(connection.sync_connection, "before_cursor_execute", capture)
+
+    results = []
+    for statement, parameters in statements:
+        result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+        plan = result.scalar_one()
+        if isinstance(plan, str | bytes):
+            plan = json.loads(plan)
+        results.append((statement, _find_seq_scans(plan[0]["Plan"])))
+    return results
+
+
+@db_group.command("explain")
+@click.option("--verbose", is_flag=True, help="Print statements.")
+def explain_command(verbose: bool) -> None:  # noqa: FBT001
+    """EXPLAIN queries of repository methods and report sequential scans.
+    Exits with code 1 when any query scans a table sequentially. Requires migrated database."""
+
+    async def main() -> int:
+        table = Table(box=box.MINIMAL)
+        table.add_column("Repository call")
+        table.add_column("Statements", justify="right")
+        table.add_column("Sequential scans")
+
+        failures = 0
+        for name, call in _explained_calls.items():
+            async with new_dbsession() as dbsession:
+                with use_primary():
+                    results = await _explain_call(dbsession, call)
+                await dbsession.rollback()
+
+            seq_scans = sorted({relation for _, relation_list in results for relation in relation_list})
+            failures += bool(seq_scans)
+            table.add_row(name, str(len(results)), f"[red]{', '.join(seq_scans)}[/red]" if seq_scans else "-")
+            if verbose:
+                for statement, _ in results:
+                    console.print(statement, style="dim")
+
+        console.print(table)
+        return failures
+
+    if anyio.run(main):
+        raise click.ClickException("Some queries scan tables sequentially.")
@@ -1,34 +1,91 @@
-import multiprocessing
+import asyncio
+import functools
+import os
 
 import anyio
 import click
-from saq.worker import start
+import prometheus_client
+from rich import box
+from rich.table import Table
 
+from app.cli.console import console
 from app.config import settings
-from app.config.queues import debug_task, task_queue
-from redis.exceptions import ConnectionError
+from app.config.cron import scheduler
+from app.config.queues import debug_task, outbox_relay, task_queue, worker_settings
+from app.contrib.autoscaling import AutoscalingWorker
+from app.contrib.prefork import Supervisor
+from app.contrib.queues import serve_workers
 
 queue_group = click.Group(name="queue", help="Worker queue.")
 
 
+def _run_workers(
+    slot: int, *, queue_names: list[str], web_port: int | None, max_jobs: int | None, metrics_port: int | None
+) -> None:
+    if metrics_port:
+        prometheus_client.start_http_server(metrics_port + slot)
+    workers = [AutoscalingWorker(**worker_settings[name]) for name in queue_names]
+    # only the first process serves the web UI, others would fail to bind the port
+    asyncio.run(serve_workers(workers, web_port=web_port if slot == 0 else None, max_jobs=max_jobs))
+
+
 @queue_group.command("worker")
-@click.option("--workers", "-w", default=1, help="Number of workers.")
+@click.option("--workers", "-w", default=1, help="Number of worker processes, 0 starts one per CPU core.")
+@click.option(
+    "--queue",
+    "-q",
+    "queues",
+    multiple=True,
+    type=click.Choice(list(worker_settings)),
+    help="Queue to consume, repeat to consume several. Consumes all queues by default.",
+)
 @click.option("--web", is_flag=True, help="Start the web server.")
 @click.option("--web-port", default=5001, type=int, help="Port for the web server.")
-def start_queue_command(web: bool, workers: int, web_port: int) -> None:
-    settings_attr = "{package}.config.queues.queue_settings".format(package=settings.package_name)
-    if workers > 1:
-        for _ in range(workers - 1):
-            p = multiprocessing.Process(target=start, args=(settings_attr,))
-            p.start()
+@click.option(
+    "--max-jobs",
+    default=settings.task_worker_max_jobs,
+    type=int,
+    help="Replace a worker process after it processed this many jobs, 0 disables.",
+)
+@click.option(
+    "--max-rss",
+    default=settings.task_worker_max_rss_mb,
+    type=int,
+    help="Replace a worker process using more private memory, in MiB, 0 disables.",
+)
+@click.option(
+    "--metrics-port",
+    default=settings.task_worker_metrics_port,
+    type=int,
+    help="Serve Prometheus metrics, worker process N listens on this port + N. 0 disables.",
+)
+def start_queue_command(
+    web: bool, workers: int, queues: tuple[str, ...], web_port: int, max_jobs: int, max_rss: int, metrics_port: int
+) -> None:
+    """Start supervised worker processes.
+    Processes are forked from this one, which imports the application once, and restarted when they crash."""
+    target = functools.partial(
+        _run_workers,
+        queue_names=list(queues or worker_settings),
+        web_port=web_port if web else None,
+        max_jobs=max_jobs or None,
+        metrics_port=metrics_port or None,
+    )
+    supervisor = Supervisor(
+        target,
+        processes=workers or os.cpu_count() or 1,
+        max_rss=max_rss * 2**20 if max_rss else None,
+        shutdown_timeout=settings.task_worker_shutdown_timeout.total_seconds(),
+    )
+    supervisor.run()
+
+
+@queue_group.command("relay")
+def relay_outbox_command() -> None:
+    """Move event outbox messages to the task queue until interrupted."""
     try:
-        start(
-            settings_attr,
-            web=web,
-            port=web_port,
-            extra_web_settings=[],
-        )
-    except (KeyboardInterrupt, ConnectionError):
+        anyio.run(outbox_relay.run)
+    except KeyboardInterrupt:
         pass
 
 
@@ -41,3 +98,33 @@ def test_queue_command() -> None:
         click.echo(f"Task enqueued: {job.id}")
 
     anyio.run(main)
+
+
+@queue_group.command("crons")
+@click.option("--runs", default=1, show_default=True, help="Recent runs to show per job.")
+def list_crons_command(runs: int) -> None:
+    """List scheduled jobs with their recent runs."""
+
+    async def main() -> None:
+        table = Table(box=box.MINIMAL)
+        table.add_column("Job")
+        table.add_column("Schedule")
+        table.add_column("Started at")
+        table.add_column("Status")
+        table.add_column("Duration, s", justify="right")
+        table.add_column("Host")
+        for job in scheduler.jobs.values():
+            schedule = job.cron if job.enabled else f"{job.cron} (disabled)"
+            history = await scheduler.history(job.name, limit=runs)
+            if not history:
+                table.add_row(job.name, schedule, "-", "-", "-", "-")
+            for run in history:
+                status = {"ok": "[green]ok[/green]", "failed": f"[red]failed[/red] {run.error}"}.get(
+                    run.status, run.status
+                )
+                table.add_row(
+                    job.name, schedule, f"{run.started_at:%Y-%m-%d %H:%M:%S}", status, f"{run.duration:.2f}", run.host
+                )
+        console.print(table)
+
+    anyio.run(main)
@@ -0,0 +1,22 @@
+"""Scheduled jobs. They run in the low priority queue, see app.config.queues."""
+
+import datetime
+
+from app.config import settings
+from app.config.redis import redis
+from app.contexts.auth.retention import delete_expired_refresh_tokens, rotate_refresh_token_partitions
+from app.contexts.teams.retention import delete_expired_invites
+from app.contexts.users.sign_ins import flush_sign_ins
+from app.contrib.cron import CronRegistry
+
+__all__ = ["scheduler"]
+
+scheduler = CronRegistry(redis, namespace=f"{settings.app_slug}:cron", history_size=settings.cron_history_size)
+
+# runs every minute, a run is short and must not overlap the next one
+scheduler.add(flush_sign_ins, settings.users_sign_in_flush_cron, lock_ttl=datetime.timedelta(minutes=1))
+
+# data retention
+scheduler.add(rotate_refresh_token_partitions, settings.retention_cron, jitter=settings.cron_jitter)
+scheduler.add(delete_expired_refresh_tokens, settings.retention_cron, jitter=settings.cron_jitter)
+scheduler.add(delete_expired_invites, settings.retention_cron, jitter=settings.cron_jitter)
@@ -1,18 +1,140 @@
 import contextlib
+import logging
+import time
 import typing
 
-from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+import orjson
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_session, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import ORMExecuteState, Session
+from sqlalchemy.pool import AsyncAdaptedQueuePool, ConnectionPoolEntry, NullPool
 
 from app.config import settings
+from app.config.metrics import db_pool_wait_seconds, observe_pool
+from app.contrib.query_stats import install_query_stats
+from app.contrib.replicas import ReplicaSet, RoutingSession
 
-async_dbengine = create_async_engine(
-    settings.database_url,
-    echo_pool=True,
-    pool_size=20,
-    pool_timeout=10,
-    max_overflow=50,
+logger = logging.getLogger(__name__)
+
+_AFTER_COMMIT_KEY = "database.after_commit"
+
+
+class LazyLoadError(sa.exc.InvalidRequestError):
+    """Raised by StrictSession when a relationship is loaded implicitly."""
+
+
+class StrictSession(RoutingSession):
+    """Session that refuses implicit lazy loads.
+    Every relationship must be loaded by the query (see loader options), otherwise LazyLoadError is raised."""
+
+
+@sa.event.listens_for(StrictSession, "do_orm_execute")
+def _forbid_lazy_loads(orm_execute_state: ORMExecuteState) -> None:
+    if not orm_execute_state.is_select:  # lazy_loaded_from raises for ORM insert, update and delete
+        return
+    if orm_execute_state.lazy_loaded_from is not None:
+        raise LazyLoadError(
+            "Lazy load on {instance} emits a query, load it eagerly with a loader option.".format(
+                instance=orm_execute_state.lazy_loaded_from.class_.__name__
+            )
+        )
+
+
+class AppSession(AsyncSession):
+    """Async session awaiting callbacks registered with `call_after_commit` once it commits."""
+
+    async def commit(self) -> None:
+        await super().commit()
+        for callback in self.sync_session.info.pop(_AFTER_COMMIT_KEY, []):
+            try:
+                await callback()
+            except Exception:  # the transaction is committed already, the caller must not see it as failed
+                logger.exception("After commit callback failed.")
+
+
+def call_after_commit(session: Session, callback: typing.Callable[[], typing.Awaitable[typing.Any]]) -> bool:
+    """Have the AppSession driving `session` await the callback when the current commit completes.
+    For synchronous session hooks, which cannot await themselves.
+    Returns False when no AppSession drives the session, the callback then never runs."""
+    if not isinstance(async_session(session), AppSession):
+        return False
+    session.info.setdefault(_AFTER_COMMIT_KEY, []).append(callback)
+    return True
+
+
+class MeteredQueuePool(AsyncAdaptedQueuePool):
+    """Queue pool that records how long checkouts wait for a free connection
+    and exports its state when connections are checked out or returned."""
+
+    def _do_get(self) -> ConnectionPoolEntry:
+        started_at = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            db_pool_wait_seconds.labels(self.logging_name).observe(time.perf_counter() - started_at)
+            observe_pool(self)
+
+    def _do_return_conn(self, record: ConnectionPoolEntry) -> None:
+        super()._do_return_conn(record)
+        observe_pool(self)
+
+
+def create_dbengine(url: str, name: str) -> AsyncEngine:
+    connect_args: dict[str, typing.Any] = {"prepare_threshold": settings.database_prepare_threshold}
+    pool_args: dict[str, typing.Any] = {
+        "poolclass": MeteredQueuePool,
+        "pool_logging_name": name,
+        "pool_size": settings.database_pool_size,
+        "max_overflow": settings.database_pool_max_overflow,
+        "pool_timeout": settings.database_pool_timeout.total_seconds(),
+        "pool_recycle": int(settings.database_pool_recycle.total_seconds()),
+        "pool_pre_ping": settings.database_pool_pre_ping,
+    }
+    if settings.database_pgbouncer:
+        # PgBouncer pools server connections and may run every transaction on a different one,
+        # statements prepared on one server connection do not exist on the others
+        connect_args = {"prepare_threshold": None}
+        pool_args = {"poolclass": NullPool}
+
+    engine = create_async_engine(
+        url,
+        echo=settings.sqlalchemy_echo,
+        query_cache_size=settings.database_compiled_cache_size,
+        # registered as the psycopg JSON loader, orjson parses the raw bytes without decoding them to str first
+        json_deserializer=orjson.loads,
+        connect_args=connect_args,
+        **pool_args,
+    )
+    if isinstance(engine.pool, MeteredQueuePool):
+        observe_pool(engine.pool)
+
+    @sa.event.listens_for(engine.sync_engine, "connect")
+    def _configure_connection(dbapi_connection: typing.Any, connection_record: typing.Any) -> None:
+        driver_connection = getattr(dbapi_connection, "driver_connection", dbapi_connection)
+        if hasattr(driver_connection, "prepared_max"):
+            driver_connection.prepared_max = settings.database_prepared_statements_cache_size
+
+    install_query_stats(engine.sync_engine)
+    return engine
+
+
+async_dbengine = create_dbengine(settings.database_url, "primary")
+replica_set = (
+    ReplicaSet(
+        [create_dbengine(url, f"replica{index}") for index, url in enumerate(settings.database_replica_urls)],
+        max_lag=settings.database_replica_max_lag,
+        check_interval=settings.database_replica_check_interval,
+    )
+    if settings.database_replica_urls
+    else None
+)
+async_dbsession = async_sessionmaker(
+    async_dbengine,
+    class_=AppSession,
+    expire_on_commit=False,
+    sync_session_class=StrictSession if settings.sqlalchemy_raise_on_lazy_load else RoutingSession,
+    replicas=replica_set,
 )
-async_dbsession = async_sessionmaker(async_dbengine, expire_on_commit=False)
 
 
 @contextlib.asynccontextmanager
@@ -1,10 +1,15 @@
 from app import settings
+from app.config.metrics import observe_event_handler
 from app.contexts.auth.events import UserAuthenticated
+from app.contexts.outbox.models import OutboxMessage
 from app.contrib.events import EventDispatcher
 
 events = EventDispatcher(
     task_queue_url=settings.redis_url,
     sync=settings.debug or settings.is_test,
+    outbox=OutboxMessage,
+    fan_out=settings.events_fan_out,
+    on_handled=observe_event_handler,
     subscribers={
         UserAuthenticated: [],
     },
@@ -1 +1,124 @@
 """Define project metrics here."""
+
+import os
+
+from prometheus_client import CollectorRegistry, Counter, Gauge, Histogram, generate_latest, multiprocess
+from sqlalchemy.pool import QueuePool
+
+from app.contrib.autoscaling import ScalingDecision
+from app.contrib.query_stats import QueryStats
+
+db_statements = Histogram(
+    "db_statements",
+    "SQL statements executed per unit of work.",
+    ["kind", "name"],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 200),
+)
+db_duplicate_statements = Histogram(
+    "db_duplicate_statements",
+    "Repeated SQL statements (same SQL and parameters) per unit of work.",
+    ["kind", "name"],
+    buckets=(0, 1, 2, 5, 10, 20, 50),
+)
+db_time_seconds = Histogram(
+    "db_time_seconds",
+    "Time spent executing SQL statements per unit of work.",
+    ["kind", "name"],
+)
+
+
+def observe_query_stats(kind: str, name: str, stats: QueryStats) -> None:
+    """Record query stats of a request (kind="http") or a background job (kind="job")."""
+    db_statements.labels(kind, name).observe(stats.statements)
+    db_duplicate_statements.labels(kind, name).observe(stats.duplicates)
+    db_time_seconds.labels(kind, name).observe(stats.duration)
+
+
+# every process has its own pool, the multiprocess collector sums values of live processes
+db_pool_size = Gauge("db_pool_size", "Connection pool size.", ["engine"], multiprocess_mode="livesum")
+db_pool_checked_out = Gauge(
+    "db_pool_checked_out", "Connections checked out from the pool.", ["engine"], multiprocess_mode="livesum"
+)
+db_pool_overflow = Gauge(
+    "db_pool_overflow", "Connections opened above the pool size.", ["engine"], multiprocess_mode="livesum"
+)
+db_pool_wait_seconds = Histogram(
+    "db_pool_wait_seconds",
+    "Time spent waiting for a pool connection.",
+    ["engine"],
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10),
+)
+
+
+def observe_pool(pool: QueuePool) -> None:
+    """Export connection pool state, call it whenever a connection is checked out or returned."""
+    name = pool.logging_name or ""
+    db_pool_size.labels(name).set(pool.size())
+    db_pool_checked_out.labels(name).set(pool.checkedout())
+    db_pool_overflow.labels(name).set(max(pool.overflow(), 0))
+
+
+task_queue_concurrency = Gauge("task_queue_concurrency", "Jobs a worker processes at once.", ["queue"])
+task_queue_depth = Gauge("task_queue_depth", "Jobs waiting in the queue.", ["queue"])
+task_queue_oldest_job_age_seconds = Gauge(
+    "task_queue_oldest_job_age_seconds", "Time the oldest queued job has been waiting.", ["queue"]
+)
+task_queue_worker_cpu = Gauge("task_queue_worker_cpu", "Share of a CPU core used by a worker process.", ["queue"])
+task_queue_scaling_total = Counter(
+    "task_queue_scaling_total", "Worker concurrency changes by direction.", ["queue", "direction"]
+)
+
+
+def observe_scaling(decision: ScalingDecision) -> None:
+    """Export measurements and decisions of a worker autoscaler."""
+    task_queue_concurrency.labels(decision.queue).set(decision.concurrency)
+    task_queue_depth.labels(decision.queue).set(decision.depth)
+    task_queue_oldest_job_age_seconds.labels(decision.queue).set(decision.oldest_job_age)
+    task_queue_worker_cpu.labels(decision.queue).set(decision.cpu)
+    if decision.concurrency != decision.previous:
+        direction = "up" if decision.concurrency > decision.previous else "down"
+        task_queue_scaling_total.labels(decision.queue, direction).inc()
+
+
+task_job_wait_seconds = Histogram(
+    "task_job_wait_seconds",
+    "Time a job waited in the queue before a worker started it, retry delays included.",
+    ["queue", "task"],
+    buckets=(0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300, 900),
+)
+task_job_duration_seconds = Histogram("task_job_duration_seconds", "Job execution time.", ["queue", "task"])
+task_jobs_total = Counter(
+    "task_jobs_total", "Processed jobs by outcome: complete, failed, aborted or retried.", ["queue", "task", "outcome"]
+)
+
+
+def observe_job(queue: str, task: str, outcome: str, wait: float, duration: float) -> None:
+    task_job_wait_seconds.labels(queue, task).observe(wait)
+    task_job_duration_seconds.labels(queue, task).observe(duration)
+    task_jobs_total.labels(queue, task, outcome).inc()
+
+
+event_handler_duration_seconds = Histogram(
+    "event_handler_duration_seconds", "Event handler execution time.", ["event", "handler"]
+)
+event_handlers_total = Counter(
+    "event_handlers_total", "Event handler calls by outcome: ok or error.", ["event", "handler", "outcome"]
+)
+
+
+def observe_event_handler(event: str, handler: str, elapsed: float, error: BaseException | None) -> None:
+    event_handler_duration_seconds.labels(event, handler).observe(elapsed)
+    event_handlers_total.labels(event, handler, "error" if error else "ok").inc()
+
+
+def generate_metrics() -> bytes:
+    """Return metrics in the Prometheus text format.
+
+    Every process of a server running several processes has its own registry, a scrape would see one of them.
+    Point PROMETHEUS_MULTIPROC_DIR to a directory shared by the processes and emptied on startup,
+    metrics of all processes are then read from it."""
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return generate_latest()
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)  # type: ignore[no-untyped-call]
+    return generate_latest(registry)
@@ -18,3 +18,8 @@ def get_page_size(request: Request, param_name: str = "page_size") -> int:
     with contextlib.suppress(ValueError):
         return min(int(request.query_params.get(param_name, page_size)), page_size)
     return page_size
+
+
+def get_cursor(request: Request, param_name: str = "cursor") -> str | None:
+    """Get pagination cursor from request query params."""
+    return request.query_params.get(param_name) or None
@@ -9,6 +9,6 @@ def is_team_admin() -> Rule:
     """Check if the user is an admin of the team."""
 
     def rule(context: AccessContext, resource: Resource | None = None) -> bool:
-        return any([context.team_member.team.owner == context.user, context.team_member.role.is_admin])
+        return any([context.team_member.team.owner_id == context.user.id, context.team_member.role.is_admin])
 
     return rule
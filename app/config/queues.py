@@ -1,26 +1,173 @@
+import contextvars
 import logging
+import time
 import typing
 
-from saq import Queue
+from saq import Queue, Status
 from saq.types import Context
 
 from app.config import settings
+from app.config.database import async_dbsession, replica_set
+from app.config.cron import scheduler
 from app.config.events import events
+from app.config.metrics import observe_job, observe_query_stats, observe_scaling
+from app.contexts.outbox.relay import OutboxRelay
+from app.contrib.autoscaling import Autoscaler
+from app.contrib.query_stats import QueryStats, begin_query_stats, end_query_stats
+from app.contrib.replicas import begin_use_primary, end_use_primary
 
 _P = typing.ParamSpec("_P")
 
 
+class JobContext(Context, total=False):
+    """Context of a job, with values set by the process hooks below."""
+
+    query_stats: QueryStats
+    query_stats_token: contextvars.Token[QueryStats | None]
+    job_wait: float
+    job_started_at: float
+    use_primary_token: contextvars.Token[bool]
+
+
 async def debug_task(context: Context) -> None:
     logging.info("Received debug task.")
 
 
-task_queue = Queue.from_url(settings.redis_url)
+async def collect_job_query_stats(context: JobContext) -> None:
+    """Start counting SQL statements of the job. Jobs run in a task spawned after this hook,
+    so they inherit the context variable."""
+    context["query_stats"], context["query_stats_token"] = begin_query_stats()
+
+
+async def observe_job_query_stats(context: JobContext) -> None:
+    if token := context.get("query_stats_token"):
+        end_query_stats(token)
+        job = context["job"]
+        observe_query_stats("job", job.function, context["query_stats"])
+
+
+async def route_job_to_primary(context: JobContext) -> None:
+    """Jobs usually act on rows written right before they were enqueued, which a replica may not have yet.
+    Jobs read from the primary, a job opts in to replica reads with `use_primary(False)`."""
+    context["use_primary_token"] = begin_use_primary()
+
+
+async def reset_job_routing(context: JobContext) -> None:
+    if token := context.get("use_primary_token"):
+        end_use_primary(token)
+
+
+async def start_job_timer(context: JobContext) -> None:
+    job = context["job"]
+    context["job_wait"] = max(job.started - job.queued, 0) / 1000
+    context["job_started_at"] = time.perf_counter()
+
+
+async def observe_job_metrics(context: JobContext) -> None:
+    """Record queue wait, execution time and outcome of the job. A retried job is back in the queue when this runs."""
+    if (started_at := context.get("job_started_at")) is None:
+        return
+    job = context["job"]
+    outcome = "retried" if job.status == Status.QUEUED else job.status.value
+    queue_name = job.queue.name if job.queue else ""
+    observe_job(queue_name, job.function, outcome, context["job_wait"], time.perf_counter() - started_at)
+
+
+# Queues by priority. Redis queues are FIFO, so urgency is expressed by routing jobs to a queue
+# with its own pool of job slots: jobs in "high" never wait behind bulk work in "low".
+HIGH_QUEUE, DEFAULT_QUEUE, LOW_QUEUE = "high", "default", "low"
+
+task_queue = Queue.from_url(settings.redis_url, name=DEFAULT_QUEUE)
+high_queue = Queue.from_url(settings.redis_url, name=HIGH_QUEUE)
+low_queue = Queue.from_url(settings.redis_url, name=LOW_QUEUE)
+outbox_relay = OutboxRelay(
+    async_dbsession,
+    task_queue,
+    batch_size=settings.events_outbox_batch_size,
+    poll_interval=settings.events_outbox_poll_interval,
+)
+
+
+async def start_outbox_relay(context: Context) -> None:
+    if settings.events_outbox_relay_in_worker:
+        outbox_relay.start()
+
+
+async def stop_outbox_relay(context: Context) -> None:
+    outbox_relay.stop()
+
+
+async def start_replica_monitor(context: Context) -> None:
+    """Check replica lag in workers too, the web process monitors replicas only for itself."""
+    if replica_set:
+        replica_set.start_monitor()
+
+
+async def stop_replica_monitor(context: Context) -> None:
+    if replica_set:
+        replica_set.stop_monitor()
+
+
+def _autoscaled(queue_settings: dict[str, typing.Any]) -> dict[str, typing.Any]:
+    """Let the worker scale between `task_queue_autoscale_min_concurrency` and the configured concurrency."""
+    if not settings.task_queue_autoscale:
+        return queue_settings
+    autoscaler = Autoscaler(
+        min_concurrency=settings.task_queue_autoscale_min_concurrency,
+        max_concurrency=queue_settings["concurrency"],
+        interval=settings.task_queue_autoscale_interval,
+        target_wait=settings.task_queue_autoscale_target_wait,
+        max_cpu=settings.task_queue_autoscale_max_cpu,
+        on_decision=observe_scaling,
+    )
+    return {
+        **queue_settings,
+        "startup": [*queue_settings.get("startup", []), autoscaler.startup],
+        "shutdown": [*queue_settings.get("shutdown", []), autoscaler.shutdown],
+    }
+
+
+_functions = [
+    debug_task,
+    *events.tasks,
+]
+_process_hooks = {
+    "before_process": [route_job_to_primary, collect_job_query_stats, start_job_timer],
+    "after_process": [reset_job_routing, observe_job_query_stats, observe_job_metrics],
+}
+
+high_queue_settings = {
+    "queue": high_queue,
+    "concurrency": settings.task_queue_high_concurrency,
+    "functions": _functions,
+    "startup": [start_replica_monitor],
+    "shutdown": [stop_replica_monitor],
+    **_process_hooks,
+}
+
 queue_settings = {
     "queue": task_queue,
     "concurrency": settings.task_queue_concurrency,
-    "cron_jobs": [],
-    "functions": [
-        debug_task,
-        events.task,
-    ],
+    "functions": _functions,
+    "startup": [start_outbox_relay, start_replica_monitor],
+    "shutdown": [stop_outbox_relay, stop_replica_monitor],
+    **_process_hooks,
+}
+
+# maintenance runs in the low priority queue
+low_queue_settings = {
+    "queue": low_queue,
+    "concurrency": settings.task_queue_low_concurrency,
+    "cron_jobs": scheduler.cron_jobs,
+    "functions": _functions,
+    "startup": [start_replica_monitor],
+    "shutdown": [stop_replica_monitor],
+    **_process_hooks,
+}
+
+# worker settings by queue name, in priority order
+worker_settings: dict[str, dict[str, typing.Any]] = {
+    HIGH_QUEUE: _autoscaled(high_queue_settings),
+    DEFAULT_QUEUE: _autoscaled(queue_settings),
+    LOW_QUEUE: _autoscaled(low_queue_settings),
 }
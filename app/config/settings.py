@@ -53,17 +53,71 @@ class Config(BaseSettings):
     release_date: str = ""
     release_version: str = ""
 
+    # metrics
+    # bearer token Prometheus sends to scrape /metrics, the endpoint is disabled when empty
+    metrics_token: str = ""
+
     # database options
     database_url: str = "postgresql+psycopg_async://postgres@127.0.0.1:5432/project_template"
     sqlalchemy_echo: bool = False
+    # connections per process are pool size + max overflow, multiply by the number of workers
+    database_pool_size: int = 10
+    database_pool_max_overflow: int = 5
+    database_pool_timeout: datetime.timedelta = datetime.timedelta(seconds=10)
+    database_pool_recycle: datetime.timedelta = datetime.timedelta(minutes=30)
+    database_pool_pre_ping: bool = True
+    # psycopg prepares a statement after it was executed this many times on a connection, None disables
+    database_prepare_threshold: int | None = 5
+    # max number of prepared statements psycopg keeps per connection
+    database_prepared_statements_cache_size: int = 100
+    # max number of compiled SQL statements SQLAlchemy caches per engine
+    database_compiled_cache_size: int = 500
+    # PgBouncer in transaction pooling mode: no client side pool and no prepared statements
+    database_pgbouncer: bool = False
+    # fail on implicit lazy loads, they are N+1 queries in disguise
+    sqlalchemy_raise_on_lazy_load: bool = False
+    # read replicas, SELECTs are routed to them when set
+    database_replica_urls: list[str] = []
+    # replicas lagging behind the primary for longer are not used until they catch up
+    database_replica_max_lag: datetime.timedelta = datetime.timedelta(seconds=5)
+    database_replica_check_interval: datetime.timedelta = datetime.timedelta(seconds=5)
+    # after a client commits writes, its reads go to the primary for this long (read-your-writes)
+    database_replica_sticky_ttl: datetime.timedelta = datetime.timedelta(seconds=10)
+    database_replica_cookie: str = "db_primary"
+
+    # pagination
+    # use planner estimates instead of COUNT(*) when a listing is expected to have more rows than this
+    pagination_count_estimate_threshold: int = 10_000
+    pagination_count_cache_ttl: datetime.timedelta = datetime.timedelta(seconds=30)
 
     # redis
     redis_url: str = "redis://"
 
+    # users
+    # buffer last sign in time in Redis and write it periodically instead of on every login
+    users_sign_in_write_behind: bool = True
+    users_sign_in_flush_cron: str = "* * * * *"
+    users_sign_in_flush_batch_size: int = 1000
+
     # auth
     access_token_ttl: datetime.timedelta = datetime.timedelta(minutes=15)
     refresh_token_ttl: datetime.timedelta = datetime.timedelta(days=30)
 
+    # data retention
+    retention_cron: str = "15 3 * * *"
+    # refresh_tokens partitions are dropped once all their tokens expired longer than this ago
+    refresh_tokens_retention: datetime.timedelta = datetime.timedelta(days=7)
+    refresh_tokens_retention_batch_size: int = 1000
+    # detach expired partitions instead of dropping them, to archive them manually
+    retention_detach_partitions: bool = False
+    # pending team invites older than this are deleted
+    team_invites_retention: datetime.timedelta = datetime.timedelta(days=30)
+    team_invites_retention_batch_size: int = 1000
+    # scheduled jobs start within this time after their cron tick, to spread database load
+    cron_jitter: datetime.timedelta = datetime.timedelta(seconds=30)
+    # runs kept in history per scheduled job
+    cron_history_size: int = 50
+
     # cache options
     cache_namespace: str = f"{app_slug}:{app_env}:"
     cache_url: str = "redis://?socket_timeout=1"
@@ -119,8 +173,36 @@ class Config(BaseSettings):
     stripe_secret_key: str = ""
     stripe_public_key: str = ""
     stripe_webhook_secret: str = ""
+    # Stripe redelivers events for up to three days, an event with an already handled ID is acknowledged and skipped
+    stripe_webhook_dedupe_window: datetime.timedelta = datetime.timedelta(days=3)
 
+    # jobs processed at once by a worker process, per queue
     task_queue_concurrency: int = 10
+    task_queue_high_concurrency: int = 10
+    task_queue_low_concurrency: int = 2
+    # scale worker concurrency with the backlog, from the minimum up to the queue concurrency above
+    task_queue_autoscale: bool = False
+    task_queue_autoscale_min_concurrency: int = 1
+    task_queue_autoscale_interval: datetime.timedelta = datetime.timedelta(seconds=5)
+    # grow when the oldest queued job waits longer
+    task_queue_autoscale_target_wait: datetime.timedelta = datetime.timedelta(seconds=1)
+    # stop growing when the worker process uses a bigger share of a CPU core
+    task_queue_autoscale_max_cpu: float = 0.8
+    # worker processes are replaced after processing this many jobs or growing above this memory, 0 disables
+    task_worker_max_jobs: int = 0
+    task_worker_max_rss_mb: int = 0
+    task_worker_shutdown_timeout: datetime.timedelta = datetime.timedelta(seconds=30)
+    # port of the worker metrics endpoint, 0 disables it
+    task_worker_metrics_port: int = 0
+
+    # run every event subscriber in its own job, with its own retries and timeout
+    events_fan_out: bool = True
+
+    # events outbox
+    events_outbox_batch_size: int = 100
+    events_outbox_poll_interval: datetime.timedelta = datetime.timedelta(seconds=1)
+    # run the outbox relay inside every queue worker, disable to run "queue relay" separately
+    events_outbox_relay_in_worker: bool = True
 
 
 class TestConfig(Config):
@@ -135,6 +217,9 @@ class TestConfig(Config):
     mail_url: str = "memory://"
     cache_url: str = "memory://"
     storages_type: StorageType = StorageType.MEMORY
+    sqlalchemy_raise_on_lazy_load: bool = True
+    users_sign_in_write_behind: bool = False
+    metrics_token: str = "metrics"
 
 
 settings = TestConfig() if IS_TEST else Config()
@@ -0,0 +1,123 @@
+"""Monthly range partitioning for PostgreSQL tables.
+
+A partitioned table is declared with `postgresql_partition_by="RANGE (column)"` in `__table_args__`.
+Partitions are named `<table>_pYYYYMM` and hold one calendar month (UTC) each,
+`<table>_default` catches rows outside of created partitions.
+Expired data is removed by dropping whole partitions, which leaves no dead rows to vacuum."""
+
+from __future__ import annotations
+
+import datetime
+import logging
+import re
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+logger = logging.getLogger(__name__)
+
+_PARTITION_NAME_RE = re.compile(r"^(?P<table>\w+)_(?:p(?P<year>\d{4})(?P<month>\d{2})|default)$")
+
+_LIST_PARTITIONS_QUERY = sa.text(
+    "SELECT child.relname FROM pg_inherits "
+    "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+    "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+    "WHERE parent.relname = :table "
+    "ORDER BY child.relname"
+)
+
+
+def month_start(value: datetime.datetime) -> datetime.datetime:
+    value = value.astimezone(datetime.UTC)
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def next_month(value: datetime.datetime) -> datetime.datetime:
+    value = month_start(value)
+    return value.replace(year=value.year + 1, month=1) if value.month == 12 else value.replace(month=value.month + 1)
+
+
+def partition_name(table: str, month: datetime.datetime) -> str:
+    return f"{table}_p{month:%Y%m}"
+
+
+def partition_parent(name: str) -> str | None:
+    """Return the parent table name if the name looks like a partition name."""
+    match = _PARTITION_NAME_RE.match(name)
+    return match["table"] if match else None
+
+
+def partition_upper_bound(name: str) -> datetime.datetime | None:
+    """Return the end of the range stored in the partition, None for the default partition."""
+    match = _PARTITION_NAME_RE.match(name)
+    if not match or not match["year"]:
+        return None
+    return next_month(datetime.datetime(int(match["year"]), int(match["month"]), 1, tzinfo=datetime.UTC))
+
+
+def create_partition_ddl(table: str, month: datetime.datetime) -> str:
+    start = month_start(month)
+    return (
+        f"CREATE TABLE IF NOT EXISTS {partition_name(table, start)} PARTITION OF {table} "
+        f"FOR VALUES FROM ('{start.isoformat()}') TO ('{next_month(start).isoformat()}')"
+    )
+
+
+def create_default_partition_ddl(table: str) -> str:
+    return f"CREATE TABLE IF NOT EXISTS {table}_default PARTITION OF {table} DEFAULT"
+
+
+def months_between(start: datetime.datetime, end: datetime.datetime) -> list[datetime.datetime]:
+    """Return starts of all months overlapping [start, end]."""
+    months, month = [], month_start(start)
+    while month <= end:
+        months.append(month)
+        month = next_month(month)
+    return months
+
+
+async def list_partitions(connection: AsyncConnection, table: str) -> list[str]:
+    result = await connection.execute(_LIST_PARTITIONS_QUERY, {"table": table})
+    return list(result.scalars())
+
+
+async def ensure_partitions(
+    connection: AsyncConnection, table: str, *, until: datetime.datetime, now: datetime.datetime | None = None
+) -> list[str]:
+    """Create monthly partitions from the current month up to `until`. Returns names of created partitions.
+
+    A partition cannot be created if the default partition already has rows for its range,
+    such months are logged and skipped, their rows stay in the default partition."""
+    now = now or datetime.datetime.now(datetime.UTC)
+    existing = set(await list_partitions(connection, table))
+    created = []
+    for month in months_between(now, until):
+        name = partition_name(table, month)
+        if name in existing:
+            continue
+        try:
+            async with connection.begin_nested():
+                await connection.exec_driver_sql(create_partition_ddl(table, month))
+        except sa.exc.DBAPIError:
+            logger.warning(f"Cannot create partition {name}.", exc_info=True)
+            continue
+        created.append(name)
+    return created
+
+
+async def drop_partitions_before(
+    connection: AsyncConnection, table: str, before: datetime.datetime, *, detach: bool = False
+) -> list[str]:
+    """Drop partitions holding only values older than `before`. Returns names of removed partitions.
+    With `detach`, partitions become standalone tables instead, to be archived and dropped manually."""
+    removed = []
+    for name in await list_partitions(connection, table):
+        upper_bound = partition_upper_bound(name)
+        if upper_bound is None or upper_bound > before:
+            continue
+        if detach:
+            await connection.exec_driver_sql(f"ALTER TABLE {table} DETACH PARTITION {name}")
+        else:
+            await connection.exec_driver_sql(f"DROP TABLE {name}")
+        removed.append(name)
+    return removed
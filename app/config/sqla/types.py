@@ -1,9 +1,9 @@
-import dataclasses
 import decimal
 import typing
 
 import sqlalchemy as sa
-from pydantic import BaseModel
+from pydantic import TypeAdapter
+from pydantic_core import PydanticSerializationError
 from sqlalchemy.dialects.postgresql import JSONB
 
 from alembic.autogenerate.api import AutogenContext
@@ -11,43 +11,119 @@ from app.config.sqla.migrations import RendersMigrationType
 
 
 class MoneyType(sa.TypeDecorator[decimal.Decimal], RendersMigrationType):
-    impl = sa.Numeric(precision=12, scale=2)
+    """Decimal amount stored as BIGINT cents.
+
+    Conversion is a decimal exponent shift, not a division. For bulk reads select `as_cents(column)`
+    to get plain integers and convert totals once, or sum in SQL (see app.contrib.money)."""
+
+    impl = sa.BigInteger
+    cache_ok = True
 
     def process_bind_param(self, value: decimal.Decimal | None, dialect: sa.Dialect) -> typing.Any:
         if value is not None:
-            return value * 100
+            return int(decimal.Decimal(value).scaleb(2).to_integral_value(decimal.ROUND_HALF_UP))
         return None
 
     def process_result_value(self, value: typing.Any | None, dialect: sa.Dialect) -> decimal.Decimal | None:
         if value is not None:
-            return decimal.Decimal(value) / 100
+            return decimal.Decimal(value).scaleb(-2)
         return None
 
+    @staticmethod
+    def as_cents(column: sa.ColumnElement[typing.Any]) -> sa.ColumnElement[int]:
+        """Read the raw cents skipping per row conversion."""
+        return sa.type_coerce(column, sa.BigInteger)
+
 
 _ETT = typing.TypeVar("_ETT")
 
 
+_type_adapters: dict[typing.Any, TypeAdapter[typing.Any]] = {}
+
+
+def get_type_adapter(embedded_type: type[_ETT]) -> TypeAdapter[_ETT]:
+    """Return a shared adapter, building the validation schema is much more expensive than using it."""
+    if (adapter := _type_adapters.get(embedded_type)) is None:
+        adapter = _type_adapters[embedded_type] = TypeAdapter(embedded_type)
+    return adapter
+
+
+class LazyEmbed(typing.Generic[_ETT]):
+    """Holds raw JSON of an embedded value and validates it on the first attribute access.
+    Rows whose embedded value is never read do not pay for validation.
+    Unless accessed, the raw value is written back unchanged."""
+
+    __slots__ = ("_adapter", "_raw", "_value")
+
+    def __init__(self, raw: typing.Any, adapter: TypeAdapter[_ETT]) -> None:
+        object.__setattr__(self, "_raw", raw)
+        object.__setattr__(self, "_adapter", adapter)
+
+    @property
+    def is_loaded(self) -> bool:
+        try:
+            object.__getattribute__(self, "_value")
+        except AttributeError:
+            return False
+        return True
+
+    def get_value(self) -> _ETT:
+        if not self.is_loaded:
+            object.__setattr__(self, "_value", self._adapter.validate_python(self._raw))
+        return typing.cast(_ETT, object.__getattribute__(self, "_value"))
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self.get_value(), name)
+
+    def __setattr__(self, name: str, value: typing.Any) -> None:
+        setattr(self.get_value(), name, value)
+
+    def __eq__(self, other: object) -> bool:
+        if isinstance(other, LazyEmbed):
+            other = other.get_value()
+        return bool(self.get_value() == other)
+
+    __hash__ = None  # type: ignore[assignment]
+
+    def __repr__(self) -> str:
+        return repr(self.get_value()) if self.is_loaded else f"<LazyEmbed: {self._raw!r}>"
+
+
 class EmbedType(sa.TypeDecorator[_ETT], RendersMigrationType):
+    """Stores a dataclass, pydantic model or any other type supported by pydantic as JSONB.
+
+    With `lazy=True` loaded values are `LazyEmbed` proxies validated on the first attribute access."""
+
     impl = JSONB
     cache_ok = True
 
-    def __init__(self, embedded_type: type[_ETT]) -> None:
+    def __init__(self, embedded_type: type[_ETT], lazy: bool = False) -> None:  # noqa: FBT001,FBT002
         self.embedded_type = embedded_type
+        self.lazy = lazy
         super().__init__()
 
-    def process_bind_param(self, value: _ETT | None, dialect: sa.Dialect) -> dict[str, typing.Any] | None:
-        if value is not None:
-            if isinstance(value, BaseModel):
-                return value.model_dump()
-            if dataclasses.is_dataclass(value):
-                return dataclasses.asdict(value)  # type: ignore[arg-type]
-            raise ValueError(f"Unsupported type for EmbedType: {type(value)}")
-        return None
+    @property
+    def adapter(self) -> TypeAdapter[_ETT]:
+        return get_type_adapter(self.embedded_type)
 
-    def process_result_value(self, value: dict[str, typing.Any] | None, dialect: sa.Dialect) -> _ETT | None:
-        if value is not None:
+    def process_bind_param(self, value: _ETT | None, dialect: sa.Dialect) -> typing.Any:
+        if value is None:
+            return None
+        if isinstance(value, LazyEmbed):
+            if not value.is_loaded:
+                return value._raw
+            value = typing.cast(_ETT, value.get_value())
+        try:
+            return self.adapter.dump_python(value, mode="json", warnings="error")
+        except (PydanticSerializationError, AttributeError) as ex:
+            raise ValueError(f"Unsupported type for EmbedType: {type(value)}") from ex
+
+    def process_result_value(self, value: typing.Any | None, dialect: sa.Dialect) -> _ETT | None:
+        if value is None:
             return None
-        return self.embedded_type(**value)
+        if self.lazy:
+            return typing.cast(_ETT, LazyEmbed(value, self.adapter))
+        return self.adapter.validate_python(value)
 
     def render_item(self, _type: typing.Any, _obj: typing.Any, autogen_context: AutogenContext) -> str:
         autogen_context.imports.add(self.get_import_name())
@@ -8,10 +8,16 @@ from app.contexts.users.models import User
 
 class RefreshToken(Base):
     __tablename__ = "refresh_tokens"
-    __table_args__ = (sa.Index("refresh_tokens_jit_udx", "jit", unique=True),)
+    __table_args__ = (
+        # unique indexes of a partitioned table must include the partition key,
+        # RefreshTokenRepo.create keeps jit unique across partitions
+        sa.Index("refresh_tokens_jit_udx", "jit", "expires_at", unique=True),
+        # expired tokens are removed by dropping monthly partitions, see app.contexts.auth.retention
+        {"postgresql_partition_by": "RANGE (expires_at)"},
+    )
     id: Mapped[IntPk]
     jit: Mapped[str] = mapped_column()
-    expires_at: Mapped[DateTimeTz] = mapped_column()
+    expires_at: Mapped[DateTimeTz] = mapped_column(primary_key=True)
     created_at: Mapped[AutoCreatedAt]
     user_id: Mapped[int] = mapped_column(sa.ForeignKey(User.id))
 
@@ -1,9 +1,11 @@
 import datetime
 
 import sqlalchemy as sa
-from starlette_sqlalchemy import Repo
 
+from app.contexts.auth.exceptions import TokenError
 from app.contexts.auth.models import RefreshToken
+from app.contrib.replicas import use_primary
+from app.contrib.repos import Repo
 
 
 class RefreshTokenRepo(Repo[RefreshToken]):
@@ -11,15 +13,35 @@ class RefreshTokenRepo(Repo[RefreshToken]):
     base_query = sa.select(RefreshToken)
 
     async def find_by_jit(self, jit: str) -> RefreshToken | None:
-        stmt = self.base_query.where(RefreshToken.jit == jit)
-        return await self.query.one_or_none(stmt)  # type: ignore
+        # runs on every token refresh, lambda statement skips statement construction and cache key generation
+        stmt = sa.lambda_stmt(lambda: sa.select(RefreshToken).where(RefreshToken.jit == jit))
+        return await self.query.one_or_none(stmt)  # type: ignore[arg-type]
 
     async def revoke(self, jit: str) -> None:
         stmt = sa.delete(RefreshToken).where(RefreshToken.jit == jit)
         await self.dbsession.execute(stmt)
         await self.dbsession.flush()
 
+    async def delete_expired_before(self, before: datetime.datetime, *, limit: int) -> int:
+        """Delete up to `limit` tokens expired before the date. Returns number of deleted tokens.
+        Monthly partitions are dropped as a whole, this removes tokens left in the default partition."""
+        batch = sa.select(RefreshToken.id, RefreshToken.expires_at).where(RefreshToken.expires_at < before).limit(limit)
+        stmt = (
+            sa.delete(RefreshToken)
+            .where(sa.tuple_(RefreshToken.id, RefreshToken.expires_at).in_(batch))
+            .returning(RefreshToken.id)
+        )
+        return len(list(await self.dbsession.scalars(stmt)))
+
     async def create(self, jit: str, user_id: int, expires_at: datetime.datetime) -> RefreshToken:
+        """Store a refresh token, raise TokenError when the jit is already taken.
+        The unique index of the partitioned table includes expires_at and cannot guarantee a unique jit,
+        so concurrent inserts of a jit are serialized by a transaction-level advisory lock and checked here."""
+        with use_primary():
+            await self.dbsession.execute(sa.select(sa.func.pg_advisory_xact_lock(sa.func.hashtextextended(jit, 0))))
+            if await self.dbsession.scalar(sa.select(sa.exists().where(RefreshToken.jit == jit))):
+                raise TokenError("Refresh token id is already in use.")
+
         instance = RefreshToken(jit=jit, user_id=user_id, expires_at=expires_at)
         self.dbsession.add(instance)
         await self.dbsession.flush()
@@ -0,0 +1,51 @@
+import datetime
+import logging
+
+from saq.types import Context
+
+from app.config import settings
+from app.config.database import new_dbsession
+from app.config.sqla.partitions import drop_partitions_before, ensure_partitions, next_month
+from app.contexts.auth.models import RefreshToken
+from app.contexts.auth.repos import RefreshTokenRepo
+
+logger = logging.getLogger(__name__)
+
+
+async def rotate_refresh_token_partitions(context: Context) -> None:
+    """Create refresh_tokens partitions for tokens issued until the next run and drop expired ones.
+    Partitions are created one month ahead of the longest token lifetime,
+    so new tokens never land in the default partition."""
+    now = datetime.datetime.now(datetime.UTC)
+    table = RefreshToken.__tablename__
+    async with new_dbsession() as dbsession:
+        connection = await dbsession.connection()
+        created = await ensure_partitions(connection, table, until=next_month(now + settings.refresh_token_ttl))
+        removed = await drop_partitions_before(
+            connection,
+            table,
+            now - settings.refresh_tokens_retention,
+            detach=settings.retention_detach_partitions,
+        )
+        await dbsession.commit()
+
+    if created or removed:
+        logger.info(f"Rotated {table} partitions.", extra={"created": created, "removed": removed})
+
+
+async def delete_expired_refresh_tokens(context: Context) -> None:
+    """Delete expired tokens that partition rotation does not cover, in batches of short transactions."""
+    before = datetime.datetime.now(datetime.UTC) - settings.refresh_tokens_retention
+    deleted = 0
+    while True:
+        async with new_dbsession() as dbsession:
+            count = await RefreshTokenRepo(dbsession).delete_expired_before(
+                before, limit=settings.refresh_tokens_retention_batch_size
+            )
+            await dbsession.commit()
+        deleted += count
+        if count < settings.refresh_tokens_retention_batch_size:
+            break
+
+    if deleted:
+        logger.info(f"Deleted {deleted} expired refresh tokens.")
@@ -11,6 +11,7 @@ from app.config.sqla.columns import AutoCreatedAt, DateTimeTz, IntPk
 from app.config.sqla.models import Base, WithTimestamps
 from app.config.sqla.types import EmbedType
 from app.contexts.teams.models import Team
+from app.contrib.money import Money
 
 
 class SubscriptionPlan(Base, WithTimestamps):
@@ -56,8 +57,13 @@ class Subscription(Base):
     )
     expires_at: Mapped[DateTimeTz] = mapped_column(doc="When the subscription will expire")
     created_at: Mapped[AutoCreatedAt] = mapped_column(doc="When the first subscription was created")
+    price_cents: Mapped[int] = mapped_column(
+        sa.BigInteger, doc="Price per billing period in minor units", default=0, server_default="0"
+    )
+    price_currency: Mapped[str] = mapped_column(sa.Text, default="usd", server_default="usd")
+    price: Mapped[Money] = sa.orm.composite(Money, "price_cents", "price_currency")
     meta: Mapped[SubscriptionMetadata] = mapped_column(
-        EmbedType(SubscriptionMetadata), default=SubscriptionMetadata, server_default="{}"
+        EmbedType(SubscriptionMetadata, lazy=True), default=SubscriptionMetadata, server_default="{}"
     )
 
     plan: Mapped[SubscriptionPlan] = sa.orm.relationship(SubscriptionPlan, back_populates="subscriptions")
@@ -1,9 +1,13 @@
+import typing
+
 import sqlalchemy as sa
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
-from starlette_sqlalchemy import Collection, Repo
+from starlette_sqlalchemy import Collection
 
 from app.contexts.billing.models import Subscription, SubscriptionPlan
+from app.contrib.money import Money, sum_by_currency, totals_from_rows
+from app.contrib.repos import Repo
 
 
 class SubscriptionPlanRepo(Repo[SubscriptionPlan]):
@@ -27,7 +31,12 @@ class SubscriptionRepo(Repo[Subscription]):
         return await self.query.all(stmt)
 
     async def get_team_subscription(self, team_id: int) -> Subscription | None:
-        stmt = sa.select(Subscription).where(Subscription.team_id == team_id).options(joinedload(Subscription.plan))
+        # runs on every request to the app (SubscriptionMiddleware), see UserRepo.find_by_email
+        stmt = sa.lambda_stmt(
+            lambda: (
+                sa.select(Subscription).where(Subscription.team_id == team_id).options(joinedload(Subscription.plan))
+            )
+        )
         return await self.query.one_or_none(stmt)  # type: ignore[arg-type]
 
     async def get_plan_by_remote_id(self, remote_id: str) -> SubscriptionPlan | None:
@@ -37,3 +46,13 @@ class SubscriptionRepo(Repo[Subscription]):
     async def get_subscription_by_remote_id(self, remote_id: str) -> Subscription | None:
         stmt = sa.select(Subscription).where(Subscription.remote_subscription_id == remote_id)
         return await self.query.one_or_none(stmt)  # type: ignore[arg-type]
+
+    async def get_revenue_by_currency(
+        self, statuses: typing.Collection[Subscription.Status] = (Subscription.Status.ACTIVE,)
+    ) -> dict[str, Money]:
+        """Sum subscription prices per currency in the database."""
+        stmt = sum_by_currency(Subscription.price_cents, Subscription.price_currency).where(
+            Subscription.status.in_(statuses)
+        )
+        result = await self.dbsession.execute(stmt)
+        return totals_from_rows(result)
@@ -17,6 +17,7 @@ from app.contexts.billing.exceptions import (
 from app.contexts.billing.models import Subscription, SubscriptionMetadata, SubscriptionPlan
 from app.contexts.billing.repo import SubscriptionRepo
 from app.contexts.teams.repo import TeamRepo
+from app.contrib.money import Money
 
 logger = logging.getLogger(__name__)
 
@@ -130,6 +131,7 @@ async def create_stripe_subscription(dbsession: AsyncSession, stripe_session: st
         remote_customer_id=stripe_subscription.customer,
         remote_subscription_id=stripe_subscription.id,
         remote_price_id=stripe_price.id,
+        price=Money(stripe_price.unit_amount or 0, stripe_price.currency),
         meta=SubscriptionMetadata(),
     )
     dbsession.add(subscription)
@@ -160,6 +162,7 @@ async def update_stripe_subscription(dbsession: AsyncSession, stripe_subscriptio
 
     subscription.plan = subscription_plan
     subscription.remote_price_id = stripe_price.id
+    subscription.price = Money(stripe_price.unit_amount or 0, stripe_price.currency)
     subscription.expires_at = datetime.datetime.fromtimestamp(stripe_subscription.current_period_end, tz=datetime.UTC)
     await dbsession.flush()
     return subscription
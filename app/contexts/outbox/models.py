@@ -0,0 +1,19 @@
+import typing
+
+from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.orm import Mapped, mapped_column
+
+from app.config.sqla.columns import AutoCreatedAt, IntPk
+from app.config.sqla.models import Base
+
+
+class OutboxMessage(Base):
+    """A job written in the same transaction as the state change it describes.
+    The relay moves messages to the task queue, see app.contexts.outbox.relay."""
+
+    __tablename__ = "outbox_messages"
+
+    id: Mapped[IntPk]
+    function: Mapped[str] = mapped_column(doc="Task queue function name.")
+    kwargs: Mapped[dict[str, typing.Any]] = mapped_column(JSONB)
+    created_at: Mapped[AutoCreatedAt]
@@ -0,0 +1,73 @@
+import asyncio
+import datetime
+import logging
+import typing
+
+import anyio
+import saq
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.contexts.outbox.repo import OutboxRepo
+from app.contrib.queues import enqueue_many
+
+logger = logging.getLogger(__name__)
+
+
+class OutboxRelay:
+    """Move outbox messages to the task queue in batches.
+
+    Delivery is at least once: if the transaction deleting relayed messages fails, they are relayed again.
+    Jobs are keyed by the message ID, so a message still sitting in the queue is not enqueued twice."""
+
+    def __init__(
+        self,
+        session_factory: typing.Callable[[], AsyncSession],
+        queue: saq.Queue,
+        *,
+        batch_size: int = 100,
+        poll_interval: datetime.timedelta = datetime.timedelta(seconds=1),
+    ) -> None:
+        self.session_factory = session_factory
+        self.queue = queue
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._task: asyncio.Task[None] | None = None
+
+    async def relay(self) -> int:
+        """Relay one batch, returns the number of relayed messages."""
+        async with self.session_factory() as dbsession:
+            repo = OutboxRepo(dbsession)
+            messages = await repo.claim(self.batch_size)
+            if not messages:
+                return 0
+
+            await enqueue_many(
+                self.queue,
+                [
+                    saq.Job(function=message.function, kwargs=message.kwargs, key=f"outbox:{message.id}")
+                    for message in messages
+                ],
+            )
+            await repo.delete_many([message.id for message in messages])
+            await dbsession.commit()
+            return len(messages)
+
+    async def run(self) -> None:
+        while True:
+            try:
+                relayed = await self.relay()
+            except Exception:
+                logger.exception("Cannot relay outbox messages.")
+                relayed = 0
+            # a full batch means more messages are waiting
+            if relayed < self.batch_size:
+                await anyio.sleep(self.poll_interval.total_seconds())
+
+    def start(self) -> None:
+        """Run `run` in a task of the running event loop."""
+        self._task = asyncio.create_task(self.run())
+
+    def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
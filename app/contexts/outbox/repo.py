@@ -0,0 +1,21 @@
+import typing
+
+import sqlalchemy as sa
+from starlette_sqlalchemy import Collection
+
+from app.contexts.outbox.models import OutboxMessage
+from app.contrib.repos import Repo
+
+
+class OutboxRepo(Repo[OutboxMessage]):
+    model_class = OutboxMessage
+    base_query = sa.select(OutboxMessage)
+
+    async def claim(self, limit: int) -> Collection[OutboxMessage]:
+        """Lock oldest messages until the transaction ends.
+        Messages locked by other relays are skipped, so relays can run concurrently."""
+        stmt = sa.select(OutboxMessage).order_by(OutboxMessage.id).limit(limit).with_for_update(skip_locked=True)
+        return await self.query.all(stmt)
+
+    async def delete_many(self, ids: typing.Collection[int]) -> None:
+        await self.dbsession.execute(sa.delete(OutboxMessage).where(OutboxMessage.id.in_(ids)))
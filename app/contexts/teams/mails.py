@@ -2,7 +2,7 @@ from starlette.datastructures import URL
 from starlette_babel import gettext_lazy as _
 
 from app.config.mailers import send_templated_mail
-from app.contexts.teams.models import TeamInvite, TeamMember
+from app.contexts.teams.models import Team, TeamInvite, TeamMember
 
 
 async def send_team_invitation_email(invite: TeamInvite, link: URL) -> None:
@@ -11,21 +11,29 @@ async def send_team_invitation_email(invite: TeamInvite, link: URL) -> None:
     Team owner will also be BCC'd on the invite email.
     This is to ensure that the owner is aware of who is being invited to the team.
     """
+    await send_team_invitation_emails(invite.team, invite.inviter, {invite.email: link})
+
+
+async def send_team_invitation_emails(team: Team, inviter: TeamMember, links: dict[str, URL]) -> None:
+    """Email invitees of a team, `links` maps emails to invitation links.
+    See send_team_invitation_email."""
 
     bcc: str | None = None
-    recipient = invite.inviter.user.email
-    team_owner_email = invite.team.owner.email
+    recipient = inviter.user.email
+    team_owner_email = team.owner.email
     if recipient != team_owner_email:
         bcc = team_owner_email
 
-    await send_templated_mail(
-        to=invite.email,
-        bcc=bcc,
-        subject=_("{user} invites you to join the team {team}").format(user=invite.inviter, team=invite.team),
-        html_template="mails/team_invite.html",
-        context={"user": invite.inviter, "team": invite.team, "link": link},
-        headers={"x-invite-link": str(link)},
-    )
+    subject = _("{user} invites you to join the team {team}").format(user=inviter, team=team)
+    for email, link in links.items():
+        await send_templated_mail(
+            to=email,
+            bcc=bcc,
+            subject=subject,
+            html_template="mails/team_invite.html",
+            context={"user": inviter, "team": team, "link": link},
+            headers={"x-invite-link": str(link)},
+        )
 
 
 async def send_team_member_joined_email(invitation: TeamInvite, team_member: TeamMember) -> None:
@@ -78,7 +78,15 @@ class TeamMember(Base, WithTimestamps):
     """A team member is a user that belongs to a team."""
 
     __tablename__ = "team_members"
-    __table_args__ = (sa.UniqueConstraint("team_id", "user_id"),)
+    __table_args__ = (
+        sa.UniqueConstraint("team_id", "user_id"),
+        # active memberships of a user, loaded on every request to select the current team
+        sa.Index(
+            "team_members_active_user_id_idx",
+            "user_id",
+            postgresql_where=sa.text("suspended_at IS NULL AND NOT is_service"),
+        ),
+    )
 
     id: Mapped[IntPk]
     is_service: Mapped[bool] = mapped_column(
@@ -136,6 +144,8 @@ class TeamInvite(Base, WithTimestamps):
     __table_args__ = (
         sa.UniqueConstraint("team_id", "email"),
         sa.UniqueConstraint("team_id", "token"),
+        # invitations are accepted by token only, the unique constraint above cannot serve that lookup
+        sa.Index("team_invites_token_idx", "token"),
     )
 
     id: Mapped[IntPk]
@@ -1,12 +1,46 @@
+import datetime
+import functools
+import logging
+import typing
+
 import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import joinedload, selectinload, with_expression
-from starlette_sqlalchemy import Collection, Page, PageNumberPaginator, Repo
+from sqlalchemy.orm import Session, UOWTransaction, joinedload, load_only, raiseload, selectinload, with_expression
+from sqlalchemy.sql.base import ExecutableOption
+from starlette_sqlalchemy import Collection
 
+from app.config import settings
+from app.config.cache import cache
 from app.config.crypto import hash_value
+from app.config.database import call_after_commit
 from app.contexts.teams.exceptions import AlreadyMemberError
 from app.contexts.teams.models import Team, TeamInvite, TeamMember, TeamRole
 from app.contexts.users.models import User
+from app.contrib.pagination import CountedPage, CursorPage, CursorPaginator, EstimatedCountPaginator
+from app.contrib.repos import Repo
+
+LoadProfile = typing.Literal["minimal", "membership", "list", "detail"]
+"""Loader profiles of membership and invite queries:
+- minimal: own columns only, any relationship access raises
+- membership: team and role joined in the same query, used to resolve the current team of a user
+- list: related rows needed to render listings, loaded in separate queries instead of wide joins
+- detail: everything needed to send notifications about the row
+"""
+
+logger = logging.getLogger(__name__)
+
+_STALE_COUNTS_KEY = "teams.stale_counts"
+_counted_listings: dict[type[typing.Any], str] = {
+    TeamMember: "members",
+    TeamInvite: "invites",
+    TeamRole: "roles",
+}
+
+
+def count_cache_key(team_id: int, listing: str) -> str:
+    """Return the cache key of exact row counts of a team listing, the paginator stores them by query filter."""
+    return f"teams:{team_id}:{listing}:count"
 
 
 class TeamRepo(Repo[Team]):
@@ -20,31 +54,81 @@ class TeamRepo(Repo[Team]):
         self.roles = TeamRolesRepo(dbsession)
 
     async def get_active_memberships(self, user_id: int) -> Collection[TeamMember]:
-        stmt = self.memberships.get_base_query().where(TeamMember.user_id == user_id, TeamMember.suspended_at.is_(None))
+        # matches the team_members_active_user_id_idx partial index, the base query excludes service members
+        stmt = self.memberships.get_base_query("membership").where(
+            TeamMember.user_id == user_id, TeamMember.suspended_at.is_(None)
+        )
         return await self.query.all(stmt)
 
     async def get_joined_teams(self, user_id: int) -> list[Team]:
         memberships = await self.get_active_memberships(user_id)
         return [membership.team for membership in memberships]
 
-    async def get_team_member(self, team_id: int, user_id: int) -> TeamMember | None:
-        stmt = self.memberships.get_base_query().where(TeamMember.user_id == user_id, TeamMember.team_id == team_id)
+    async def get_team_member(
+        self, team_id: int, user_id: int, *, profile: LoadProfile = "detail"
+    ) -> TeamMember | None:
+        stmt = self.memberships.get_base_query(profile).where(
+            TeamMember.user_id == user_id, TeamMember.team_id == team_id
+        )
         return await self.query.one_or_none(stmt)  # type: ignore[arg-type]
 
-    async def get_team_member_by_id(self, team_id: int, member_id: int) -> TeamMember | None:
-        stmt = self.memberships.get_base_query().where(TeamMember.id == member_id, TeamMember.team_id == team_id)
+    async def get_team_member_by_id(
+        self, team_id: int, member_id: int, *, profile: LoadProfile = "detail"
+    ) -> TeamMember | None:
+        stmt = self.memberships.get_base_query(profile).where(TeamMember.id == member_id, TeamMember.team_id == team_id)
         return await self.query.one_or_none(stmt)  # type: ignore[arg-type]
 
-    async def get_team_members_paginated(self, team_id: int, *, page: int = 1, page_size: int = 50) -> Page[TeamMember]:
-        stmt = self.memberships.get_base_query().where(TeamMember.team_id == team_id)
-        pager = PageNumberPaginator(self.dbsession)
+    def _count_paginator(self, team_id: int, listing: str) -> EstimatedCountPaginator:
+        return EstimatedCountPaginator(
+            self.dbsession,
+            threshold=settings.pagination_count_estimate_threshold,
+            cache=cache,
+            cache_key=count_cache_key(team_id, listing),
+            cache_ttl=settings.pagination_count_cache_ttl,
+        )
+
+    async def get_team_members_paginated(
+        self, team_id: int, *, page: int = 1, page_size: int = 50
+    ) -> CountedPage[TeamMember]:
+        stmt = self.memberships.get_base_query("list").where(TeamMember.team_id == team_id)
+        pager = self._count_paginator(team_id, "members")
         return await pager.paginate(stmt, page=page, page_size=page_size)
 
-    async def get_invites_paginated(self, team_id: int, *, page: int = 1, page_size: int = 50) -> Page[TeamInvite]:
-        stmt = self.invites.get_base_query().where(TeamInvite.team_id == team_id)
-        paginator = PageNumberPaginator(self.dbsession)
+    async def get_team_members_by_cursor(
+        self, team_id: int, *, cursor: str | None = None, page_size: int = 50, with_total: bool = False
+    ) -> CursorPage[TeamMember]:
+        stmt = self.memberships.get_base_query("list").where(TeamMember.team_id == team_id)
+        paginator = CursorPaginator(self.dbsession, secret_key=settings.secret_key)
+        return await paginator.paginate(
+            stmt, [TeamMember.id], cursor=cursor, page_size=page_size, with_total=with_total
+        )
+
+    def stream_team_members(self, team_id: int, batch_size: int = 1000) -> typing.AsyncGenerator[TeamMember, None]:
+        """Iterate over all members of the team without loading them all in memory, e.g. for exports."""
+        stmt = self.memberships.get_base_query("list").where(TeamMember.team_id == team_id).order_by(TeamMember.id)
+        return self.memberships.stream(stmt, batch_size)
+
+    async def get_invites_paginated(
+        self, team_id: int, *, page: int = 1, page_size: int = 50
+    ) -> CountedPage[TeamInvite]:
+        stmt = self.invites.get_base_query("list").where(TeamInvite.team_id == team_id)
+        paginator = self._count_paginator(team_id, "invites")
         return await paginator.paginate(stmt, page=page, page_size=page_size)
 
+    async def get_invites_by_cursor(
+        self, team_id: int, *, cursor: str | None = None, page_size: int = 50, with_total: bool = False
+    ) -> CursorPage[TeamInvite]:
+        stmt = self.invites.get_base_query("list").where(TeamInvite.team_id == team_id)
+        paginator = CursorPaginator(self.dbsession, secret_key=settings.secret_key)
+        return await paginator.paginate(
+            stmt, [TeamInvite.created_at, TeamInvite.id], cursor=cursor, page_size=page_size, with_total=with_total
+        )
+
+    def stream_invites(self, team_id: int, batch_size: int = 1000) -> typing.AsyncGenerator[TeamInvite, None]:
+        """See stream_team_members."""
+        stmt = self.invites.get_base_query("list").where(TeamInvite.team_id == team_id).order_by(TeamInvite.id)
+        return self.invites.stream(stmt, batch_size)
+
     async def get_role(self, team_id: int, role_id: int, *, load_members: bool = False) -> TeamRole | None:
         stmt = self.roles.get_base_query().where(TeamRole.team_id == team_id, TeamRole.id == role_id)
         if load_members:
@@ -55,7 +139,7 @@ class TeamRepo(Repo[Team]):
         stmt = self.roles.get_base_query().where(TeamRole.team_id == team_id)
         return await self.query.all(stmt)
 
-    async def get_roles_paginated(self, team_id: int, *, page: int, page_size: int = 50) -> Page[TeamRole]:
+    async def get_roles_paginated(self, team_id: int, *, page: int, page_size: int = 50) -> CountedPage[TeamRole]:
         stmt = (
             self.roles.get_base_query()
             .where(TeamRole.team_id == team_id)
@@ -66,17 +150,75 @@ class TeamRepo(Repo[Team]):
                 )
             )
         )
-        paginator = PageNumberPaginator(self.dbsession)
+        paginator = self._count_paginator(team_id, "roles")
         return await paginator.paginate(stmt, page=page, page_size=page_size)
 
-    async def get_invitation(self, team_id: int, invite_id: int) -> TeamInvite | None:
-        stmt = self.invites.get_base_query().where(TeamInvite.team_id == team_id, TeamInvite.id == invite_id)
+    async def get_roles_by_cursor(
+        self, team_id: int, *, cursor: str | None = None, page_size: int = 50, with_total: bool = False
+    ) -> CursorPage[TeamRole]:
+        stmt = (
+            self.roles.get_base_query()
+            .where(TeamRole.team_id == team_id)
+            .options(
+                with_expression(
+                    TeamRole.members_count,
+                    sa.select(sa.func.count()).where(TeamMember.role_id == TeamRole.id).scalar_subquery(),
+                )
+            )
+        )
+        paginator = CursorPaginator(self.dbsession, secret_key=settings.secret_key)
+        return await paginator.paginate(
+            stmt, [TeamRole.name, TeamRole.id], cursor=cursor, page_size=page_size, with_total=with_total
+        )
+
+    async def get_invitation(
+        self, team_id: int, invite_id: int, *, profile: LoadProfile = "detail"
+    ) -> TeamInvite | None:
+        stmt = self.invites.get_base_query(profile).where(TeamInvite.team_id == team_id, TeamInvite.id == invite_id)
         return await self.query.one_or_none(stmt)  # type: ignore[arg-type]
 
     async def get_invitation_by_token(self, token: str) -> TeamInvite | None:
         stmt = self.invites.get_base_query().where(TeamInvite.token == hash_value(token))
         return await self.query.one_or_none(stmt)  # type: ignore[arg-type]
 
+    async def invite_many(
+        self, *, team_id: int, inviter_id: int, role_id: int, tokens: dict[str, str]
+    ) -> tuple[list[TeamInvite], list[str]]:
+        """Invite emails to the team with a single INSERT.
+        `tokens` maps emails to hashed invitation tokens.
+        Emails already invited to the team are skipped, returns created invites and skipped emails."""
+        if not tokens:
+            return [], []
+
+        stmt = (
+            postgresql.insert(TeamInvite)
+            .values(
+                [
+                    dict(email=email, token=token, team_id=team_id, role_id=role_id, inviter_id=inviter_id)
+                    for email, token in tokens.items()
+                ]
+            )
+            .on_conflict_do_nothing()
+            .returning(TeamInvite)
+        )
+        invites = list(await self.dbsession.scalars(stmt))
+        if invites:
+            # rows inserted by a statement bypass the flush, see _collect_stale_counts
+            stale_keys: set[str] = self.dbsession.sync_session.info.setdefault(_STALE_COUNTS_KEY, set())
+            stale_keys.add(count_cache_key(team_id, "invites"))
+
+        invited = {invite.email for invite in invites}
+        return invites, [email for email in tokens if email not in invited]
+
+    async def delete_invites_created_before(self, before: datetime.datetime, *, limit: int) -> int:
+        """Delete up to `limit` invites created before the date. Returns number of deleted invites."""
+        batch = sa.select(TeamInvite.id).where(TeamInvite.created_at < before).limit(limit).scalar_subquery()
+        stmt = sa.delete(TeamInvite).where(TeamInvite.id.in_(batch)).returning(TeamInvite.team_id)
+        team_ids = list(await self.dbsession.scalars(stmt))
+        stale_keys: set[str] = self.dbsession.sync_session.info.setdefault(_STALE_COUNTS_KEY, set())
+        stale_keys.update(count_cache_key(team_id, "invites") for team_id in set(team_ids))
+        return len(team_ids)
+
     async def accept_invitation(self, user: User, invitation: TeamInvite) -> TeamMember:
         current_member = await self.query.one_or_none(
             sa.select(TeamMember).where(TeamMember.team == invitation.team, TeamMember.user == user)
@@ -99,31 +241,101 @@ class TeamMemberRepo(Repo[TeamMember]):
     model_class = TeamMember
     base_query = (
         sa.select(TeamMember)
-        .options(
-            joinedload(TeamMember.team).joinedload(Team.owner),
-            joinedload(TeamMember.user),
-            joinedload(TeamMember.role),
-        )
         .where(
-            TeamMember.is_service.is_(False),
+            sa.not_(TeamMember.is_service),
         )
         .order_by(TeamMember.id)
     )
+    load_profiles: dict[LoadProfile, typing.Sequence[ExecutableOption]] = {
+        "minimal": [
+            load_only(
+                TeamMember.id,
+                TeamMember.team_id,
+                TeamMember.user_id,
+                TeamMember.role_id,
+                TeamMember.suspended_at,
+                raiseload=True,
+            ),
+            raiseload("*"),
+        ],
+        "membership": [
+            joinedload(TeamMember.team),
+            joinedload(TeamMember.role),
+            raiseload("*"),
+        ],
+        "list": [
+            joinedload(TeamMember.team),
+            selectinload(TeamMember.user),
+            selectinload(TeamMember.role),
+            raiseload("*"),
+        ],
+        "detail": [
+            joinedload(TeamMember.team).joinedload(Team.owner),
+            joinedload(TeamMember.user),
+            joinedload(TeamMember.role),
+        ],
+    }
+
+    def get_base_query(self, profile: LoadProfile = "detail") -> sa.Select[tuple[TeamMember]]:
+        return super().get_base_query().options(*self.load_profiles[profile])
 
 
 class TeamInvitesRepo(Repo[TeamInvite]):
     model_class = TeamInvite
-    base_query = (
-        sa.select(TeamInvite)
-        .options(
+    base_query = sa.select(TeamInvite).order_by(TeamInvite.created_at)
+    load_profiles: dict[LoadProfile, typing.Sequence[ExecutableOption]] = {
+        "minimal": [
+            load_only(
+                TeamInvite.id,
+                TeamInvite.email,
+                TeamInvite.team_id,
+                TeamInvite.role_id,
+                TeamInvite.inviter_id,
+                raiseload=True,
+            ),
+            raiseload("*"),
+        ],
+        "list": [
+            selectinload(TeamInvite.role),
+            raiseload("*"),
+        ],
+        "detail": [
             joinedload(TeamInvite.role),
             joinedload(TeamInvite.team).joinedload(Team.owner),
             joinedload(TeamInvite.inviter).joinedload(TeamMember.user),
-        )
-        .order_by(TeamInvite.created_at)
-    )
+        ],
+    }
+
+    def get_base_query(self, profile: LoadProfile = "detail") -> sa.Select[tuple[TeamInvite]]:
+        return super().get_base_query().options(*self.load_profiles[profile])
 
 
 class TeamRolesRepo(Repo[TeamRole]):
     model_class = TeamRole
     base_query = sa.select(TeamRole).order_by(TeamRole.name)
+
+
+@sa.event.listens_for(Session, "after_flush")
+def _collect_stale_counts(session: Session, flush_context: UOWTransaction) -> None:
+    """Remember which team listings got rows inserted or deleted in this transaction."""
+    stale_keys: set[str] = session.info.setdefault(_STALE_COUNTS_KEY, set())
+    for instance in [*session.new, *session.deleted]:
+        if listing := _counted_listings.get(type(instance)):
+            stale_keys.add(count_cache_key(instance.team_id, listing))
+
+
+@sa.event.listens_for(Session, "after_commit")
+def _invalidate_stale_counts(session: Session) -> None:
+    """Drop cached counts of listings changed by the committed transaction.
+    The hook is synchronous, the committing async session awaits the deletion."""
+    stale_keys: set[str] = session.info.pop(_STALE_COUNTS_KEY, set())
+    if stale_keys and not call_after_commit(session, functools.partial(cache.delete, *stale_keys)):
+        logger.warning(
+            "Cached counts are not invalidated, the session was committed synchronously.",
+            extra={"cache_keys": sorted(stale_keys)},
+        )
+
+
+@sa.event.listens_for(Session, "after_soft_rollback")
+def _forget_stale_counts(session: Session, previous_transaction: typing.Any) -> None:
+    session.info.pop(_STALE_COUNTS_KEY, None)
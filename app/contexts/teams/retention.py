@@ -0,0 +1,29 @@
+import datetime
+import logging
+
+from saq.types import Context
+
+from app.config import settings
+from app.config.database import new_dbsession
+from app.contexts.teams.repo import TeamRepo
+
+logger = logging.getLogger(__name__)
+
+
+async def delete_expired_invites(context: Context) -> None:
+    """Delete invites nobody accepted within the retention period.
+    Rows are deleted in small batches, each in its own transaction, to keep locks short."""
+    before = datetime.datetime.now(datetime.UTC) - settings.team_invites_retention
+    deleted = 0
+    while True:
+        async with new_dbsession() as dbsession:
+            count = await TeamRepo(dbsession).delete_invites_created_before(
+                before, limit=settings.team_invites_retention_batch_size
+            )
+            await dbsession.commit()
+        deleted += count
+        if count < settings.team_invites_retention_batch_size:
+            break
+
+    if deleted:
+        logger.info(f"Deleted {deleted} expired team invites.")
@@ -12,6 +12,8 @@ from app.config.sqla.models import Base, WithTimestamps
 
 class User(Base, WithTimestamps, BaseUser, HasSessionAuthHash):
     __tablename__ = "users"
+    # lookups by email are case-insensitive, see UserRepo.find_by_email
+    __table_args__ = (sa.Index("users_email_lower_idx", sa.func.lower(sa.column("email"))),)
 
     id: Mapped[IntPk]
     email: Mapped[str] = mapped_column(unique=True)
@@ -1,10 +1,10 @@
+import datetime
 import uuid
 
 import sqlalchemy as sa
-from starlette_sqlalchemy import Repo
 
-from app.contexts.users import filters
 from app.contexts.users.models import User
+from app.contrib.repos import Repo
 
 
 class UserRepo(Repo[User]):
@@ -12,9 +12,33 @@ class UserRepo(Repo[User]):
     base_query = sa.select(User).where(User.deleted_at.is_(None))
 
     async def find_by_email(self, email: str) -> User | None:
-        return await self.one_or_none(filters.ByEmail(email))
+        # runs on every login and registration, same condition as filters.ByEmail but as a lambda statement
+        email = email.lower()
+        stmt = sa.lambda_stmt(
+            lambda: sa.select(User).where(User.deleted_at.is_(None), sa.func.lower(User.email) == email)
+        )
+        return await self.query.one_or_none(stmt)  # type: ignore[arg-type]
 
     async def delete(self, user: User) -> None:
         user.deleted_at = sa.func.now()
         user.email = f"{uuid.uuid4()}@deleted.tld"
         await self.dbsession.flush()
+
+    async def set_last_sign_in_many(self, values: dict[int, datetime.datetime]) -> None:
+        """Update last sign in time of many users with one statement.
+        Values older than the stored ones are ignored."""
+        if not values:
+            return
+
+        new_values = sa.values(
+            sa.column("id", sa.BigInteger()),
+            sa.column("last_sign_in", sa.DateTime(timezone=True)),
+            name="new_values",
+        ).data(list(values.items()))
+        stmt = (
+            sa.update(User)
+            .where(User.id == new_values.c.id)
+            .values(last_sign_in=sa.func.greatest(User.last_sign_in, new_values.c.last_sign_in))
+            .execution_options(synchronize_session=False)
+        )
+        await self.dbsession.execute(stmt)
@@ -0,0 +1,43 @@
+import datetime
+import itertools
+import logging
+
+from redis.exceptions import RedisError
+from saq.types import Context
+
+from app.config import settings
+from app.config.database import new_dbsession
+from app.config.redis import redis
+from app.contexts.users.models import User
+from app.contexts.users.repo import UserRepo
+from app.contrib.write_behind import TimestampBuffer
+
+logger = logging.getLogger(__name__)
+
+sign_in_buffer = TimestampBuffer(redis, key=f"{settings.cache_namespace}users:last_sign_in")
+
+
+async def record_sign_in(user: User) -> None:
+    """Remember that the user has signed in.
+    The time is buffered and written by flush_sign_ins job, so logins do not lock user rows.
+    When write-behind is disabled or Redis is unavailable, the user instance is updated directly."""
+    now = datetime.datetime.now(datetime.UTC)
+    if settings.users_sign_in_write_behind:
+        try:
+            await sign_in_buffer.record(user.id, now)
+            return
+        except RedisError:
+            logger.warning("Cannot buffer sign in time, writing it directly.", exc_info=True)
+    user.last_sign_in = now
+
+
+async def flush_sign_ins(context: Context) -> None:
+    """Write buffered sign in times to the database."""
+    async with sign_in_buffer.drain() as values, new_dbsession() as dbsession:
+        repo = UserRepo(dbsession)
+        items = iter(values.items())
+        while batch := dict(itertools.islice(items, settings.users_sign_in_flush_batch_size)):
+            await repo.set_last_sign_in_many({int(user_id): value for user_id, value in batch.items()})
+        await dbsession.commit()
+    if values:
+        logger.info(f"Flushed sign in time of {len(values)} users.")
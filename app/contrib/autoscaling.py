@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import datetime
+import logging
+import math
+import time
+import typing
+
+import saq
+from saq.types import Context
+from saq.utils import now
+
+logger = logging.getLogger(__name__)
+
+
+class AutoscalingWorker(saq.Worker):
+    """saq worker whose concurrency can change while it runs, see `scale`."""
+
+    @property
+    def slots(self) -> int:
+        """Number of running job processing loops."""
+        return sum(1 for task in self.tasks if task.get_name() == "process" and not task.done())
+
+    def scale(self, concurrency: int) -> None:
+        """Start missing processing loops at once. Extra loops stop after finishing their current job,
+        a loop waiting for a job stops after it gets one."""
+        self.concurrency = concurrency
+        for _ in range(concurrency - self.slots):
+            super()._process()
+
+    def _process(self, previous_task: asyncio.Task[typing.Any] | None = None) -> None:
+        if previous_task is not None and self.slots >= self.concurrency:
+            self.tasks.discard(previous_task)
+            return
+        super()._process(previous_task)
+
+
+@dataclasses.dataclass(frozen=True)
+class ScalingDecision:
+    queue: str
+    previous: int
+    concurrency: int
+    depth: int
+    oldest_job_age: float
+    cpu: float
+
+
+class Autoscaler:
+    """Adjusts concurrency of an `AutoscalingWorker` between `min_concurrency` and `max_concurrency`.
+
+    Every `interval` it measures queue depth, wait time of the oldest queued job and CPU usage of this process:
+    - jobs wait longer than `target_wait`, or more jobs are queued than there are slots: concurrency doubles;
+    - the queue is empty: concurrency drops by a quarter;
+    - CPU usage is above `max_cpu`: concurrency never grows and drops by one,
+      the event loop is saturated and more concurrent jobs would only wait for it.
+
+    Register `startup` and `shutdown` as worker hooks. The worker starts with `min_concurrency`."""
+
+    def __init__(
+        self,
+        *,
+        min_concurrency: int,
+        max_concurrency: int,
+        interval: datetime.timedelta = datetime.timedelta(seconds=5),
+        target_wait: datetime.timedelta = datetime.timedelta(seconds=1),
+        max_cpu: float = 0.8,
+        on_decision: typing.Callable[[ScalingDecision], None] | None = None,
+    ) -> None:
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max(min_concurrency, max_concurrency)
+        self.interval = interval
+        self.target_wait = target_wait
+        self.max_cpu = max_cpu
+        self.on_decision = on_decision
+        self._cpu_sample = (time.monotonic(), time.process_time())
+        self._task: asyncio.Task[None] | None = None
+
+    def decide(self, current: int, depth: int, oldest_job_age: float, cpu: float) -> int:
+        if cpu > self.max_cpu:
+            desired = current - 1
+        elif depth > current or (depth and oldest_job_age > self.target_wait.total_seconds()):
+            desired = current * 2
+        elif depth == 0:
+            desired = current - math.ceil(current / 4)
+        else:
+            desired = current
+        return min(self.max_concurrency, max(self.min_concurrency, desired))
+
+    async def measure(self, queue: saq.Queue) -> tuple[int, float]:
+        """Return number of queued jobs and wait time of the oldest one in seconds."""
+        depth = await queue.count("queued")
+        if not depth:
+            return 0, 0.0
+        # Redis queue dequeues from the head of the list
+        job_id = await queue.redis.lindex(queue.namespace("queued"), 0)  # type: ignore[attr-defined]
+        job = queue.deserialize(await queue.redis.get(job_id)) if job_id else None  # type: ignore[attr-defined]
+        return depth, max(now() - job.queued, 0) / 1000 if job and job.queued else 0.0
+
+    def measure_cpu(self) -> float:
+        """Return share of one CPU core used by this process since the last call."""
+        wall, cpu = time.monotonic(), time.process_time()
+        previous_wall, previous_cpu = self._cpu_sample
+        self._cpu_sample = (wall, cpu)
+        return (cpu - previous_cpu) / (wall - previous_wall) if wall > previous_wall else 0.0
+
+    async def adjust(self, worker: AutoscalingWorker) -> ScalingDecision:
+        depth, oldest_job_age = await self.measure(worker.queue)
+        cpu = self.measure_cpu()
+        current = worker.concurrency
+        concurrency = self.decide(current, depth, oldest_job_age, cpu)
+        decision = ScalingDecision(worker.queue.name, current, concurrency, depth, oldest_job_age, cpu)
+        if concurrency != current:
+            logger.info(
+                f"Scaling queue {worker.queue.name} from {current} to {concurrency}.",
+                extra=dataclasses.asdict(decision),
+            )
+            worker.scale(concurrency)
+        if self.on_decision:
+            self.on_decision(decision)
+        return decision
+
+    async def run(self, worker: AutoscalingWorker) -> None:
+        while True:
+            await asyncio.sleep(self.interval.total_seconds())
+            try:
+                await self.adjust(worker)
+            except Exception:
+                logger.exception("Cannot autoscale queue.", extra={"queue": worker.queue.name})
+
+    async def startup(self, context: Context) -> None:
+        worker = context["worker"]
+        assert isinstance(worker, AutoscalingWorker), "Autoscaler requires AutoscalingWorker."
+        worker.concurrency = self.min_concurrency  # startup hooks run before the worker starts processing loops
+        self.measure_cpu()
+        self._task = asyncio.create_task(self.run(worker))
+
+    async def shutdown(self, context: Context) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
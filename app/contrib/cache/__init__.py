@@ -23,5 +23,9 @@ class Cache:
         value = await self.backend.get(self._make_key(key))
         return self.serializer.deserialize(value) if value is not None else None
 
+    async def delete(self, *keys: str) -> None:
+        if keys:
+            await self.backend.delete(*[self._make_key(key) for key in keys])
+
     def _make_key(self, key: str) -> str:
         return f"{self.namespace}:{key}" if self.namespace else key
@@ -9,3 +9,7 @@ class CacheBackend(abc.ABC):  # pragma: no cover
     @abc.abstractmethod
     async def get(self, key: str) -> bytes | None:
         pass
+
+    @abc.abstractmethod
+    async def delete(self, *keys: str) -> None:
+        pass
@@ -19,3 +19,7 @@ class MemoryCacheBackend(CacheBackend):
             del self.cache[key]
             return None
         return value
+
+    async def delete(self, *keys: str) -> None:
+        for key in keys:
+            self.cache.pop(key, None)
@@ -16,3 +16,7 @@ class RedisCacheBackend(CacheBackend):
     async def get(self, key: str) -> bytes | None:
         async with self.redis_client as conn:
             return typing.cast(bytes | None, await conn.get(key))
+
+    async def delete(self, *keys: str) -> None:
+        async with self.redis_client as conn:
+            await conn.delete(*keys)
@@ -0,0 +1,169 @@
+from __future__ import annotations
+
+import asyncio
+import dataclasses
+import datetime
+import functools
+import json
+import logging
+import math
+import os
+import random
+import socket
+import time
+import typing
+import uuid
+
+from redis.asyncio import Redis
+from saq import CronJob
+from saq.types import Context
+
+logger = logging.getLogger(__name__)
+
+type CronFunction = typing.Callable[[Context], typing.Awaitable[typing.Any]]
+
+# delete the lock only if this run still owns it, an expired lock may already belong to another run
+_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+@dataclasses.dataclass(frozen=True)
+class ScheduledJob:
+    """A function run by a cron expression.
+
+    `lock_ttl` bounds how long a run holds the lock, a lock of a crashed worker expires after it.
+    `jitter` delays the run by a random time up to that value, so jobs sharing a schedule do not start at once.
+    `timeout` bounds the run of the function and defaults to `lock_ttl`, a longer run could overlap the next one."""
+
+    function: CronFunction
+    cron: str
+    lock_ttl: datetime.timedelta = datetime.timedelta(minutes=10)
+    jitter: datetime.timedelta = datetime.timedelta(0)
+    timeout: datetime.timedelta | None = None
+    enabled: bool = True
+
+    @property
+    def name(self) -> str:
+        return self.function.__qualname__
+
+    @property
+    def job_timeout(self) -> int:
+        """Timeout of the saq job in seconds, the job sleeps for the jitter before running the function."""
+        return math.ceil((self.jitter + (self.timeout or self.lock_ttl)).total_seconds())
+
+
+@dataclasses.dataclass(frozen=True)
+class CronRun:
+    name: str
+    status: typing.Literal["ok", "failed", "skipped"]
+    started_at: datetime.datetime
+    duration: float
+    host: str
+    error: str = ""
+
+
+class CronRegistry:
+    """Scheduled jobs with distributed locks and run history.
+
+    saq workers enqueue cron jobs under a fixed job key, but a run that overlaps the next tick,
+    or workers serving the same queue under different names, could still run a job twice.
+    Every run takes a Redis lock first and is skipped when another run holds it.
+    The last `history_size` runs of each job are kept in Redis, see `history`.
+
+    Pass `cron_jobs` to the worker settings of a single queue."""
+
+    def __init__(self, redis: Redis, *, namespace: str = "cron", history_size: int = 50) -> None:
+        self.redis = redis
+        self.namespace = namespace
+        self.history_size = history_size
+        self.jobs: dict[str, ScheduledJob] = {}
+
+    def add(self, function: CronFunction, cron: str, **options: typing.Any) -> ScheduledJob:
+        job = ScheduledJob(function, cron, **options)
+        self.jobs[job.name] = job
+        return job
+
+    def register(self, cron: str, **options: typing.Any) -> typing.Callable[[CronFunction], CronFunction]:
+        """Decorator form of `add`."""
+
+        def decorator(function: CronFunction) -> CronFunction:
+            self.add(function, cron, **options)
+            return function
+
+        return decorator
+
+    @property
+    def cron_jobs(self) -> list[CronJob]:
+        return [
+            CronJob(self._wrap(job), cron=job.cron, timeout=job.job_timeout)
+            for job in self.jobs.values()
+            if job.enabled
+        ]
+
+    async def run(self, job: ScheduledJob, context: Context) -> CronRun:
+        """Run the job unless another run holds its lock, and record the run."""
+        if job.jitter:
+            await asyncio.sleep(random.uniform(0, job.jitter.total_seconds()))
+
+        lock_key, token = self._key("lock", job.name), uuid.uuid4().hex
+        started_at = datetime.datetime.now(datetime.UTC)
+        started = time.perf_counter()
+        lock_ttl = int(job.lock_ttl.total_seconds() * 1000)
+        if not await self.redis.set(lock_key, token, nx=True, px=lock_ttl):
+            logger.info(f"Cron job {job.name} is running elsewhere, skipping.", extra={"cron_job": job.name})
+            return await self._record(job, "skipped", started_at, 0)
+
+        try:
+            await job.function(context)
+        except (Exception, asyncio.CancelledError) as ex:  # saq cancels jobs running past their timeout
+            await self._record(job, "failed", started_at, time.perf_counter() - started, repr(ex))
+            raise
+        finally:
+            await typing.cast(typing.Awaitable[int], self.redis.eval(_RELEASE_SCRIPT, 1, lock_key, token))
+        return await self._record(job, "ok", started_at, time.perf_counter() - started)
+
+    async def history(self, name: str, limit: int | None = None) -> list[CronRun]:
+        """Return recent runs of the job, newest first."""
+        items = await typing.cast(
+            typing.Awaitable[list[bytes]],
+            self.redis.lrange(self._key("history", name), 0, (limit or self.history_size) - 1),
+        )
+        return [self._load_run(item) for item in items]
+
+    async def _record(
+        self, job: ScheduledJob, status: str, started_at: datetime.datetime, duration: float, error: str = ""
+    ) -> CronRun:
+        run = CronRun(
+            name=job.name,
+            status=status,  # type: ignore[arg-type]
+            started_at=started_at,
+            duration=duration,
+            host=f"{socket.gethostname()}:{os.getpid()}",
+            error=error,
+        )
+        key = self._key("history", job.name)
+        data = {**dataclasses.asdict(run), "started_at": started_at.isoformat()}
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.lpush(key, json.dumps(data))
+            pipe.ltrim(key, 0, self.history_size - 1)
+            await pipe.execute()
+        return run
+
+    def _load_run(self, item: bytes | str) -> CronRun:
+        data = json.loads(item)
+        return CronRun(**{**data, "started_at": datetime.datetime.fromisoformat(data["started_at"])})
+
+    def _wrap(self, job: ScheduledJob) -> CronFunction:
+        # saq keys cron jobs by function name, the wrapper keeps the name of the job function
+        @functools.wraps(job.function)
+        async def run_scheduled(context: Context) -> None:
+            await self.run(job, context)
+
+        return run_scheduled
+
+    def _key(self, kind: str, name: str) -> str:
+        return f"{self.namespace}:{kind}:{name}"
@@ -1,61 +1,301 @@
+import contextlib
+import contextvars
+import dataclasses
+import datetime
+import functools
+import itertools
 import logging
 import time
 import typing
 
 import anyio
 import saq
-from pydantic import BaseModel
+import sqlalchemy as sa
+from pydantic import BaseModel, TypeAdapter
 from saq.types import Context
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, SessionTransaction
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+from app.contrib.lazy_session import mark_uncommitted_writes
+from app.contrib.queues import claim_key, enqueue_many
+
+logger = logging.getLogger(__name__)
 
 type EventHandler = typing.Callable[[Event], typing.Awaitable[None]]
-type Subscribers = dict[type[Event], list[EventHandler]]
+type Subscribers = dict[type[Event], list[EventHandler | Subscriber]]
 
 
 class TaskCallback(typing.Protocol):
-    def __call__(self, ctx: Context, *, envelope: dict[str, typing.Any]) -> typing.Awaitable[None]: ...
+    def __call__(
+        self,
+        ctx: Context,
+        *,
+        envelope: dict[str, typing.Any] | None = None,
+        batch: dict[str, typing.Any] | None = None,
+    ) -> typing.Awaitable[None]: ...
+
+
+def handler_name(handler: EventHandler) -> str:
+    return f"{handler.__module__}:{getattr(handler, '__qualname__', type(handler).__name__)}"
+
+
+@dataclasses.dataclass(frozen=True)
+class Subscriber:
+    """Event handler with its delivery options.
+
+    The options apply when the dispatcher fans events out into one job per subscriber:
+    the job goes to `queue` (the dispatcher queue by default, the queue must be served by a worker)
+    and uses its own `timeout` and retry policy, so a slow or failing handler does not affect the others."""
+
+    handler: EventHandler
+    queue: str | None = None
+    timeout: int | None = None
+    retries: int | None = None
+    retry_delay: float | None = None
+    retry_backoff: bool | float | None = None
+
+    @property
+    def name(self) -> str:
+        return handler_name(self.handler)
+
+    def job_options(self) -> dict[str, typing.Any]:
+        options = {
+            "timeout": self.timeout,
+            "retries": self.retries,
+            "retry_delay": self.retry_delay,
+            "retry_backoff": self.retry_backoff,
+        }
+        return {key: value for key, value in options.items() if value is not None}
+
+
+class HandlerCallback(typing.Protocol):
+    """Called after every event handler call with event type, handler name, elapsed seconds and raised error."""
+
+    def __call__(self, event: str, handler: str, elapsed: float, error: BaseException | None) -> None: ...
+
+
+class OutboxFactory(typing.Protocol):
+    """Build an ORM instance holding a task queue job, see `EventDispatcher.emit`."""
+
+    def __call__(self, *, function: str, kwargs: dict[str, typing.Any]) -> typing.Any: ...
 
 
 class Event(BaseModel):
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kwargs: typing.Any) -> None:
+        super().__pydantic_init_subclass__(**kwargs)
+        event_registry.register(cls)
+
     @classmethod
     def event_type(cls) -> str:
         return f"{cls.__module__}:{cls.__name__}"
 
 
-T = typing.TypeVar("T", bound=Event)
+WIRE_VERSION = 1
+
+
+class EventRegistry:
+    """Event classes by type name, with validators and serializers built once per class.
+
+    Wire format (version 1) of a single event is `{"t": <event type>, "d": <event data>}`,
+    events emitted with a dedupe key also carry `"k": <key>` and `"w": <window in seconds>`,
+    jobs carry `{"v": 1, **event}` or `{"v": 1, "events": [event, ...]}` for batches.
+    The unversioned format (`{"type": ..., "event": ...}`) of jobs queued by older releases is still accepted."""
+
+    def __init__(self) -> None:
+        self._types: dict[str, type[Event]] = {}
+        self._adapters: dict[type[Event], TypeAdapter[Event]] = {}
+
+    def register(self, event_class: type[Event]) -> None:
+        self._types[event_class.event_type()] = event_class
+
+    def get(self, event_type: str) -> type[Event] | None:
+        return self._types.get(event_type)
+
+    def adapter(self, event_class: type[Event]) -> TypeAdapter[Event]:
+        if (adapter := self._adapters.get(event_class)) is None:
+            adapter = self._adapters[event_class] = TypeAdapter(event_class)
+        return adapter
+
+    def encode(self, event: Event) -> dict[str, typing.Any]:
+        return {"t": event.event_type(), "d": self.adapter(type(event)).dump_python(event, mode="json")}
+
+    def resolve(self, item: dict[str, typing.Any]) -> type[Event] | None:
+        """Return the class of an encoded event, or None when its type is not known (removed or renamed class)."""
+        event_type = item["t"] if "t" in item else item["type"]
+        if (event_class := self.get(event_type)) is None:
+            logger.warning(f"Unknown event type {event_type}, skipping.", extra={"event": event_type})
+        return event_class
 
+    def decode(self, item: dict[str, typing.Any]) -> Event | None:
+        if (event_class := self.resolve(item)) is None:
+            return None
+        return self.adapter(event_class).validate_python(item["d"] if "t" in item else item["event"])
 
-class Envelope(BaseModel, typing.Generic[T]):
-    type: str
-    event: T
+    def unpack(
+        self, envelope: dict[str, typing.Any] | None, batch: dict[str, typing.Any] | None
+    ) -> list[dict[str, typing.Any]]:
+        """Return encoded events carried by a job."""
+        payload = batch or envelope or {}
+        if payload.get("v", 0) > WIRE_VERSION:
+            raise ValueError(f"Unsupported event wire format version {payload['v']}.")
+        if batch:
+            return list(batch["events"])
+        return [{key: value for key, value in envelope.items() if key != "v"}] if envelope else []
 
 
+event_registry = EventRegistry()
+
 TASK_NAME = "dispatch_event"
-logger = logging.getLogger(__name__)
+HANDLER_TASK_NAME = "handle_event"
+
+_PENDING_KEY = "events.pending"
+_coalesced: contextvars.ContextVar[list[dict[str, typing.Any]] | None] = contextvars.ContextVar(
+    "events.coalesced", default=None
+)
+
+
+def _chunks(items: typing.Iterable[typing.Any], size: int) -> typing.Iterator[list[typing.Any]]:
+    iterator = iter(items)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+@sa.event.listens_for(Session, "before_commit")
+def _write_pending_events(session: Session) -> None:
+    pending: dict[EventDispatcher, list[dict[str, typing.Any]]] = session.info.pop(_PENDING_KEY, {})
+    for dispatcher, envelopes in pending.items():
+        for job_kwargs in dispatcher._build_jobs(envelopes):
+            session.add(dispatcher._outbox(function=TASK_NAME, kwargs=job_kwargs))  # type: ignore[misc]
+
+
+@sa.event.listens_for(Session, "after_soft_rollback")
+def _discard_pending_events(session: Session, previous_transaction: SessionTransaction) -> None:
+    if not previous_transaction.nested:  # events emitted before a rolled back savepoint still belong to the transaction
+        session.info.pop(_PENDING_KEY, None)
 
 
 class EventDispatcher:
-    def __init__(self, task_queue_url: str, subscribers: Subscribers, sync: bool = False) -> None:
+    def __init__(
+        self,
+        task_queue_url: str,
+        subscribers: Subscribers,
+        sync: bool = False,
+        outbox: OutboxFactory | None = None,
+        max_batch_size: int = 100,
+        fan_out: bool = False,
+        registry: EventRegistry = event_registry,
+        on_handled: HandlerCallback | None = None,
+    ) -> None:
+        self._task_queue_url = task_queue_url
         self._task_queue = saq.Queue.from_url(task_queue_url)
+        self._queues: dict[str, saq.Queue] = {}
         self._sync = sync
-        self._event_handlers = subscribers
-        self._event_type_map: dict[str, type[Event]] = {
-            event.event_type(): event for event in self._event_handlers.keys()
+        self._outbox = outbox
+        self._max_batch_size = max_batch_size
+        self._fan_out = fan_out
+        self._event_handlers: dict[type[Event], list[Subscriber]] = {
+            event: [
+                subscriber if isinstance(subscriber, Subscriber) else Subscriber(subscriber)
+                for subscriber in event_subscribers
+            ]
+            for event, event_subscribers in subscribers.items()
         }
+        self._registry = registry
+        self._on_handled = on_handled
+        for event_class in self._event_handlers:
+            registry.register(event_class)
+
+    async def emit(
+        self,
+        event: Event,
+        *,
+        dbsession: AsyncSession | None = None,
+        dedupe_key: str | None = None,
+        dedupe_window: datetime.timedelta = datetime.timedelta(hours=1),
+    ) -> None:
+        """Send the event to subscribers. See `emit_many`.
+
+        Events emitted with the same `dedupe_key`, like "invite-sent:42", reach subscribers once per `dedupe_window`,
+        the worker drops later ones. A key is released when handling the event fails, so retries are not dropped."""
+        if self._sync or dedupe_key is None:
+            await self.emit_many([event], dbsession=dbsession)
+            return
+        item = {**self._registry.encode(event), "k": dedupe_key, "w": int(dedupe_window.total_seconds())}
+        await self._send([item], dbsession=dbsession)
+
+    async def emit_many(self, events: typing.Sequence[Event], *, dbsession: AsyncSession | None = None) -> None:
+        """Send events to subscribers, up to `max_batch_size` events travel in one job.
+
+        When `dbsession` is given and the dispatcher has an outbox, events are stored by the same transaction
+        as the state change: all events emitted with the session are written to the outbox on commit,
+        the outbox relay enqueues them later. Rolled back transactions discard their events.
+        Otherwise, events are enqueued immediately, or at the end of the `coalesce` block."""
+        if not events:
+            return
 
-    async def emit(self, event: Event) -> None:
         if self._sync:
-            await self.dispatch(event)
+            for event in events:
+                await self.dispatch(event)
             return
 
-        envelope = Envelope(type=event.event_type(), event=event)
-        await self._task_queue.enqueue(TASK_NAME, envelope=envelope.model_dump())
+        await self._send([self._registry.encode(event) for event in events], dbsession=dbsession)
+
+    async def _send(self, items: list[dict[str, typing.Any]], *, dbsession: AsyncSession | None) -> None:
+        if dbsession is not None and self._outbox is not None:
+            session = dbsession.sync_session
+            if not session.in_transaction():
+                session.begin()  # rollback of a session without a transaction emits no events to discard pending ones
+            pending = session.info.setdefault(_PENDING_KEY, {})
+            pending.setdefault(self, []).extend(items)
+            mark_uncommitted_writes(session)  # the events are written to the outbox by the commit
+            return
+
+        if (coalesced := _coalesced.get()) is not None:
+            coalesced.extend(items)
+            return
+
+        for job_kwargs in self._build_jobs(items):
+            # a queued job of a keyed event absorbs its duplicates before the worker sees them
+            job_options = {"key": f"event:{key}"} if (key := job_kwargs.get("envelope", {}).get("k")) else {}
+            await self._task_queue.enqueue(TASK_NAME, **job_options, **job_kwargs)
+
+    @contextlib.asynccontextmanager
+    async def coalesce(self) -> typing.AsyncGenerator[None, None]:
+        """Collect events emitted without a database session within the block and enqueue them in batches
+        when the block exits. Like events sent right away, they are enqueued even if the block raises,
+        as they are not bound to a transaction that could roll back."""
+        items: list[dict[str, typing.Any]] = []
+        token = _coalesced.set(items)
+        try:
+            yield
+        finally:
+            _coalesced.reset(token)
+            if items:
+                with anyio.CancelScope(shield=True):
+                    await self._send(items, dbsession=None)
+
+    def _build_jobs(self, items: typing.Sequence[dict[str, typing.Any]]) -> typing.Iterator[dict[str, typing.Any]]:
+        """Return keyword arguments of jobs delivering encoded events, a single event is sent without a batch."""
+        if len(items) == 1:
+            yield {"envelope": {"v": WIRE_VERSION, **items[0]}}
+            return
+        for chunk in _chunks(items, self._max_batch_size):
+            yield {"batch": {"v": WIRE_VERSION, "events": chunk}}
 
     async def call_handler(self, event: Event, handler: EventHandler) -> None:
         start_time = time.time()
+        error: BaseException | None = None
         try:
             await handler(event)
+        except BaseException as ex:
+            error = ex
+            raise
         finally:
             elapsed_time = time.time() - start_time
+            if self._on_handled:
+                self._on_handled(event.event_type(), handler_name(handler), elapsed_time, error)
             logger.info(
                 f"event {event.event_type()} handled in {elapsed_time:.2f} seconds.",
                 extra={
@@ -76,18 +316,120 @@ class EventDispatcher:
             },
         )
         if len(handlers) == 1:
-            await self.call_handler(event, handlers[0])
+            await self.call_handler(event, handlers[0].handler)
             return
 
         async with anyio.create_task_group() as tg:
-            for handler in handlers:
-                tg.start_soon(self.call_handler, event, handler)
+            for subscriber in handlers:
+                tg.start_soon(self.call_handler, event, subscriber.handler)
+
+    async def task_handler(
+        self,
+        ctx: Context,
+        *,
+        envelope: dict[str, typing.Any] | None = None,
+        batch: dict[str, typing.Any] | None = None,
+    ) -> None:
+        items = [item for item in self._registry.unpack(envelope, batch) if await self._claim(item)]
+        handled = 0
+        try:
+            if self._fan_out:
+                await self.fan_out(ctx, items)
+                return
+
+            for item in items:
+                if event := self._registry.decode(item):
+                    await self.dispatch(event)
+                handled += 1
+        except BaseException:
+            await self._release(items[handled:])
+            raise
 
-    async def task_handler(self, ctx: Context, *, envelope: dict[str, typing.Any]) -> None:
-        event_class = self._event_type_map[envelope["type"]]
-        event = event_class(**envelope["event"])
-        await self.dispatch(event)
+    async def _claim(self, item: dict[str, typing.Any]) -> bool:
+        """Return False when an event with the same dedupe key was delivered within the dedupe window."""
+        if not (key := item.get("k")):
+            return True
+        if await claim_key(self._task_queue.redis, self._dedupe_key(key), datetime.timedelta(seconds=item["w"])):  # type: ignore[attr-defined]
+            return True
+        logger.info(f"Skipping duplicate event {item['t']}.", extra={"event": item["t"], "dedupe_key": key})
+        return False
+
+    async def _release(self, items: typing.Sequence[dict[str, typing.Any]]) -> None:
+        if keys := [self._dedupe_key(item["k"]) for item in items if item.get("k")]:
+            await self._task_queue.redis.delete(*keys)  # type: ignore[attr-defined]
+
+    def _dedupe_key(self, key: str) -> str:
+        return typing.cast(str, self._task_queue.namespace(f"dedupe:event:{key}"))  # type: ignore[attr-defined]
+
+    async def fan_out(self, ctx: Context, items: typing.Sequence[dict[str, typing.Any]]) -> None:
+        """Enqueue one job per subscriber, each carrying events the subscriber handles.
+        Job keys derive from the dispatching job, a retried dispatch does not enqueue handlers twice."""
+        per_subscriber: dict[Subscriber, list[dict[str, typing.Any]]] = {}
+        for item in items:
+            if (event_class := self._registry.resolve(item)) is None:
+                continue
+            for subscriber in self._event_handlers.get(event_class, []):
+                per_subscriber.setdefault(subscriber, []).append(item)
+
+        dispatch_job = ctx.get("job")
+        per_queue: dict[str | None, list[saq.Job]] = {}
+        for subscriber, events in per_subscriber.items():
+            job = saq.Job(
+                function=HANDLER_TASK_NAME,
+                kwargs={"handler": subscriber.name, "batch": {"v": WIRE_VERSION, "events": events}},
+                **subscriber.job_options(),
+            )
+            if dispatch_job:
+                job.key = f"{dispatch_job.key}:{subscriber.name}"
+            per_queue.setdefault(subscriber.queue, []).append(job)
+
+        for queue_name, jobs in per_queue.items():
+            await enqueue_many(self._get_queue(queue_name), jobs)
+
+    async def handler_task_handler(self, ctx: Context, *, handler: str, batch: dict[str, typing.Any]) -> None:
+        """Run a single subscriber for events fanned out by `fan_out`."""
+        if (subscriber := self._subscribers_by_name.get(handler)) is None:
+            logger.warning(f"Unknown event handler {handler}, skipping.", extra={"handler": handler})
+            return
+        for item in self._registry.unpack(None, batch):
+            if event := self._registry.decode(item):
+                await self.call_handler(event, subscriber.handler)
+
+    def _get_queue(self, name: str | None) -> saq.Queue:
+        if name is None:
+            return self._task_queue
+        if name not in self._queues:
+            self._queues[name] = saq.Queue.from_url(self._task_queue_url, name=name)
+        return self._queues[name]
+
+    @functools.cached_property
+    def _subscribers_by_name(self) -> dict[str, Subscriber]:
+        return {
+            subscriber.name: subscriber for subscribers in self._event_handlers.values() for subscriber in subscribers
+        }
 
     @property
     def task(self) -> tuple[str, TaskCallback]:
         return TASK_NAME, self.task_handler
+
+    @property
+    def tasks(self) -> list[tuple[str, typing.Callable[..., typing.Awaitable[None]]]]:
+        """Queue functions to register in workers: the dispatcher and the per subscriber handler task."""
+        return [self.task, (HANDLER_TASK_NAME, self.handler_task_handler)]
+
+
+class EventCoalescingMiddleware:
+    """Enqueue events emitted during the request in batches after the response has been sent.
+    Events are enqueued when the application returns, that is after background tasks have completed."""
+
+    def __init__(self, app: ASGIApp, dispatcher: EventDispatcher) -> None:
+        self.app = app
+        self.dispatcher = dispatcher
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        async with self.dispatcher.coalesce():
+            await self.app(scope, receive, send)
@@ -0,0 +1,64 @@
+import csv
+import datetime
+import io
+import json
+import typing
+
+from starlette.responses import StreamingResponse
+
+ExportFormat = typing.Literal["csv", "jsonl"]
+Row = dict[str, typing.Any]
+
+_media_types: dict[ExportFormat, str] = {
+    "csv": "text/csv; charset=utf-8",
+    "jsonl": "application/jsonl; charset=utf-8",
+}
+
+
+def _json_default(value: typing.Any) -> typing.Any:
+    if isinstance(value, datetime.datetime | datetime.date):
+        return value.isoformat()
+    return str(value)
+
+
+async def iter_csv(
+    columns: typing.Sequence[str], rows: typing.AsyncIterable[Row], chunk_size: int = 64 * 1024
+) -> typing.AsyncGenerator[str, None]:
+    """Encode rows as CSV, yielding chunks of about `chunk_size` characters."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+    writer.writeheader()
+    async for row in rows:
+        writer.writerow(row)
+        if buffer.tell() >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+async def iter_jsonl(rows: typing.AsyncIterable[Row], chunk_size: int = 64 * 1024) -> typing.AsyncGenerator[str, None]:
+    """Encode rows as JSON lines, yielding chunks of about `chunk_size` characters."""
+    chunk: list[str] = []
+    size = 0
+    async for row in rows:
+        line = json.dumps(row, default=_json_default, ensure_ascii=False) + "\n"
+        chunk.append(line)
+        size += len(line)
+        if size >= chunk_size:
+            yield "".join(chunk)
+            chunk, size = [], 0
+    yield "".join(chunk)
+
+
+def export_response(
+    rows: typing.AsyncIterable[Row], *, columns: typing.Sequence[str], filename: str, export_format: ExportFormat
+) -> StreamingResponse:
+    """Stream rows as a downloadable file. Rows are encoded while they are fetched,
+    memory use does not depend on the number of rows."""
+    content = iter_csv(columns, rows) if export_format == "csv" else iter_jsonl(rows)
+    return StreamingResponse(
+        content,
+        media_type=_media_types[export_format],
+        headers={"content-disposition": f'attachment; filename="{filename}.{export_format}"'},
+    )
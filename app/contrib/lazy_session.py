@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import typing
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import ORMExecuteState, Session
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+_UNCOMMITTED_WRITES_KEY = "lazy_session.uncommitted_writes"
+
+
+def mark_uncommitted_writes(session: Session) -> None:
+    """Keep the transaction open on response start, for writes the session cannot see, like pending outbox events."""
+    session.info[_UNCOMMITTED_WRITES_KEY] = True
+
+
+@sa.event.listens_for(Session, "after_flush")
+def _on_flush(session: Session, flush_context: typing.Any) -> None:
+    mark_uncommitted_writes(session)
+
+
+@sa.event.listens_for(Session, "do_orm_execute")
+def _on_execute(orm_execute_state: ORMExecuteState) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        mark_uncommitted_writes(orm_execute_state.session)
+
+
+@sa.event.listens_for(Session, "after_commit")
+@sa.event.listens_for(Session, "after_rollback")
+def _on_transaction_end(session: Session) -> None:
+    session.info.pop(_UNCOMMITTED_WRITES_KEY, None)
+
+
+class LazySession:
+    """AsyncSession proxy that creates the session on first attribute access.
+    Requests that never touch the database do not create a session at all.
+    Note, the session itself checks out a connection only when the first statement is executed."""
+
+    def __init__(self, session_factory: typing.Callable[[], AsyncSession]) -> None:
+        self._session_factory = session_factory
+        self._session: AsyncSession | None = None
+
+    @property
+    def started(self) -> bool:
+        return self._session is not None
+
+    def get_session(self) -> AsyncSession:
+        if self._session is None:
+            self._session = self._session_factory()
+        return self._session
+
+    async def release(self) -> None:
+        """Return the connection to the pool if the current transaction has only read data.
+        The read-only transaction is committed (it is a no-op for the database) so loaded objects stay usable,
+        later statements check out a connection again. Transactions with uncommitted writes are left intact."""
+        session = self._session
+        if session is None or not session.in_transaction():
+            return
+        if session.sync_session.info.get(_UNCOMMITTED_WRITES_KEY) or session.new or session.dirty or session.deleted:
+            return
+        await session.commit()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+    def __getattr__(self, name: str) -> typing.Any:
+        return getattr(self.get_session(), name)
+
+    def __repr__(self) -> str:
+        return f"<LazySession: started={self.started}>"
+
+
+class LazyDbSessionMiddleware:
+    """Put a lazily created database session into the request state.
+
+    The connection is returned to the pool when the response starts, unless the transaction has pending writes,
+    so the connection is not held while the response body is streamed or background tasks run.
+    Uncommitted writes are rolled back when the request ends."""
+
+    def __init__(
+        self, app: ASGIApp, session_factory: typing.Callable[[], AsyncSession], key: str = "dbsession"
+    ) -> None:
+        self.app = app
+        self.key = key
+        self.session_factory = session_factory
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        dbsession = LazySession(self.session_factory)
+        scope.setdefault("state", {})
+        scope["state"][self.key] = dbsession
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                await dbsession.release()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            await dbsession.close()
@@ -0,0 +1,57 @@
+from __future__ import annotations
+
+import dataclasses
+import decimal
+import typing
+
+import sqlalchemy as sa
+from sqlalchemy import orm
+
+_CENTS = decimal.Decimal(100)
+
+
+@dataclasses.dataclass(frozen=True, slots=True)
+class Money:
+    """Amount in minor units (cents) with lowercase ISO 4217 currency code, like Stripe returns them.
+
+    Arithmetic stays in integers, Decimal is built only when the amount is displayed.
+    Currencies are assumed to have two decimal places."""
+
+    cents: int
+    currency: str
+
+    @classmethod
+    def from_amount(cls, amount: decimal.Decimal | int | str, currency: str) -> Money:
+        cents = (decimal.Decimal(amount) * _CENTS).to_integral_value(decimal.ROUND_HALF_UP)
+        return cls(int(cents), currency.lower())
+
+    @property
+    def amount(self) -> decimal.Decimal:
+        return decimal.Decimal(self.cents).scaleb(-2)
+
+    def __add__(self, other: Money) -> Money:
+        if not isinstance(other, Money):
+            return NotImplemented
+        if other.currency != self.currency:
+            raise ValueError(f"Cannot add {other.currency} to {self.currency}.")
+        return Money(self.cents + other.cents, self.currency)
+
+    def __str__(self) -> str:
+        return f"{self.amount} {self.currency.upper()}"
+
+
+def sum_by_currency(
+    cents_column: sa.ColumnElement[int] | orm.InstrumentedAttribute[int],
+    currency_column: sa.ColumnElement[str] | orm.InstrumentedAttribute[str],
+) -> sa.Select[tuple[str, int]]:
+    """Build a statement that sums amounts per currency in the database.
+    Add filters with `.where()`, then pass result rows to `totals_from_rows`."""
+    return (
+        sa.select(currency_column, sa.func.coalesce(sa.func.sum(cents_column), 0).cast(sa.BigInteger))
+        .group_by(currency_column)
+        .order_by(currency_column)
+    )
+
+
+def totals_from_rows(rows: typing.Iterable[typing.Sequence[typing.Any]]) -> dict[str, Money]:
+    return {currency: Money(int(cents), currency) for currency, cents in rows}
@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import datetime
+import decimal
+import hashlib
+import json
+import typing
+import uuid
+
+import itsdangerous
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import InstrumentedAttribute
+from starlette_sqlalchemy import Page, PageNumberPaginator, Paginator, query
+from starlette_sqlalchemy.pagination import BaseStyle
+
+from app.contrib.cache import Cache
+
+T = typing.TypeVar("T")
+Direction = typing.Literal["next", "previous"]
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a cursor cannot be decoded or does not match the keyset."""
+
+
+class CountedPage(Page[T]):
+    """A page which total row count may be a planner estimate rather than an exact value."""
+
+    def __init__(
+        self,
+        items: typing.Sequence[T],
+        total: int,
+        page: int,
+        page_size: int,
+        style: BaseStyle | None = None,
+        total_is_approximate: bool = False,
+    ) -> None:
+        super().__init__(items=items, total=total, page=page, page_size=page_size, style=style)
+        self.total_is_approximate = total_is_approximate
+
+
+class CursorPage(typing.Generic[T]):
+    """A page of a keyset-paginated result.
+    Unlike `Page`, it does not know its position in the row set, only how to move to the neighbour pages."""
+
+    def __init__(
+        self,
+        items: typing.Sequence[T],
+        page_size: int,
+        next_cursor: str | None = None,
+        previous_cursor: str | None = None,
+        total: int | None = None,
+    ) -> None:
+        self.rows = items
+        self.page_size = page_size
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.total = total
+
+    @property
+    def has_next(self) -> bool:
+        """Test if the next page is available."""
+        return self.next_cursor is not None
+
+    @property
+    def has_previous(self) -> bool:
+        """Test if the previous page is available."""
+        return self.previous_cursor is not None
+
+    @property
+    def has_other(self) -> bool:
+        """Test if page has next or previous pages."""
+        return self.has_next or self.has_previous
+
+    def __iter__(self) -> typing.Iterator[T]:
+        return iter(self.rows)
+
+    def __getitem__(self, item: int) -> T:
+        return self.rows[item]
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __bool__(self) -> bool:
+        return len(self.rows) > 0
+
+    def __repr__(self) -> str:
+        return f"<CursorPage: rows={len(self.rows)}, has_next={self.has_next}, has_previous={self.has_previous}>"
+
+
+def _dump_value(value: typing.Any) -> typing.Any:
+    if isinstance(value, datetime.datetime | datetime.date):
+        return value.isoformat()
+    if isinstance(value, decimal.Decimal | uuid.UUID):
+        return str(value)
+    return value
+
+
+def _load_value(column: InstrumentedAttribute[typing.Any], value: typing.Any) -> typing.Any:
+    python_type = column.type.python_type
+    if python_type is datetime.datetime:
+        return datetime.datetime.fromisoformat(value)
+    if python_type is datetime.date:
+        return datetime.date.fromisoformat(value)
+    if python_type in (decimal.Decimal, uuid.UUID):
+        return python_type(value)
+    return value
+
+
+class CursorPaginator(Paginator):
+    """Keyset paginator.
+
+    Instead of OFFSET it filters rows by the values of the ordering columns of the last seen row,
+    so every page costs the same regardless of its depth. The keyset must be unique,
+    add the primary key as the last column when ordering by non-unique columns.
+
+    Cursors are signed with the secret key, clients cannot forge them to read arbitrary ranges."""
+
+    def __init__(self, dbsession: AsyncSession, secret_key: str, salt: str = "pagination.cursor") -> None:
+        super().__init__(dbsession)
+        self.serializer = itsdangerous.URLSafeSerializer(secret_key, salt=salt)
+
+    def encode_cursor(
+        self, keyset: typing.Sequence[InstrumentedAttribute[typing.Any]], row: typing.Any, direction: Direction
+    ) -> str:
+        values = [_dump_value(getattr(row, column.key)) for column in keyset]
+        return self.serializer.dumps([direction, values])
+
+    def decode_cursor(
+        self, keyset: typing.Sequence[InstrumentedAttribute[typing.Any]], cursor: str
+    ) -> tuple[Direction, list[typing.Any]]:
+        """Decode and verify cursor.
+        :raises InvalidCursorError"""
+        try:
+            direction, values = self.serializer.loads(cursor)
+        except (itsdangerous.BadData, TypeError, ValueError) as ex:
+            raise InvalidCursorError("Invalid cursor.") from ex
+
+        if direction not in ("next", "previous") or len(values) != len(keyset):
+            raise InvalidCursorError("Cursor does not match the keyset.")
+
+        try:
+            return direction, [_load_value(column, value) for column, value in zip(keyset, values)]
+        except (TypeError, ValueError) as ex:
+            raise InvalidCursorError("Invalid cursor.") from ex
+
+    async def paginate(
+        self,
+        stmt: sa.Select[tuple[T]],
+        keyset: typing.Sequence[InstrumentedAttribute[typing.Any]],
+        *,
+        cursor: str | None = None,
+        page_size: int = 50,
+        with_total: bool = False,
+    ) -> CursorPage[T]:
+        """Return a page of rows following (or preceding) the row encoded in the cursor.
+        The statement ordering is replaced by the keyset columns, in ascending order.
+        Invalid cursors are ignored and the first page is returned.
+
+        Total row count is not computed unless `with_total` is set because it costs a full scan."""
+        direction: Direction = "next"
+        values: list[typing.Any] = []
+        if cursor:
+            try:
+                direction, values = self.decode_cursor(keyset, cursor)
+            except InvalidCursorError:
+                direction, values = "next", []
+
+        total = await query(self.dbsession).count(stmt) if with_total else None
+
+        keys = sa.tuple_(*keyset)
+        if direction == "next":
+            stmt = stmt.order_by(None).order_by(*keyset)
+            if values:
+                stmt = stmt.where(keys > sa.tuple_(*values))
+        else:
+            stmt = stmt.order_by(None).order_by(*[column.desc() for column in keyset])
+            stmt = stmt.where(keys < sa.tuple_(*values))
+
+        # fetch one extra row to learn if there is more data beyond this page
+        rows = list(await query(self.dbsession).all(stmt.limit(page_size + 1)))
+        has_more = len(rows) > page_size
+        rows = rows[:page_size]
+        if direction == "previous":
+            rows.reverse()
+
+        next_cursor: str | None = None
+        previous_cursor: str | None = None
+        if rows:
+            if direction == "previous" or has_more:
+                next_cursor = self.encode_cursor(keyset, rows[-1], "next")
+            if (direction == "next" and values) or (direction == "previous" and has_more):
+                previous_cursor = self.encode_cursor(keyset, rows[0], "previous")
+
+        return CursorPage(
+            items=rows,
+            page_size=page_size,
+            next_cursor=next_cursor,
+            previous_cursor=previous_cursor,
+            total=total,
+        )
+
+
+class EstimatedCountPaginator(PageNumberPaginator):
+    """Page number paginator that avoids exact COUNT(*) on large row sets.
+
+    The row count is taken from the PostgreSQL planner estimate (EXPLAIN) first.
+    When the estimate is above `threshold` it is used as is and the page is marked as approximate,
+    otherwise the exact count is computed. Exact counts are cached under `cache_key` for `cache_ttl`,
+    by statement filter, the owner of the key is responsible for deleting it when rows are inserted or deleted.
+    A count below `threshold` is also remembered for `estimate_ttl`, until then EXPLAIN is skipped for the filter."""
+
+    def __init__(
+        self,
+        dbsession: AsyncSession,
+        *,
+        threshold: int = 10_000,
+        cache: Cache | None = None,
+        cache_key: str = "",
+        cache_ttl: datetime.timedelta | int = 30,
+        estimate_ttl: datetime.timedelta | int = 3600,
+    ) -> None:
+        super().__init__(dbsession)
+        self.threshold = threshold
+        self.cache = cache
+        self.cache_key = cache_key
+        self.cache_ttl = cache_ttl
+        self.estimate_ttl = estimate_ttl
+
+    async def paginate(
+        self, stmt: sa.Select[tuple[T]], page: int, page_size: int, style: BaseStyle | None = None
+    ) -> CountedPage[T]:
+        total_rows, is_approximate = await self.count_rows(stmt)
+        stmt = stmt.limit(page_size).offset((page - 1) * page_size)
+        rows = await query(self.dbsession).all(stmt)
+        return CountedPage(
+            items=list(rows),
+            total=total_rows,
+            page=page,
+            page_size=page_size,
+            style=style,
+            total_is_approximate=is_approximate,
+        )
+
+    async def count_rows(self, stmt: sa.Select[tuple[T]]) -> tuple[int, bool]:
+        """Return row count and a flag telling whether the count is an estimate."""
+        cache = self.cache if self.cache_key else None
+        filter_key = self.filter_key(stmt)
+        counts: dict[str, int] = {}
+        previous_count: int | None = None
+        if cache:
+            cached = await cache.get(self.cache_key)
+            if isinstance(cached, dict):
+                counts = cached
+            if (count := counts.get(filter_key)) is not None:
+                return count, False
+            previous_count = await cache.get(f"{self.cache_key}:{filter_key}:estimate")
+
+        is_small = previous_count is not None and previous_count < self.threshold
+        if not is_small:
+            estimate = await self.estimate(stmt)
+            if estimate is not None and estimate >= self.threshold:
+                return estimate, True
+
+        total_rows = await self.count(stmt)
+        if cache:
+            await cache.set(self.cache_key, {**counts, filter_key: total_rows}, self.cache_ttl)
+            if not is_small:
+                await cache.set(f"{self.cache_key}:{filter_key}:estimate", total_rows, self.estimate_ttl)
+        return total_rows, False
+
+    def filter_key(self, stmt: sa.Select[tuple[T]]) -> str:
+        """Return a digest of the statement filter, counts of differently filtered statements are cached apart."""
+        if (criteria := stmt.whereclause) is None:
+            return ""
+        compiled = criteria.compile()
+        payload = f"{compiled}:{sorted(compiled.params.items())!r}"
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    async def estimate(self, stmt: sa.Select[tuple[T]]) -> int | None:
+        """Return the number of rows the planner expects the statement to produce.
+        Returns None for databases other than PostgreSQL."""
+        connection = await self.dbsession.connection()
+        if connection.dialect.name != "postgresql":
+            return None
+
+        compiled = stmt.compile(dialect=connection.dialect)
+        result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}", compiled.params)
+        plan = result.scalar_one()
+        if isinstance(plan, str | bytes):
+            plan = json.loads(plan)
+        return int(plan[0]["Plan"]["Plan Rows"])
@@ -0,0 +1,181 @@
+"""Prefork process supervisor.
+
+The parent process imports the application once and forks children from it,
+so children share imported code and data with the parent copy-on-write."""
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+import os
+import signal
+import time
+import typing
+
+logger = logging.getLogger(__name__)
+
+_SIGNALS = {signal.SIGTERM, signal.SIGINT}
+
+
+def get_rss(pid: int) -> int | None:
+    """Return private resident memory of the process in bytes, None when it cannot be read (process is gone, not Linux).
+
+    Pages shared copy-on-write with the parent are not counted, all children share them."""
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            return sum(
+                int(line.split()[1]) * 1024 for line in f if line.startswith(("Private_Clean:", "Private_Dirty:"))
+            )
+    except (OSError, IndexError, ValueError):
+        return None
+
+
+@dataclasses.dataclass
+class _Child:
+    slot: int
+    started_at: float
+    recycling: bool = False
+
+
+class Supervisor:
+    """Keeps `processes` forked children running `target(slot)`, slots are numbered from zero.
+
+    - a child that exits with status 0, or was recycled, is replaced at once;
+    - a crashed child is replaced after a delay doubling with each consecutive crash of its slot, up to `max_backoff`;
+      the count resets once a child of the slot runs longer than `backoff_reset`;
+    - a child using more than `max_rss` bytes of private memory is recycled: it gets SIGTERM and is replaced;
+    - on SIGTERM or SIGINT children get SIGTERM and `shutdown_timeout` seconds to exit, then they are killed.
+
+    Children should finish their work and exit with status 0 on SIGTERM, or when they decide to recycle themselves."""
+
+    def __init__(
+        self,
+        target: typing.Callable[[int], None],
+        *,
+        processes: int,
+        max_rss: int | None = None,
+        backoff: float = 1,
+        max_backoff: float = 60,
+        backoff_reset: float = 60,
+        shutdown_timeout: float = 30,
+        check_interval: float = 1,
+    ) -> None:
+        self.target = target
+        self.processes = processes
+        self.max_rss = max_rss
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.backoff_reset = backoff_reset
+        self.shutdown_timeout = shutdown_timeout
+        self.check_interval = check_interval
+        self.children: dict[int, _Child] = {}
+        self._restart_at: dict[int, float] = dict.fromkeys(range(processes), 0.0)
+        self._crashes: dict[int, int] = dict.fromkeys(range(processes), 0)
+        self._stopping = False
+
+    def run(self) -> None:
+        """Supervise children until SIGTERM or SIGINT, then stop them. Must be called from the main thread."""
+        handlers = {signum: signal.signal(signum, self._on_signal) for signum in (signal.SIGTERM, signal.SIGINT)}
+        try:
+            while not self._stopping:
+                self._reap()
+                self._spawn()
+                self._recycle_large()
+                time.sleep(self.check_interval)
+        finally:
+            self._shutdown()
+            for signum, handler in handlers.items():
+                signal.signal(signum, handler)
+
+    def stop(self) -> None:
+        self._stopping = True
+
+    def _on_signal(self, signum: int, frame: typing.Any) -> None:
+        logger.info(f"Received {signal.Signals(signum).name}, stopping workers.")
+        self.stop()
+
+    def _spawn(self) -> None:
+        now = time.monotonic()
+        for slot, restart_at in list(self._restart_at.items()):
+            if restart_at > now:
+                continue
+            del self._restart_at[slot]
+            # a signal delivered before the child resets its handlers would run the handler of the parent
+            signal.pthread_sigmask(signal.SIG_BLOCK, _SIGNALS)
+            try:
+                pid = os.fork()
+                if pid == 0:
+                    self._run_child(slot)
+            finally:
+                signal.pthread_sigmask(signal.SIG_UNBLOCK, _SIGNALS)
+            self.children[pid] = _Child(slot=slot, started_at=now)
+            logger.info(f"Started worker process {pid}.", extra={"pid": pid, "slot": slot})
+
+    def _run_child(self, slot: int) -> typing.NoReturn:
+        for signum in _SIGNALS:
+            signal.signal(signum, signal.SIG_DFL)
+        signal.pthread_sigmask(signal.SIG_UNBLOCK, _SIGNALS)
+        status = 0
+        try:
+            self.target(slot)
+        except BaseException:
+            logger.exception("Worker process failed.")
+            status = 1
+        finally:
+            logging.shutdown()
+            os._exit(status)
+
+    def _reap(self) -> None:
+        while self.children:
+            pid, wait_status = os.waitpid(-1, os.WNOHANG)
+            if pid == 0:
+                return
+            if (child := self.children.pop(pid, None)) is None:
+                continue
+            exit_code = os.waitstatus_to_exitcode(wait_status)
+            if self._stopping:
+                continue
+            self._schedule_restart(child, exit_code)
+
+    def _schedule_restart(self, child: _Child, exit_code: int) -> None:
+        now = time.monotonic()
+        if child.recycling or exit_code == 0:
+            self._crashes[child.slot] = 0
+            self._restart_at[child.slot] = now
+            return
+
+        if now - child.started_at > self.backoff_reset:
+            self._crashes[child.slot] = 0
+        delay = min(self.max_backoff, self.backoff * 2 ** self._crashes[child.slot])
+        self._crashes[child.slot] += 1
+        self._restart_at[child.slot] = now + delay
+        logger.warning(
+            f"Worker process exited with code {exit_code}, restarting in {delay:.1f}s.",
+            extra={"slot": child.slot, "exit_code": exit_code},
+        )
+
+    def _recycle_large(self) -> None:
+        if not self.max_rss:
+            return
+        for pid, child in self.children.items():
+            if child.recycling or (rss := get_rss(pid)) is None or rss <= self.max_rss:
+                continue
+            logger.info(f"Recycling worker process {pid} using {rss // 2**20} MiB.", extra={"pid": pid})
+            child.recycling = True
+            os.kill(pid, signal.SIGTERM)
+
+    def _shutdown(self) -> None:
+        for pid in self.children:
+            os.kill(pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + self.shutdown_timeout
+        while self.children and time.monotonic() < deadline:
+            self._reap()
+            time.sleep(0.1)
+
+        for pid in self.children:
+            logger.warning(f"Worker process {pid} did not stop in time, killing it.", extra={"pid": pid})
+            os.kill(pid, signal.SIGKILL)
+        while self.children:
+            pid, _ = os.waitpid(-1, 0)
+            self.children.pop(pid, None)
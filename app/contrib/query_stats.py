@@ -0,0 +1,151 @@
+from __future__ import annotations
+
+import collections
+import contextlib
+import contextvars
+import dataclasses
+import logging
+import time
+import typing
+
+import sqlalchemy as sa
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+STATEMENTS_HEADER = "x-db-statements"
+DUPLICATES_HEADER = "x-db-duplicate-statements"
+DURATION_HEADER = "x-db-time"
+
+logger = logging.getLogger(__name__)
+
+
+@dataclasses.dataclass
+class QueryStats:
+    """SQL statements issued within a unit of work (HTTP request, background job)."""
+
+    statements: int = 0
+    duplicates: int = 0
+    duration: float = 0.0
+    executions: collections.Counter[str] = dataclasses.field(default_factory=collections.Counter)
+    _seen: set[tuple[str, str]] = dataclasses.field(default_factory=set, repr=False)
+
+    def record(self, statement: str, parameters: typing.Any, duration: float) -> None:
+        """Record executed statement.
+        A statement is a duplicate when the same SQL was already executed with the same parameters."""
+        key = (statement, repr(parameters))
+        if key in self._seen:
+            self.duplicates += 1
+        self._seen.add(key)
+        self.statements += 1
+        self.duration += duration
+        self.executions[statement] += 1
+
+    def repeated_statements(self, threshold: int) -> list[tuple[str, int]]:
+        """Return statements executed at least `threshold` times, a typical sign of N+1 queries."""
+        return [(statement, count) for statement, count in self.executions.most_common() if count >= threshold]
+
+
+_query_stats: contextvars.ContextVar[QueryStats | None] = contextvars.ContextVar("query_stats", default=None)
+_STARTED_AT_KEY = "query_stats.started_at"
+
+
+def get_query_stats() -> QueryStats | None:
+    """Return stats of the current unit of work, if collected."""
+    return _query_stats.get()
+
+
+def begin_query_stats() -> tuple[QueryStats, contextvars.Token[QueryStats | None]]:
+    """Start collecting stats in the current context. Pass the token to `end_query_stats` when done."""
+    stats = QueryStats()
+    return stats, _query_stats.set(stats)
+
+
+def end_query_stats(token: contextvars.Token[QueryStats | None]) -> None:
+    _query_stats.reset(token)
+
+
+@contextlib.contextmanager
+def collect_query_stats() -> typing.Generator[QueryStats, None, None]:
+    stats, token = begin_query_stats()
+    try:
+        yield stats
+    finally:
+        end_query_stats(token)
+
+
+def _before_cursor_execute(
+    conn: sa.Connection,
+    cursor: typing.Any,
+    statement: str,
+    parameters: typing.Any,
+    context: typing.Any,
+    executemany: bool,
+) -> None:
+    conn.info.setdefault(_STARTED_AT_KEY, []).append(time.perf_counter())
+
+
+def _after_cursor_execute(
+    conn: sa.Connection,
+    cursor: typing.Any,
+    statement: str,
+    parameters: typing.Any,
+    context: typing.Any,
+    executemany: bool,
+) -> None:
+    started_at = conn.info[_STARTED_AT_KEY].pop()
+    if stats := _query_stats.get():
+        stats.record(statement, parameters, time.perf_counter() - started_at)
+
+
+def install_query_stats(engine: sa.Engine) -> None:
+    """Record statements executed by the engine into the stats of the current context.
+    For async engines, pass `AsyncEngine.sync_engine`."""
+    sa.event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+    sa.event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+class QueryStatsMiddleware:
+    """Collect SQL statements issued by every HTTP request.
+
+    When `expose_headers` is set, the counts are added to the response headers.
+    Note, the headers are sent before background tasks run, so their statements are reported only to `on_complete`.
+    Statements repeated `n_plus_one_threshold` times or more within one request are logged as warnings."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        expose_headers: bool = False,
+        n_plus_one_threshold: int = 5,
+        on_complete: typing.Callable[[Scope, QueryStats], None] | None = None,
+    ) -> None:
+        self.app = app
+        self.expose_headers = expose_headers
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.on_complete = on_complete
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with collect_query_stats() as stats:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start" and self.expose_headers:
+                    headers = MutableHeaders(scope=message)
+                    headers[STATEMENTS_HEADER] = str(stats.statements)
+                    headers[DUPLICATES_HEADER] = str(stats.duplicates)
+                    headers[DURATION_HEADER] = f"{stats.duration * 1000:.2f}ms"
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                for statement, count in stats.repeated_statements(self.n_plus_one_threshold):
+                    logger.warning(
+                        f"possible N+1 query, statement executed {count} times: {statement}",
+                        extra={"path": scope["path"], "count": count},
+                    )
+                if self.on_complete:
+                    self.on_complete(scope, stats)
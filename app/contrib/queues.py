@@ -0,0 +1,110 @@
+import asyncio
+import datetime
+import signal
+import time
+import typing
+
+import saq
+from redis.asyncio import Redis
+from saq.types import Context
+
+
+async def enqueue_many(queue: saq.Queue, jobs: typing.Iterable[saq.Job]) -> list[saq.Job | None]:
+    """Enqueue jobs concurrently. saq has no bulk enqueue, concurrent calls overlap their Redis round trips.
+    Like `Queue.enqueue`, returns None for jobs whose key is already queued."""
+    return list(await asyncio.gather(*(queue.enqueue(job) for job in jobs)))
+
+
+async def claim_key(redis: Redis, key: str, ttl: datetime.timedelta) -> bool:
+    """Set the key unless it exists (Redis SET NX) and return whether this call set it. The key expires after `ttl`."""
+    return bool(await redis.set(key, 1, nx=True, px=max(int(ttl.total_seconds() * 1000), 1)))
+
+
+async def enqueue_unique(
+    queue: saq.Queue,
+    function: str,
+    *,
+    key: str,
+    window: datetime.timedelta | None = None,
+    debounce: datetime.timedelta | None = None,
+    **kwargs: typing.Any,
+) -> saq.Job | None:
+    """Enqueue a job identified by a business key, like "invite:42", return None when it is a duplicate.
+
+    - a job with the same key that is still queued or running absorbs duplicates (saq job key);
+    - with `window`, duplicates are dropped for `window` after the first one even when it has already finished;
+    - with `debounce`, the job runs `debounce` later, so a burst of duplicates within that time runs once.
+
+    `kwargs` are function arguments or job options, as in `Queue.enqueue`."""
+    dedupe_key = queue.namespace(f"dedupe:{key}")  # type: ignore[attr-defined]
+    if window and not await claim_key(queue.redis, dedupe_key, window):  # type: ignore[attr-defined]
+        return None
+    if debounce:
+        kwargs["scheduled"] = int(time.time() + debounce.total_seconds())
+    try:
+        return await queue.enqueue(function, key=key, **kwargs)
+    except BaseException:
+        if window:
+            await queue.redis.delete(dedupe_key)  # type: ignore[attr-defined]
+        raise
+
+
+async def _run_worker(worker: saq.Worker) -> None:
+    await worker.queue.connect()
+    try:
+        await worker.start()
+    finally:
+        await worker.queue.disconnect()
+
+
+async def serve_workers(
+    workers: typing.Sequence[saq.Worker], *, web_port: int | None = None, max_jobs: int | None = None
+) -> None:
+    """Run workers of several queues in one process until SIGINT or SIGTERM, or until any of them fails.
+
+    Every saq worker installs its own signal handlers, which replace each other within one event loop,
+    so signals are handled here and stop all workers. With `web_port`, serves saq web UI for the queues.
+    With `max_jobs`, workers stop after processing that many jobs in total, to let a supervisor replace the process."""
+    loop = asyncio.get_running_loop()
+    stopped = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(signum, stopped.set)
+
+    processed = 0
+
+    async def count_job(context: Context) -> None:
+        nonlocal processed
+        processed += 1
+        if max_jobs and processed >= max_jobs:
+            stopped.set()
+
+    for worker in workers:
+        worker.SIGNALS = []
+        if max_jobs:
+            worker.after_process = [*(worker.after_process or []), count_job]
+
+    runner = None
+    if web_port is not None:
+        import aiohttp.web
+        from saq.web.aiohttp import create_app
+
+        runner = aiohttp.web.AppRunner(create_app([worker.queue for worker in workers]))
+        await runner.setup()
+        await aiohttp.web.TCPSite(runner, port=web_port).start()
+
+    tasks = [asyncio.create_task(_run_worker(worker)) for worker in workers]
+    waiter = asyncio.create_task(stopped.wait())
+    try:
+        await asyncio.wait([*tasks, waiter], return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        waiter.cancel()
+        for task in tasks:
+            task.cancel()  # a worker runs its shutdown hooks when cancelled
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+        if runner:
+            await runner.cleanup()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            loop.remove_signal_handler(signum)
+
+    if errors := [result for result in results if isinstance(result, Exception)]:
+        raise errors[0]
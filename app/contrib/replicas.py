@@ -0,0 +1,222 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import contextvars
+import datetime
+import logging
+import random
+import typing
+
+import anyio
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncEngine
+from sqlalchemy.orm import ORMExecuteState, Session
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+_WROTE_KEY = "replicas.wrote"
+_SAFE_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+# lag is zero when the replica replayed everything it received,
+# otherwise it is the age of the last replayed transaction
+_LAG_QUERY = sa.text(
+    "SELECT CASE "
+    "WHEN NOT pg_is_in_recovery() OR pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+    "ELSE coalesce(extract(epoch FROM now() - pg_last_xact_replay_timestamp()), 0) "
+    "END"
+)
+
+
+class _WriteTracker:
+    committed = False
+
+
+_use_primary: contextvars.ContextVar[bool] = contextvars.ContextVar("replicas.use_primary", default=False)
+_write_tracker: contextvars.ContextVar[_WriteTracker | None] = contextvars.ContextVar(
+    "replicas.write_tracker", default=None
+)
+
+
+def begin_use_primary(enabled: bool = True) -> contextvars.Token[bool]:  # noqa: FBT001,FBT002
+    """Send statements of the current context to the primary database. Pass the token to `end_use_primary` when done."""
+    return _use_primary.set(enabled)
+
+
+def end_use_primary(token: contextvars.Token[bool]) -> None:
+    _use_primary.reset(token)
+
+
+@contextlib.contextmanager
+def use_primary(enabled: bool = True) -> typing.Generator[None, None, None]:  # noqa: FBT001,FBT002
+    """Send all statements issued within the block to the primary database."""
+    token = begin_use_primary(enabled)
+    try:
+        yield
+    finally:
+        end_use_primary(token)
+
+
+@contextlib.contextmanager
+def track_writes() -> typing.Generator[_WriteTracker, None, None]:
+    """Track whether any session committed writes within the block."""
+    tracker = _WriteTracker()
+    token = _write_tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _write_tracker.reset(token)
+
+
+class ReplicaSet:
+    """A group of read replicas.
+    Replicas lagging behind the primary for more than `max_lag`, or not responding, are excluded from routing
+    until the next check. Call `monitor` in a background task to check them periodically,
+    or `start_monitor` and `stop_monitor` from hooks of processes without a task group (queue workers)."""
+
+    def __init__(
+        self,
+        engines: typing.Sequence[AsyncEngine],
+        *,
+        max_lag: datetime.timedelta = datetime.timedelta(seconds=5),
+        check_interval: datetime.timedelta = datetime.timedelta(seconds=5),
+    ) -> None:
+        self.engines = list(engines)
+        self.max_lag = max_lag
+        self.check_interval = check_interval
+        self.available = list(engines)
+        self._monitor_task: asyncio.Task[None] | None = None
+
+    def choose(self) -> AsyncEngine | None:
+        """Return a random available replica or None when there is none."""
+        return random.choice(self.available) if self.available else None
+
+    async def measure_lag(self, engine: AsyncEngine) -> float | None:
+        """Return replication lag in seconds, or None when the replica cannot be reached."""
+        try:
+            with anyio.fail_after(self.check_interval.total_seconds()):
+                async with engine.connect() as connection:
+                    return float((await connection.execute(_LAG_QUERY)).scalar_one())
+        except (sa.exc.DBAPIError, OSError, TimeoutError):
+            logger.warning("Replica is not reachable.", exc_info=True, extra={"replica": repr(engine.url)})
+            return None
+
+    async def check(self) -> None:
+        available = []
+        for engine in self.engines:
+            lag = await self.measure_lag(engine)
+            if lag is not None and lag <= self.max_lag.total_seconds():
+                available.append(engine)
+            elif lag is not None:
+                logger.warning(f"Replica lags {lag:.1f}s behind the primary.", extra={"replica": repr(engine.url)})
+        self.available = available
+
+    async def monitor(self) -> None:
+        while True:
+            await self.check()
+            await anyio.sleep(self.check_interval.total_seconds())
+
+    def start_monitor(self) -> None:
+        """Run `monitor` in a task of the running event loop, unless it already runs."""
+        if self._monitor_task is None or self._monitor_task.done():
+            self._monitor_task = asyncio.create_task(self.monitor())
+
+    def stop_monitor(self) -> None:
+        if self._monitor_task is not None:
+            self._monitor_task.cancel()
+            self._monitor_task = None
+
+
+class RoutingSession(Session):
+    """Session that sends reads to replicas and everything else to the primary.
+
+    SELECT statements (including lambda statements, excluding SELECT FOR UPDATE) go to an available replica unless:
+    - the session has written anything, later reads must see those writes;
+    - the code runs within `use_primary` block;
+    - no replica is available (all lag or are down).
+    Without replicas it behaves as a regular session.
+
+    Use as `sync_session_class` of `async_sessionmaker`, replicas are passed as a session factory argument."""
+
+    def __init__(self, *args: typing.Any, replicas: ReplicaSet | None = None, **kwargs: typing.Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.replicas = replicas
+
+    def get_bind(
+        self, mapper: typing.Any = None, clause: sa.ClauseElement | None = None, **kwargs: typing.Any
+    ) -> sa.Engine | sa.Connection:
+        if (
+            self.replicas
+            and clause is not None
+            and getattr(clause, "is_select", False)  # also true for lambda statements wrapping a SELECT
+            and getattr(clause, "_for_update_arg", None) is None  # row locks are taken on the primary only
+            and not self._flushing
+            and not self.info.get(_WROTE_KEY)
+            and not _use_primary.get()
+            and (replica := self.replicas.choose())
+        ):
+            return replica.sync_engine
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+@sa.event.listens_for(RoutingSession, "after_flush")
+def _on_flush(session: Session, flush_context: typing.Any) -> None:
+    session.info[_WROTE_KEY] = True
+
+
+@sa.event.listens_for(RoutingSession, "do_orm_execute")
+def _on_execute(orm_execute_state: ORMExecuteState) -> None:
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        orm_execute_state.session.info[_WROTE_KEY] = True
+
+
+@sa.event.listens_for(RoutingSession, "after_commit")
+def _on_commit(session: Session) -> None:
+    if session.info.get(_WROTE_KEY) and (tracker := _write_tracker.get()):
+        tracker.committed = True
+
+
+class ReplicaRoutingMiddleware:
+    """Decide per request whether reads may go to replicas.
+
+    Unsafe requests (POST, PUT, etc.) always use the primary. Once a request commits writes,
+    a cookie pins the following requests of the same client to the primary for `sticky_ttl`,
+    so users read their own writes even if replicas are behind."""
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        *,
+        cookie_name: str = "db_primary",
+        sticky_ttl: datetime.timedelta = datetime.timedelta(seconds=10),
+        cookie_https_only: bool = False,
+    ) -> None:
+        self.app = app
+        self.cookie_name = cookie_name
+        self.sticky_ttl = sticky_ttl
+        self.cookie_https_only = cookie_https_only
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        connection = HTTPConnection(scope)
+        primary = scope["method"] not in _SAFE_METHODS or self.cookie_name in connection.cookies
+        with use_primary(primary), track_writes() as tracker:
+
+            async def send_wrapper(message: Message) -> None:
+                if message["type"] == "http.response.start" and tracker.committed:
+                    cookie = (
+                        f"{self.cookie_name}=1; Max-Age={int(self.sticky_ttl.total_seconds())}; "
+                        f"Path=/; HttpOnly; SameSite=lax"
+                    )
+                    if self.cookie_https_only:
+                        cookie += "; Secure"
+                    MutableHeaders(scope=message).append("set-cookie", cookie)
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
@@ -0,0 +1,30 @@
+import typing
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncScalarResult
+from starlette_sqlalchemy import Repo as BaseRepo
+
+T = typing.TypeVar("T")
+
+
+class Repo(BaseRepo[T]):
+    """Project repository base, adds streaming of large result sets."""
+
+    async def stream_batches(
+        self, stmt: sa.Select[tuple[T]], batch_size: int = 1000
+    ) -> typing.AsyncGenerator[typing.Sequence[T], None]:
+        """Yield rows in lists of at most `batch_size` rows.
+        Rows are fetched with a server-side cursor, only one batch is held in memory at a time.
+        Note, eager loaders run per batch, so collections must be loaded with selectinload, not joinedload."""
+        result: AsyncScalarResult[T] = await self.dbsession.stream_scalars(stmt.execution_options(yield_per=batch_size))
+        try:
+            async for partition in result.partitions(batch_size):
+                yield partition
+        finally:
+            await result.close()
+
+    async def stream(self, stmt: sa.Select[tuple[T]], batch_size: int = 1000) -> typing.AsyncGenerator[T, None]:
+        """Yield rows one by one, fetching them in batches. See `stream_batches`."""
+        async for batch in self.stream_batches(stmt, batch_size):
+            for row in batch:
+                yield row
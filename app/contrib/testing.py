@@ -11,6 +11,7 @@ from starsessions import SessionStore
 from app.config import settings
 from app.contexts.teams.models import Team
 from app.contexts.users.models import User
+from app.contrib.query_stats import DUPLICATES_HEADER, STATEMENTS_HEADER
 
 
 class TestHtmxResponse:
@@ -30,6 +31,21 @@ def as_htmx_response(response: httpx.Response) -> TestHtmxResponse:
     return TestHtmxResponse(response)
 
 
+class QueryBudget:
+    """Assert that a response was produced within a number of SQL statements.
+    Reads the counters from the debug headers set by QueryStatsMiddleware,
+    the test client runs the app in another thread so the counters cannot be read directly."""
+
+    def __call__(self, response: httpx.Response, max_statements: int, max_duplicates: int = 0) -> None:
+        assert STATEMENTS_HEADER in response.headers, "Query stats headers are missing, is debug mode enabled?"
+        statements = int(response.headers[STATEMENTS_HEADER])
+        duplicates = int(response.headers[DUPLICATES_HEADER])
+        assert statements <= max_statements, f"Expected at most {max_statements} SQL statements, got {statements}."
+        assert (
+            duplicates <= max_duplicates
+        ), f"Expected at most {max_duplicates} duplicate SQL statements, got {duplicates}."
+
+
 class TestAuthClient(TestClient):
     def __init__(
         self,
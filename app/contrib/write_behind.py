@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+import contextlib
+import datetime
+import typing
+import uuid
+
+from redis.asyncio import Redis
+from redis.exceptions import ResponseError
+
+
+class TimestampBuffer:
+    """Collects the latest timestamp per member in a Redis sorted set, to be written to the database later.
+
+    Recording costs a single ZADD, older timestamps never overwrite newer ones.
+    A periodic job drains the buffer and writes all values in one statement."""
+
+    def __init__(self, redis: Redis, key: str) -> None:
+        self.redis = redis
+        self.key = key
+
+    async def record(self, member: str | int, value: datetime.datetime) -> None:
+        await self.redis.zadd(self.key, {str(member): value.timestamp()}, gt=True)
+
+    @contextlib.asynccontextmanager
+    async def drain(self) -> typing.AsyncGenerator[dict[str, datetime.datetime], None]:
+        """Take all buffered values. Values recorded meanwhile go to a new buffer.
+        If the block raises, taken values are merged back so the next drain retries them."""
+        batch_key = f"{self.key}:draining:{uuid.uuid4().hex}"
+        try:
+            await self.redis.rename(self.key, batch_key)
+        except ResponseError:  # no such key, nothing was recorded
+            batch_key = ""
+
+        if not batch_key:
+            yield {}
+            return
+
+        try:
+            members = await self.redis.zrange(batch_key, 0, -1, withscores=True)
+            yield {
+                member.decode() if isinstance(member, bytes) else member: datetime.datetime.fromtimestamp(
+                    score, datetime.UTC
+                )
+                for member, score in members
+            }
+        except BaseException:
+            await self.redis.zunionstore(self.key, [self.key, batch_key], aggregate="MAX")
+            raise
+        finally:
+            await self.redis.delete(batch_key)
@@ -1,4 +1,3 @@
-import datetime
 import logging
 
 import limits
@@ -14,6 +13,7 @@ from app.contexts.auth.mails import send_reset_password_link_mail
 from app.contexts.auth.passwords import make_password_reset_link
 from app.contexts.auth.tokens import JWTClaim
 from app.contexts.users.repo import UserRepo
+from app.contexts.users.sign_ins import record_sign_in
 from app.contrib.utils import get_client_ip
 from app.http.api.auth import schemas
 from app.http.api.dependencies import DbSession
@@ -39,7 +39,7 @@ async def login_view(request: Request, dbsession: DbSession, body: schemas.Login
         for guard in login_guards:
             await guard(user)
 
-        user.last_sign_in = datetime.datetime.now(datetime.UTC)
+        await record_sign_in(user)
         refresh_token, _ = await token_manager.issue_refresh_token(
             dbsession,
             subject=user.id,
@@ -51,9 +51,9 @@ async def login_view(request: Request, dbsession: DbSession, body: schemas.Login
         logger.warning("login error", exc_info=True, extra={"email": body.email, "ip": get_client_ip(request)})
         raise BadRequestError(error_code=ex.error_code) from ex
     else:
+        await events.emit(UserAuthenticated(user_id=user.id), dbsession=dbsession)
         await dbsession.commit()
         await limiter.clear(get_client_ip(request))
-        await events.emit(UserAuthenticated(user_id=user.id))
         return schemas.LoginSerializer(access_token=access_token, refresh_token=refresh_token)
 
 
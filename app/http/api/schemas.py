@@ -5,6 +5,8 @@ import typing
 from pydantic import BaseModel
 from starlette_sqlalchemy import Page
 
+from app.contrib.pagination import CursorPage
+
 M = typing.TypeVar("M")
 T = typing.TypeVar("T", bound=BaseModel)
 
@@ -23,3 +25,21 @@ class Paginated(BaseModel, typing.Generic[T]):
             total=page.total,
             items=[serializer.model_validate(obj) for obj in page],
         )
+
+
+class CursorPaginated(BaseModel, typing.Generic[T]):
+    page_size: int
+    next_cursor: str | None
+    previous_cursor: str | None
+    total: int | None
+    items: list[T]
+
+    @classmethod
+    def from_page(cls, page: CursorPage[M], serializer: type[T]) -> CursorPaginated[T]:
+        return CursorPaginated(
+            page_size=page.page_size,
+            next_cursor=page.next_cursor,
+            previous_cursor=page.previous_cursor,
+            total=page.total,
+            items=[serializer.model_validate(obj) for obj in page],
+        )
@@ -9,13 +9,21 @@ from starlette.exceptions import HTTPException
 from starlette.middleware import Middleware
 from starlette.routing import Mount
 from starlette.staticfiles import StaticFiles
-from starlette_sqlalchemy import DbSessionMiddleware
+from starlette.types import Scope
 
 from app.config import settings
-from app.config.database import new_dbsession
+from app.config.database import async_dbsession, replica_set
+from app.config.environment import Environment
+from app.config.events import events
 from app.config.files import file_storage
+from app.config.metrics import observe_query_stats
 from app.config.queues import task_queue
+from app.config.redis import redis
+from app.contrib.events import EventCoalescingMiddleware
+from app.contrib.lazy_session import LazyDbSessionMiddleware
 from app.contrib.permissions import AccessDeniedError
+from app.contrib.query_stats import QueryStats, QueryStatsMiddleware
+from app.contrib.replicas import ReplicaRoutingMiddleware
 from app.http.api.app import api_app
 from app.http.error_handlers import exception_handler, remap_exception
 from app.http.exceptions import PermissionDeniedError
@@ -23,9 +31,23 @@ from app.http.web.app import web_router
 
 install_error_handler()
 
+
+def _observe_request_query_stats(scope: Scope, stats: QueryStats) -> None:
+    endpoint = scope.get("endpoint")
+    observe_query_stats("http", getattr(endpoint, "__name__", "unknown"), stats)
+
+
 # List of middleware that will be applied to every route in the app.
 global_middleware = [
-    Middleware(DbSessionMiddleware, session_factory=new_dbsession),
+    Middleware(QueryStatsMiddleware, expose_headers=settings.debug, on_complete=_observe_request_query_stats),
+    Middleware(
+        ReplicaRoutingMiddleware,
+        cookie_name=settings.database_replica_cookie,
+        sticky_ttl=settings.database_replica_sticky_ttl,
+        cookie_https_only=settings.app_env == Environment.PRODUCTION,
+    ),
+    Middleware(LazyDbSessionMiddleware, session_factory=async_dbsession),
+    Middleware(EventCoalescingMiddleware, dispatcher=events),
 ]
 
 
@@ -34,9 +56,12 @@ async def lifespan_handler(app: Starlette) -> typing.AsyncGenerator[dict[str, ty
     """Application lifespan handler.
     Any value yielded by this function will be available as `request.app.VARNAME`."""
     async with anyio.create_task_group() as tg:
+        if replica_set:
+            tg.start_soon(replica_set.monitor)
         yield {}
         tg.cancel_scope.cancel()
         await task_queue.disconnect()
+        await redis.aclose()
 
 
 app = Starlette(
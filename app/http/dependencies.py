@@ -8,7 +8,7 @@ from starlette.requests import Request
 from app.config.cache import cache
 from app.config.files import file_storage
 from app.config.mailers import mailer
-from app.config.pagination import get_page_number, get_page_size
+from app.config.pagination import get_cursor, get_page_number, get_page_size
 from app.config.permissions.context import AccessContext as _AccessContext
 from app.config.permissions.context import Guard as _Guard
 from app.config.redis import redis
@@ -41,5 +41,6 @@ CurrentSubscription = typing.Annotated[Subscription | None, lambda r: r.state.su
 RequireSubscription = typing.Annotated[Subscription, _get_current_subscription_or_raise]
 PageNumber = typing.Annotated[int, lambda r: get_page_number(r)]
 PageSize = typing.Annotated[int, lambda r: get_page_size(r)]
+Cursor = typing.Annotated[str | None, lambda r: get_cursor(r)]
 AccessContext = typing.Annotated[_AccessContext, lambda r: r.state.access_context]
 Guard = typing.Annotated[_Guard, lambda r: _Guard(r.state.access_context)]
@@ -1,4 +1,3 @@
-import datetime
 import logging
 import time
 
@@ -30,6 +29,7 @@ from app.contexts.auth.mails import send_password_changed_mail, send_reset_passw
 from app.contexts.auth.passwords import CHANGE_PASSWORD_TTL, make_password_reset_link
 from app.contexts.auth.social import oauth
 from app.contexts.users.repo import UserRepo
+from app.contexts.users.sign_ins import record_sign_in
 from app.contrib import forms
 from app.contrib.urls import resolve_redirect_url, safe_referer
 from app.contrib.utils import get_client_ip
@@ -70,14 +70,13 @@ async def login_view(request: Request, dbsession: DbSession) -> Response:
                 for guard in login_guards:
                     await guard(user)
 
-                user.last_sign_in = datetime.datetime.now(datetime.UTC)
+                await record_sign_in(user)
+                await events.emit(UserAuthenticated(user_id=user.id), dbsession=dbsession)
                 await dbsession.commit()
                 await login(request, user, settings.secret_key)
                 await limiter.clear(get_client_ip(request))
                 flash(request).success(_("You have been logged in."))
 
-                await events.emit(UserAuthenticated(user_id=user.id))
-
                 redirect_to = resolve_redirect_url(request, request.url_for("dashboard"))
                 return RedirectResponse(redirect_to, status_code=status.HTTP_302_FOUND)
             except AuthenticationError as exc:
@@ -5,12 +5,14 @@ from starlette.requests import Request
 from starlette.responses import JSONResponse, Response
 from starlette_dispatch import RouteGroup
 
+from app.config.redis import redis
 from app.contexts.billing.exceptions import BillingError
 from app.contexts.billing.stripe import (
     cancel_stripe_subscription,
     create_stripe_subscription,
     update_stripe_subscription,
 )
+from app.contrib.queues import claim_key
 from app.http.dependencies import DbSession, Settings
 from app.http.responses import JSONErrorResponse
 
@@ -20,15 +22,21 @@ logger = logging.getLogger(__name__)
 
 @routes.post("/stripe/webhook")
 async def webhook_handler_view(request: Request, dbsession: DbSession, settings: Settings) -> Response:
+    signature = request.headers.get("Stripe-Signature", "")
+    data = await request.body()
+    event = stripe.Webhook.construct_event(  # type: ignore[no-untyped-call]
+        data,
+        sig_header=signature,
+        api_key=settings.stripe_secret_key,
+        secret=settings.stripe_webhook_secret,
+    )
+    # Stripe delivers an event at least once, a redelivered event must not be handled again
+    dedupe_key = f"{settings.app_slug}:stripe:event:{event.id}"
+    if not await claim_key(redis, dedupe_key, settings.stripe_webhook_dedupe_window):
+        logger.info("stripe webhook event has already been handled", extra={"event_id": event.id})
+        return JSONResponse({}, status_code=200)
+
     try:
-        signature = request.headers.get("Stripe-Signature", "")
-        data = await request.body()
-        event = stripe.Webhook.construct_event(  # type: ignore[no-untyped-call]
-            data,
-            sig_header=signature,
-            api_key=settings.stripe_secret_key,
-            secret=settings.stripe_webhook_secret,
-        )
         match event.type:
             case "checkout.session.completed":
                 if not isinstance(event.data.object, stripe.checkout.Session):
@@ -73,7 +81,11 @@ async def webhook_handler_view(request: Request, dbsession: DbSession, settings:
                     },
                 )
     except BillingError as ex:
+        await redis.delete(dedupe_key)  # Stripe retries failed events
         logger.exception("stripe webhook error")
         return JSONErrorResponse(status_code=400, error_code=ex.error_code)
+    except Exception:
+        await redis.delete(dedupe_key)
+        raise
     else:
         return JSONResponse({}, status_code=200)
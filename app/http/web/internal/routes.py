@@ -1,10 +1,14 @@
 import logging
+import secrets
 
+import prometheus_client
 from starlette.requests import Request
 from starlette.responses import JSONResponse, Response
 from starlette_dispatch import RouteGroup
 
+from app.config.metrics import generate_metrics
 from app.http.dependencies import Settings
+from app.http.exceptions import AuthenticationError, NotFoundError
 
 routes = RouteGroup()
 logger = logging.getLogger(__name__)
@@ -22,3 +26,12 @@ async def version_view(request: Request, settings: Settings) -> Response:
             version=settings.release_version,
         )
     )
+
+
+@routes.get("/metrics")
+async def metrics_view(request: Request, settings: Settings) -> Response:
+    if not settings.metrics_token:
+        raise NotFoundError()
+    if not secrets.compare_digest(request.headers.get("authorization", ""), f"Bearer {settings.metrics_token}"):
+        raise AuthenticationError(headers={"WWW-Authenticate": "Bearer"})
+    return Response(generate_metrics(), media_type=prometheus_client.CONTENT_TYPE_LATEST)
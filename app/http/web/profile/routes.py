@@ -89,7 +89,7 @@ async def delete_profile_view(request: Request, dbsession: DbSession, user: Curr
 
 @routes.post("/profile/leave", name="profile.leave_team")
 async def leave_team_view(request: Request, dbsession: DbSession, team_member: CurrentMembership) -> Response:
-    if team_member.team.owner == team_member.user:
+    if team_member.team.owner_id == team_member.user_id:
         raise PermissionDeniedError(_("You cannot leave your own team."))
 
     team_member.suspend()
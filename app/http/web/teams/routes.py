@@ -1,8 +1,11 @@
+import datetime
+import typing
+
 import limits
-from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
 from sqlalchemy.orm.attributes import flag_modified
 from starlette import status
-from starlette.background import BackgroundTask, BackgroundTasks
+from starlette.background import BackgroundTask
 from starlette.requests import Request
 from starlette.responses import RedirectResponse, Response
 from starlette_babel import gettext_lazy as _
@@ -12,14 +15,21 @@ from starlette_flash import flash
 from app.config import rate_limit
 from app.config.permissions import guards, permissions
 from app.config.permissions.decorators import permission_required
+from app.config.redis import redis
 from app.config.templating import templates
 from app.contexts.teams.exceptions import AlreadyMemberError
-from app.contexts.teams.mails import send_team_invitation_email, send_team_member_joined_email
-from app.contexts.teams.models import InvitationToken, TeamInvite, TeamRole
+from app.contexts.teams.mails import (
+    send_team_invitation_email,
+    send_team_invitation_emails,
+    send_team_member_joined_email,
+)
+from app.contexts.teams.models import InvitationToken, Team, TeamInvite, TeamRole
 from app.contexts.teams.repo import TeamRepo
 from app.contrib import forms, htmx
+from app.contrib.exports import ExportFormat, export_response
 from app.contrib.forms import create_form
 from app.contrib.permissions import get_defined_permissions
+from app.contrib.queues import claim_key
 from app.contrib.urls import redirect_later, safe_referer
 from app.contrib.utils import get_client_ip
 from app.exceptions import RateLimitedError
@@ -31,12 +41,15 @@ from app.http.dependencies import (
     Files,
     PageNumber,
     PageSize,
+    Settings,
 )
+from app.http.exceptions import NotFoundError
 from app.http.web.teams.forms import EditRoleForm, GeneralSettingsForm, InviteForm
 
 routes = RouteGroup()
 team_invitation_public_routes = RouteGroup()
 resent_invite_rate_limit = limits.parse("3/minute")
+resent_invite_dedupe_window = datetime.timedelta(minutes=1)
 
 
 @routes.get_or_post("/teams/select", name="teams.select")
@@ -102,6 +115,53 @@ async def members_view(
     return templates.TemplateResponse(request, template_name, {"page_title": _("Members"), "members": members})
 
 
+@routes.get("/teams/members/export.{export_format:str}", name="teams.members.export")
+@permission_required(guards.TEAM_MEMBER_ACCESS)
+async def export_members_view(
+    request: Request, dbsession: DbSession, team: CurrentTeam, export_format: FromPath[str]
+) -> Response:
+    if export_format not in ("csv", "jsonl"):
+        raise NotFoundError()
+
+    async def rows() -> typing.AsyncGenerator[dict[str, typing.Any], None]:
+        async for member in TeamRepo(dbsession).stream_team_members(team.id):
+            yield {
+                "id": member.id,
+                "email": member.user.email,
+                "name": member.user.display_name,
+                "role": member.role.name,
+                "suspended_at": member.suspended_at,
+                "joined_at": member.created_at,
+            }
+
+    return export_response(
+        rows(),
+        columns=["id", "email", "name", "role", "suspended_at", "joined_at"],
+        filename="members",
+        export_format=typing.cast(ExportFormat, export_format),
+    )
+
+
+@routes.get("/teams/invites/export.{export_format:str}", name="teams.invites.export")
+@permission_required(guards.TEAM_MEMBER_ACCESS)
+async def export_invites_view(
+    request: Request, dbsession: DbSession, team: CurrentTeam, export_format: FromPath[str]
+) -> Response:
+    if export_format not in ("csv", "jsonl"):
+        raise NotFoundError()
+
+    async def rows() -> typing.AsyncGenerator[dict[str, typing.Any], None]:
+        async for invite in TeamRepo(dbsession).stream_invites(team.id):
+            yield {"id": invite.id, "email": invite.email, "role": invite.role.name, "invited_at": invite.created_at}
+
+    return export_response(
+        rows(),
+        columns=["id", "email", "role", "invited_at"],
+        filename="invites",
+        export_format=typing.cast(ExportFormat, export_format),
+    )
+
+
 @routes.get("/teams/invites", name="teams.invites")
 @permission_required(guards.TEAM_MEMBER_ACCESS)
 async def invites_view(
@@ -129,32 +189,28 @@ async def send_invite_view(request: Request, dbsession: DbSession, team_member:
         if not role:
             return htmx.response().error_toast(_("Invalid role.")).close_modal()
 
-        tasks: list[BackgroundTask] = []
-
-        for email in emails:
-            token = InvitationToken()
-            link = token.make_url(request)
-            invite = TeamInvite(
-                email=email,
-                role=role,
-                inviter=team_member,
-                team=team_member.team,
-                token=token.hashed_token,
-            )
-            dbsession.add(invite)
-            tasks.append(BackgroundTask(send_team_invitation_email, invite, link))
+        # the team owner is BCC'd on invitation emails, memberships of the current request do not load it
+        team = await repo.get(team_member.team_id, options=[joinedload(Team.owner)])
+        tokens = {email: InvitationToken() for email in dict.fromkeys(emails)}
+        invites, skipped = await repo.invite_many(
+            team_id=team.id,
+            inviter_id=team_member.id,
+            role_id=role.id,
+            tokens={email: token.hashed_token for email, token in tokens.items()},
+        )
+        await dbsession.commit()
 
-        try:
-            await dbsession.commit()
-        except IntegrityError:
+        if not invites:
             status_code = status.HTTP_400_BAD_REQUEST
             form.email.errors = [*form.email.errors, _("One or more of the emails you entered is already invited.")]
         else:
+            message = _("Invites have been sent.")
+            if skipped:
+                message = _("Invites have been sent. Already invited: {emails}.").format(emails=", ".join(skipped))
+            links = {invite.email: tokens[invite.email].make_url(request) for invite in invites}
             return (
-                htmx.response(
-                    background=BackgroundTasks(tasks),
-                )
-                .success_toast(_("Invites have been sent."))
+                htmx.response(background=BackgroundTask(send_team_invitation_emails, team, team_member, links))
+                .success_toast(message)
                 .close_modal()
                 .trigger("refresh")
             )
@@ -168,12 +224,12 @@ async def toggle_status_view(
     request: Request, dbsession: DbSession, team: CurrentTeam, member_id: FromPath[int]
 ) -> Response:
     repo = TeamRepo(dbsession)
-    member = await repo.get_team_member_by_id(team.id, member_id)
+    member = await repo.get_team_member_by_id(team.id, member_id, profile="minimal")
     if not member:
         return htmx.response(status.HTTP_404_NOT_FOUND).error_toast(_("Member not found.")).trigger("refresh")
 
     # suspend/resume is not applicable to team owner
-    if team.owner == member.user:
+    if team.owner_id == member.user_id:
         return htmx.response(status.HTTP_400_BAD_REQUEST).error_toast(_("Team owner cannot be suspended."))
 
     if member.is_suspended:
@@ -193,7 +249,7 @@ async def cancel_invitation_view(
     request: Request, dbsession: DbSession, team: CurrentTeam, invite_id: FromPath[int]
 ) -> Response:
     repo = TeamRepo(dbsession)
-    invitation = await repo.get_invitation(team.id, invite_id)
+    invitation = await repo.get_invitation(team.id, invite_id, profile="minimal")
     if not invitation:
         return htmx.response(status.HTTP_404_NOT_FOUND).error_toast(_("Invitation not found.")).trigger("refresh")
 
@@ -205,13 +261,18 @@ async def cancel_invitation_view(
 @routes.post("/teams/invites/resend/{invite_id:int}", name="teams.invites.resend")
 @permission_required(guards.TEAM_MEMBER_ACCESS)
 async def resend_invitation_view(
-    request: Request, dbsession: DbSession, team: CurrentTeam, invite_id: FromPath[int]
+    request: Request, dbsession: DbSession, team: CurrentTeam, invite_id: FromPath[int], settings: Settings
 ) -> Response:
     repo = TeamRepo(dbsession)
     invitation = await repo.get_invitation(team.id, invite_id)
     if not invitation:
         return htmx.response(status.HTTP_404_NOT_FOUND).error_toast(_("Invitation not found.")).trigger("refresh")
 
+    # a double submitted form would replace the invitation twice and send two emails, each with a different link
+    dedupe_key = f"{settings.app_slug}:teams:invites:resend:{invitation.token}"
+    if not await claim_key(redis, dedupe_key, resent_invite_dedupe_window):
+        return htmx.response().success_toast(_("Invitation has already been resent.")).trigger("refresh")
+
     try:
         limiter = rate_limit.RateLimiter(
             resent_invite_rate_limit, f"team_invitation_resend_{team.id}_{invitation.email}"
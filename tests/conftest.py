@@ -22,7 +22,7 @@ from app.contexts.billing.models import Subscription, SubscriptionPlan
 from app.contexts.teams.models import Team, TeamMember, TeamRole
 from app.contexts.users.models import User
 from app.contrib.storage import StorageType
-from app.contrib.testing import TestAuthClient
+from app.contrib.testing import QueryBudget, TestAuthClient
 from app.http.asgi import app as starlette_app
 from app.http.web.app import session_backend as app_session_backend
 from tests import database
@@ -213,6 +213,12 @@ async def api_client(
         yield client
 
 
+@pytest.fixture
+def query_budget() -> QueryBudget:
+    """Assert SQL statements budget of a response: `query_budget(response, max_statements=10)`."""
+    return QueryBudget()
+
+
 @pytest.fixture
 def http_request(app: Starlette, dbsession: AsyncSession) -> Request:
     return RequestFactory(scope=RequestScopeFactory(app=app, state={"dbsession": dbsession}))
@@ -0,0 +1,35 @@
+from unittest import mock
+
+import prometheus_client
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session
+
+from app.config.database import LazyLoadError, call_after_commit
+from app.contexts.teams.models import Team
+
+
+async def test_lazy_loads_raise_in_tests(dbsession: AsyncSession, team: Team) -> None:
+    instance = await dbsession.scalar(sa.select(Team).where(Team.id == team.id))
+    assert instance
+    with pytest.raises(LazyLoadError):
+        await instance.awaitable_attrs.owner
+
+
+async def test_pool_metrics(dbsession: AsyncSession) -> None:
+    await dbsession.execute(sa.select(sa.literal(1)))
+    checked_out = prometheus_client.REGISTRY.get_sample_value("db_pool_checked_out", {"engine": "primary"})
+    assert checked_out is not None
+    assert checked_out >= 1
+    assert prometheus_client.REGISTRY.get_sample_value("db_pool_wait_seconds_count", {"engine": "primary"})
+
+
+async def test_call_after_commit(dbsession: AsyncSession) -> None:
+    callback = mock.AsyncMock()
+    assert call_after_commit(dbsession.sync_session, callback)
+    callback.assert_not_awaited()
+
+    await dbsession.commit()
+    callback.assert_awaited_once()
+    assert not call_after_commit(Session(), callback)
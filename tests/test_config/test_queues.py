@@ -0,0 +1,43 @@
+import prometheus_client
+import saq
+from saq import Status
+from saq.utils import now
+
+from app.config.queues import (
+    observe_job_metrics,
+    reset_job_routing,
+    route_job_to_primary,
+    start_job_timer,
+    task_queue,
+)
+from app.contrib import replicas
+
+
+def _sample(name: str, labels: dict[str, str]) -> float:
+    return prometheus_client.REGISTRY.get_sample_value(name, labels) or 0
+
+
+async def test_job_metrics() -> None:
+    labels = {"queue": "default", "task": "metrics_test"}
+    job = saq.Job(function="metrics_test", queue=task_queue, queued=now() - 2000, started=now())
+    context = {"job": job}
+
+    await start_job_timer(context)  # type: ignore[arg-type]
+    job.status = Status.COMPLETE
+    await observe_job_metrics(context)  # type: ignore[arg-type]
+    job.status = Status.QUEUED
+    await observe_job_metrics(context)  # type: ignore[arg-type]
+
+    assert _sample("task_job_wait_seconds_sum", labels) >= 4
+    assert _sample("task_job_duration_seconds_count", labels) == 2
+    assert _sample("task_jobs_total", {**labels, "outcome": "complete"}) == 1
+    assert _sample("task_jobs_total", {**labels, "outcome": "retried"}) == 1
+
+
+async def test_jobs_read_from_primary() -> None:
+    context = {"job": saq.Job(function="primary_test", queue=task_queue)}
+
+    await route_job_to_primary(context)  # type: ignore[arg-type]
+    assert replicas._use_primary.get()
+    await reset_job_routing(context)  # type: ignore[arg-type]
+    assert not replicas._use_primary.get()
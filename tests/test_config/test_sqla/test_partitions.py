@@ -0,0 +1,45 @@
+import datetime
+
+from app.config.sqla.partitions import (
+    create_partition_ddl,
+    months_between,
+    next_month,
+    partition_name,
+    partition_parent,
+    partition_upper_bound,
+)
+
+
+def _utc(year: int, month: int, day: int, hour: int = 0, minute: int = 0) -> datetime.datetime:
+    return datetime.datetime(year, month, day, hour, minute, tzinfo=datetime.UTC)
+
+
+def test_next_month() -> None:
+    assert next_month(_utc(2026, 1, 31, 23, 59)) == _utc(2026, 2, 1)
+    assert next_month(_utc(2026, 12, 15)) == _utc(2027, 1, 1)
+
+
+def test_months_between() -> None:
+    assert months_between(_utc(2026, 11, 20), _utc(2027, 1, 1)) == [
+        _utc(2026, 11, 1),
+        _utc(2026, 12, 1),
+        _utc(2027, 1, 1),
+    ]
+
+
+def test_partition_names() -> None:
+    name = partition_name("refresh_tokens", _utc(2026, 12, 1))
+    assert name == "refresh_tokens_p202612"
+    assert partition_parent(name) == "refresh_tokens"
+    assert partition_parent("refresh_tokens_default") == "refresh_tokens"
+    assert partition_parent("refresh_tokens") is None
+
+    assert partition_upper_bound(name) == _utc(2027, 1, 1)
+    assert partition_upper_bound("refresh_tokens_default") is None
+
+
+def test_create_partition_ddl() -> None:
+    assert create_partition_ddl("refresh_tokens", _utc(2026, 10, 19, 12)) == (
+        "CREATE TABLE IF NOT EXISTS refresh_tokens_p202610 PARTITION OF refresh_tokens "
+        "FOR VALUES FROM ('2026-10-01T00:00:00+00:00') TO ('2026-11-01T00:00:00+00:00')"
+    )
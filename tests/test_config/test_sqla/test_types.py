@@ -1,8 +1,11 @@
+import dataclasses
 import decimal
 
+import pytest
+
 import sqlalchemy as sa
 
-from app.config.sqla.types import MoneyType
+from app.config.sqla.types import EmbedType, LazyEmbed, MoneyType
 
 
 class TestMoneyType:
@@ -15,3 +18,42 @@ class TestMoneyType:
         instance = MoneyType()
         assert instance.process_result_value(123, sa.Dialect()) == decimal.Decimal("1.23")
         assert instance.process_result_value(None, sa.Dialect()) is None
+
+
+@dataclasses.dataclass
+class _Embedded:
+    name: str = ""
+    tags: list[str] = dataclasses.field(default_factory=list)
+
+
+class TestEmbedType:
+    def test_process_bind_param(self) -> None:
+        instance = EmbedType(_Embedded)
+        assert instance.process_bind_param(_Embedded(name="a", tags=["b"]), sa.Dialect()) == {
+            "name": "a",
+            "tags": ["b"],
+        }
+        assert instance.process_bind_param(None, sa.Dialect()) is None
+
+        with pytest.raises(ValueError, match="Unsupported type"):
+            instance.process_bind_param(object(), sa.Dialect())  # type: ignore[arg-type]
+
+    def test_process_result_value(self) -> None:
+        instance = EmbedType(_Embedded)
+        assert instance.process_result_value({"name": "a"}, sa.Dialect()) == _Embedded(name="a")
+        assert instance.process_result_value(None, sa.Dialect()) is None
+
+    def test_lazy_result_value(self) -> None:
+        instance = EmbedType(_Embedded, lazy=True)
+        value = instance.process_result_value({"name": "a"}, sa.Dialect())
+        assert isinstance(value, LazyEmbed)
+        assert not value.is_loaded
+
+        # not accessed values are written back as is
+        assert instance.process_bind_param(value, sa.Dialect()) == {"name": "a"}
+
+        assert value.name == "a"
+        assert value.is_loaded
+        value.tags = ["b"]
+        assert instance.process_bind_param(value, sa.Dialect()) == {"name": "a", "tags": ["b"]}
+        assert value == _Embedded(name="a", tags=["b"])
@@ -0,0 +1,30 @@
+import datetime
+
+import pytest
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.contexts.auth.exceptions import TokenError
+from app.contexts.auth.repos import RefreshTokenRepo
+from app.contexts.users.models import User
+
+
+class TestRefreshTokenRepo:
+    async def test_delete_expired_before(self, dbsession: AsyncSession, user: User) -> None:
+        now = datetime.datetime.now(datetime.UTC)
+        repo = RefreshTokenRepo(dbsession)
+        for index in range(3):
+            await repo.create(f"expired-{index}", user.id, now - datetime.timedelta(days=10))
+        await repo.create("valid", user.id, now + datetime.timedelta(days=1))
+
+        assert await repo.delete_expired_before(now, limit=2) == 2
+        assert await repo.delete_expired_before(now, limit=2) == 1
+        assert await repo.delete_expired_before(now, limit=2) == 0
+        assert await repo.find_by_jit("valid")
+
+    async def test_create_rejects_taken_jit(self, dbsession: AsyncSession, user: User) -> None:
+        now = datetime.datetime.now(datetime.UTC)
+        repo = RefreshTokenRepo(dbsession)
+        await repo.create("taken", user.id, now + datetime.timedelta(days=1))
+
+        with pytest.raises(TokenError):
+            await repo.create("taken", user.id, now + datetime.timedelta(days=40))
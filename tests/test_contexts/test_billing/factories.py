@@ -180,6 +180,7 @@ class StripePriceFactory(factory.DictFactory):
     tiers_mode: str | None = None
     transform_usage: str | None = None
     trial_period_days: int | None = None
+    unit_amount: int | None = 20000
     usage_type: typing.Literal["licensed"] = "licensed"
 
     @classmethod
@@ -292,7 +293,7 @@ class StripeSubscriptionFactory(factory.DictFactory):
 
 class StripeEventFactory(factory.DictFactory):
     api_version: str = "2019-09-09"
-    id: str = factory.LazyAttribute(lambda self: f"evt_{self.created}")
+    id: str = factory.LazyFunction(lambda: f"evt_{uuid.uuid4().hex}")
     created: int = factory.LazyFunction(lambda: int(time.time()))
     data: dict[str, typing.Any] = factory.LazyFunction(lambda: {"object": StripeSessionFactory()})
     type: str = "checkout.session.completed"
@@ -0,0 +1,22 @@
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.contexts.billing.models import Subscription
+from app.contexts.billing.repo import SubscriptionRepo
+from app.contrib.money import Money
+from tests.factories import SubscriptionFactory
+
+
+class TestSubscriptionRepo:
+    async def test_get_revenue_by_currency(self, dbsession: AsyncSession) -> None:
+        SubscriptionFactory(price=Money(1000, "xts"))
+        SubscriptionFactory(price=Money(2550, "xts"))
+        SubscriptionFactory(price=Money(700, "xxx"))
+        SubscriptionFactory(price=Money(10000, "xts"), status=Subscription.Status.CANCELLED)
+
+        repo = SubscriptionRepo(dbsession)
+        revenue = await repo.get_revenue_by_currency()
+        assert revenue["xts"] == Money(3550, "xts")
+        assert revenue["xxx"] == Money(700, "xxx")
+
+        revenue = await repo.get_revenue_by_currency([Subscription.Status.CANCELLED])
+        assert revenue["xts"] == Money(10000, "xts")
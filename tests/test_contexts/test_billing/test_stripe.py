@@ -21,6 +21,7 @@ from app.contexts.billing.stripe import (
     update_stripe_subscription,
 )
 from app.contexts.teams.models import Team
+from app.contrib.money import Money
 from tests.factories import SubscriptionFactory, SubscriptionPlanFactory
 from tests.test_contexts.test_billing.factories import (
     StripePriceFactory,
@@ -77,6 +78,7 @@ class TestCreateSubscription:
             assert sub.plan.remote_product_id == stripe_price.product
             assert sub.remote_price_id == stripe_price.id
             assert sub.remote_customer_id == subscription.customer
+            assert sub.price == Money(20000, "usd")
 
     async def test_create_stripe_subscription_no_subscription_info(self, dbsession: AsyncSession, team: Team) -> None:
         stripe_session = StripeSessionFactory.make(
@@ -195,6 +197,7 @@ class TestUpdateSubscription:
             assert sub.expires_at.timestamp() == 1620000001
             assert sub.plan.remote_product_id == stripe_price.product
             assert sub.remote_price_id == stripe_price.id
+            assert sub.price == Money(20000, "usd")
 
     async def test_update_stripe_subscription_with_invalid_sub(self, dbsession: AsyncSession, team: Team) -> None:
         subscription_id = f"sub_{uuid.uuid4().hex}"
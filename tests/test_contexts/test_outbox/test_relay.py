@@ -0,0 +1,42 @@
+from unittest import mock
+
+import pytest
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.database import async_dbsession
+from app.contexts.outbox.models import OutboxMessage
+from app.contexts.outbox.relay import OutboxRelay
+
+
+class TestOutboxRelay:
+    async def test_relay(self, dbsession: AsyncSession) -> None:
+        messages = [OutboxMessage(function="debug_task", kwargs={"value": index}) for index in range(3)]
+        dbsession.add_all(messages)
+        await dbsession.commit()
+
+        queue = mock.AsyncMock()
+        relay = OutboxRelay(async_dbsession, queue, batch_size=1000)
+        assert await relay.relay() >= 3
+
+        jobs = {call.args[0].key: call.args[0] for call in queue.enqueue.call_args_list}
+        for message in messages:
+            job = jobs[f"outbox:{message.id}"]
+            assert job.function == "debug_task"
+            assert job.kwargs == message.kwargs
+
+        ids = [message.id for message in messages]
+        assert not (await dbsession.scalars(sa.select(OutboxMessage).where(OutboxMessage.id.in_(ids)))).all()
+
+    async def test_keeps_messages_when_enqueue_fails(self, dbsession: AsyncSession) -> None:
+        message = OutboxMessage(function="debug_task", kwargs={})
+        dbsession.add(message)
+        await dbsession.commit()
+
+        queue = mock.AsyncMock()
+        queue.enqueue.side_effect = ConnectionError
+        relay = OutboxRelay(async_dbsession, queue, batch_size=1000)
+        with pytest.raises(ConnectionError):
+            await relay.relay()
+
+        assert await dbsession.scalar(sa.select(OutboxMessage).where(OutboxMessage.id == message.id))
@@ -0,0 +1,79 @@
+import datetime
+
+import pytest
+from sqlalchemy.exc import InvalidRequestError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.cache import cache
+from app.contexts.teams.models import Team, TeamInvite, TeamMember, TeamRole
+from app.contexts.teams.repo import TeamRepo, count_cache_key
+from tests.factories import TeamInviteFactory, UserFactory
+
+
+class TestTeamRepo:
+    async def test_members_count_invalidated_on_insert(
+        self, dbsession: AsyncSession, team: Team, team_member: TeamMember, team_user_role: TeamRole
+    ) -> None:
+        repo = TeamRepo(dbsession)
+        assert (await repo.get_team_members_paginated(team.id)).total == 1
+        counts = await cache.get(count_cache_key(team.id, "members"))
+        assert counts
+        assert list(counts.values()) == [1]
+
+        dbsession.add(TeamMember(team_id=team.id, user_id=UserFactory().id, role_id=team_user_role.id))
+        await dbsession.commit()
+
+        assert await cache.get(count_cache_key(team.id, "members")) is None
+        assert (await repo.get_team_members_paginated(team.id)).total == 2
+
+    async def test_invite_many_skips_invited_emails(
+        self, dbsession: AsyncSession, team: Team, team_member: TeamMember, team_user_role: TeamRole
+    ) -> None:
+        TeamInviteFactory(team=team, email="invited@localhost.tld", role=team_user_role, inviter=team_member)
+        repo = TeamRepo(dbsession)
+
+        invites, skipped = await repo.invite_many(
+            team_id=team.id,
+            inviter_id=team_member.id,
+            role_id=team_user_role.id,
+            tokens={"invited@localhost.tld": "token1", "new@localhost.tld": "token2"},
+        )
+        assert [invite.email for invite in invites] == ["new@localhost.tld"]
+        assert isinstance(invites[0], TeamInvite)
+        assert invites[0].id
+        assert skipped == ["invited@localhost.tld"]
+
+    async def test_minimal_profile_does_not_load_relationships(
+        self, dbsession: AsyncSession, team: Team, team_member: TeamMember
+    ) -> None:
+        repo = TeamRepo(dbsession)
+        member = await repo.get_team_member_by_id(team.id, team_member.id, profile="minimal")
+        assert member
+        assert member.user_id == team_member.user_id
+        with pytest.raises(InvalidRequestError):
+            assert member.user
+
+    async def test_active_memberships_load_team_and_role(
+        self, dbsession: AsyncSession, team_member: TeamMember
+    ) -> None:
+        repo = TeamRepo(dbsession)
+        memberships = await repo.get_active_memberships(team_member.user_id)
+        membership = memberships[0]
+        assert membership.team.id == team_member.team_id
+        assert membership.role.id == team_member.role_id
+        with pytest.raises(InvalidRequestError):
+            assert membership.user
+
+    async def test_delete_invites_created_before(self, dbsession: AsyncSession, team: Team) -> None:
+        now = datetime.datetime.now(datetime.UTC)
+        old_invites = [TeamInviteFactory(team=team, created_at=now - datetime.timedelta(days=60)) for _ in range(3)]
+        fresh_invite = TeamInviteFactory(team=team)
+
+        repo = TeamRepo(dbsession)
+        before = now - datetime.timedelta(days=30)
+        assert await repo.delete_invites_created_before(before, limit=2) == 2
+        assert await repo.delete_invites_created_before(before, limit=2) == 1
+        assert await repo.delete_invites_created_before(before, limit=2) == 0
+        for invite in old_invites:
+            assert await repo.get_invitation(team.id, invite.id) is None
+        assert await repo.get_invitation(team.id, fresh_invite.id)
@@ -0,0 +1,34 @@
+import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.contexts.users.models import User
+from app.contexts.users.repo import UserRepo
+from tests.factories import UserFactory
+
+
+class TestUserRepo:
+    async def test_find_by_email(self, dbsession: AsyncSession, user: User) -> None:
+        repo = UserRepo(dbsession)
+        found = await repo.find_by_email(user.email.upper())
+        assert found
+        assert found.id == user.id
+
+        # lambda statement must not reuse the value bound on the first call
+        other = UserFactory()
+        found = await repo.find_by_email(other.email)
+        assert found
+        assert found.id == other.id
+
+        assert await repo.find_by_email("missing@example.com") is None
+
+    async def test_set_last_sign_in_many(self, dbsession: AsyncSession, user: User) -> None:
+        now = datetime.datetime.now(datetime.UTC).replace(microsecond=0)
+        other = UserFactory(last_sign_in=now)
+        repo = UserRepo(dbsession)
+
+        await repo.set_last_sign_in_many({user.id: now, other.id: now - datetime.timedelta(days=1)})
+        await dbsession.commit()
+
+        assert (await repo.get(user.id)).last_sign_in == now
+        assert (await repo.get(other.id)).last_sign_in == now  # older value ignored
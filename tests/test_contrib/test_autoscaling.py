@@ -0,0 +1,61 @@
+import asyncio
+import datetime
+from unittest import mock
+
+import pytest
+
+from app.contrib.autoscaling import Autoscaler, AutoscalingWorker, ScalingDecision
+
+
+def _autoscaler(**kwargs: object) -> Autoscaler:
+    return Autoscaler(min_concurrency=1, max_concurrency=16, target_wait=datetime.timedelta(seconds=1), **kwargs)  # type: ignore[arg-type]
+
+
+@pytest.mark.parametrize(
+    ("current", "depth", "oldest_job_age", "cpu", "expected"),
+    [
+        (4, 10, 0, 0.1, 8),  # backlog exceeds slots
+        (4, 2, 5, 0.1, 8),  # jobs wait too long
+        (12, 100, 5, 0.1, 16),  # capped by max concurrency
+        (4, 2, 0.1, 0.1, 4),  # keeps up
+        (8, 0, 0, 0.1, 6),  # idle
+        (1, 0, 0, 0.1, 1),  # capped by min concurrency
+        (4, 100, 5, 0.95, 3),  # CPU bound
+    ],
+)
+def test_decide(current: int, depth: int, oldest_job_age: float, cpu: float, expected: int) -> None:
+    assert _autoscaler().decide(current, depth, oldest_job_age, cpu) == expected
+
+
+async def _idle_dequeue(timeout: float = 0) -> None:
+    await asyncio.sleep(0.01)
+
+
+async def test_worker_scales_processing_loops() -> None:
+    queue = mock.MagicMock(dequeue=_idle_dequeue)
+    worker = AutoscalingWorker(queue, functions=[], concurrency=2)
+    worker.scale(2)
+    assert worker.slots == 2
+
+    worker.scale(5)
+    assert worker.slots == 5
+
+    worker.scale(1)
+    await asyncio.sleep(0.05)
+    assert worker.slots == 1
+    await worker.stop()
+
+
+async def test_adjust_reports_decision() -> None:
+    decisions: list[ScalingDecision] = []
+    autoscaler = _autoscaler(on_decision=decisions.append)
+    autoscaler.measure = mock.AsyncMock(return_value=(10, 3.0))  # type: ignore[method-assign]
+    autoscaler.measure_cpu = mock.MagicMock(return_value=0.1)  # type: ignore[method-assign]
+    worker = mock.MagicMock(spec=AutoscalingWorker, concurrency=2, queue=mock.MagicMock())
+    worker.queue.name = "default"
+
+    await autoscaler.adjust(worker)
+
+    worker.scale.assert_called_once_with(4)
+    assert decisions[0].queue == "default"
+    assert (decisions[0].previous, decisions[0].concurrency, decisions[0].depth) == (2, 4, 10)
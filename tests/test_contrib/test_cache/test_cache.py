@@ -16,6 +16,14 @@ class TestCache:
         await cache.set("key", "value", 60)
         assert await cache.get("key") == "value"
 
+    async def test_delete(self) -> None:
+        cache = Cache(MemoryCacheBackend())
+        await cache.set("key", "value", 60)
+        await cache.set("key2", "value", 60)
+        await cache.delete("key", "key2")
+        assert await cache.get("key") is None
+        assert await cache.get("key2") is None
+
     async def test_namespace(self) -> None:
         backend = MemoryCacheBackend()
         cache = Cache(
@@ -43,6 +51,12 @@ class TestMemoryCacheBackend:
         backend = MemoryCacheBackend()
         assert await backend.get("key2") is None
 
+    async def test_delete(self) -> None:
+        backend = MemoryCacheBackend()
+        await backend.set("key", b"value", 60)
+        await backend.delete("key", "missing")
+        assert backend.cache == {}
+
 
 @pytest.mark.skipif(not importlib.util.find_spec("redis"), reason="Redis is not installed.")
 class TestRedisCacheBackend:
@@ -0,0 +1,87 @@
+import asyncio
+import datetime
+import uuid
+from unittest import mock
+
+import pytest
+from redis.asyncio import Redis
+from saq.types import Context
+
+from app.config.settings import Config
+from app.contrib.cron import CronRegistry
+
+_calls: list[str] = []
+
+
+async def _cleanup(context: Context) -> None:
+    _calls.append("cleanup")
+
+
+async def _failing(context: Context) -> None:
+    raise ValueError("failed")
+
+
+async def _sleeping(context: Context) -> None:
+    await asyncio.sleep(10)
+
+
+@pytest.fixture
+def scheduler(settings: Config) -> CronRegistry:
+    return CronRegistry(Redis.from_url(settings.redis_url), namespace=f"test:{uuid.uuid4().hex}")
+
+
+class TestCronRegistry:
+    def test_cron_jobs(self, scheduler: CronRegistry) -> None:
+        scheduler.add(
+            _cleanup, "0 * * * *", timeout=datetime.timedelta(minutes=1), jitter=datetime.timedelta(seconds=30)
+        )
+        scheduler.add(_failing, "0 * * * *", enabled=False)
+
+        [cron_job] = scheduler.cron_jobs
+        assert cron_job.cron == "0 * * * *"
+        assert cron_job.timeout == 90  # jitter runs inside the job
+        assert cron_job.function.__qualname__ == "_cleanup"
+
+    async def test_records_runs(self, scheduler: CronRegistry) -> None:
+        _calls.clear()
+        job = scheduler.add(_cleanup, "0 * * * *")
+        failing = scheduler.add(_failing, "0 * * * *")
+
+        await scheduler.run(job, mock.MagicMock())
+        with pytest.raises(ValueError):
+            await scheduler.run(failing, mock.MagicMock())
+
+        assert _calls == ["cleanup"]
+        [run] = await scheduler.history(job.name)
+        assert run.status == "ok"
+        [failed_run] = await scheduler.history(failing.name)
+        assert failed_run.status == "failed"
+        assert "failed" in failed_run.error
+
+    async def test_records_cancelled_runs(self, scheduler: CronRegistry) -> None:
+        job = scheduler.add(_sleeping, "0 * * * *")
+
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(scheduler.run(job, mock.MagicMock()), 0.01)
+
+        [run] = await scheduler.history(job.name)
+        assert run.status == "failed"
+        assert "CancelledError" in run.error
+        assert not await scheduler.redis.exists(scheduler._key("lock", job.name))
+
+    async def test_skips_locked_job(self, scheduler: CronRegistry) -> None:
+        _calls.clear()
+        job = scheduler.add(_cleanup, "0 * * * *", jitter=datetime.timedelta(milliseconds=10))
+        await scheduler.redis.set(scheduler._key("lock", job.name), "other-run")
+
+        run = await scheduler.run(job, mock.MagicMock())
+
+        assert run.status == "skipped"
+        assert _calls == []
+
+    async def test_trims_history(self, scheduler: CronRegistry) -> None:
+        scheduler.history_size = 2
+        job = scheduler.add(_cleanup, "0 * * * *")
+        for _ in range(3):
+            await scheduler.run(job, mock.MagicMock())
+        assert len(await scheduler.history(job.name)) == 2
@@ -1,11 +1,38 @@
+import datetime
+import uuid
 from unittest import mock
 
-from app.contrib.events import Event, EventDispatcher, TASK_NAME
+import pytest
+import saq
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.config.settings import Config
+from app.contexts.outbox.models import OutboxMessage
+from app.contrib.events import HANDLER_TASK_NAME, TASK_NAME, WIRE_VERSION, Event, EventDispatcher, Subscriber
 
 
 class _DummyEvent(Event): ...
 
 
+class _UnsubscribedEvent(Event):
+    name: str
+
+
+_encoded = {"t": "tests.test_contrib.test_events:_DummyEvent", "d": {}}
+
+
+_handled: list[tuple[str, Event]] = []
+
+
+async def _send_mail(event: Event) -> None:
+    _handled.append(("mail", event))
+
+
+async def _track(event: Event) -> None:
+    _handled.append(("track", event))
+
+
 class TestEventDispatcher:
     async def test_emit_sync(self) -> None:
         subscriber = mock.AsyncMock()
@@ -33,10 +60,83 @@ class TestEventDispatcher:
         event = _DummyEvent()
         dispatcher._task_queue = mock.AsyncMock()
         await dispatcher.emit(event)
+        dispatcher._task_queue.enqueue.assert_called_once_with(TASK_NAME, envelope={"v": WIRE_VERSION, **_encoded})
+
+    async def test_emit_to_outbox(self, dbsession: AsyncSession) -> None:
+        """Events emitted with a session are written to the outbox in one row when the session commits."""
+        dispatcher = EventDispatcher(task_queue_url="", subscribers={_DummyEvent: []}, outbox=OutboxMessage)
+        dispatcher._task_queue = mock.AsyncMock()
+        await dispatcher.emit(_DummyEvent(), dbsession=dbsession)
+        await dispatcher.emit(_DummyEvent(), dbsession=dbsession)
+        assert not dbsession.new
+
+        await dbsession.commit()
+        dispatcher._task_queue.enqueue.assert_not_called()
+        message = await dbsession.scalar(sa.select(OutboxMessage).order_by(OutboxMessage.id.desc()).limit(1))
+        assert message
+        assert message.function == TASK_NAME
+        assert message.kwargs == {"batch": {"v": WIRE_VERSION, "events": [_encoded, _encoded]}}
+
+    async def test_emit_to_outbox_discarded_on_rollback(self, dbsession: AsyncSession) -> None:
+        outbox = mock.MagicMock()
+        dispatcher = EventDispatcher(task_queue_url="", subscribers={_DummyEvent: []}, outbox=outbox)
+        await dispatcher.emit(_DummyEvent(), dbsession=dbsession)
+
+        await dbsession.rollback()
+        await dbsession.commit()
+        outbox.assert_not_called()
+
+    async def test_emit_many(self) -> None:
+        dispatcher = EventDispatcher(task_queue_url="", subscribers={_DummyEvent: []}, max_batch_size=2)
+        dispatcher._task_queue = mock.AsyncMock()
+        await dispatcher.emit_many([_DummyEvent(), _DummyEvent(), _DummyEvent()])
+
+        assert dispatcher._task_queue.enqueue.call_args_list == [
+            mock.call(TASK_NAME, batch={"v": WIRE_VERSION, "events": [_encoded, _encoded]}),
+            mock.call(TASK_NAME, batch={"v": WIRE_VERSION, "events": [_encoded]}),
+        ]
+
+    async def test_emit_with_dedupe_key(self) -> None:
+        dispatcher = EventDispatcher(task_queue_url="", subscribers={_DummyEvent: []})
+        dispatcher._task_queue = mock.AsyncMock()
+        await dispatcher.emit(_DummyEvent(), dedupe_key="dummy:1", dedupe_window=datetime.timedelta(minutes=5))
         dispatcher._task_queue.enqueue.assert_called_once_with(
-            TASK_NAME, envelope={"type": "tests.test_contrib.test_events:_DummyEvent", "event": {}}
+            TASK_NAME, key="event:dummy:1", envelope={"v": WIRE_VERSION, **_encoded, "k": "dummy:1", "w": 300}
         )
 
+    async def test_drops_duplicate_events(self, settings: Config) -> None:
+        subscriber = mock.AsyncMock(side_effect=[ValueError("failed"), None])
+        dispatcher = EventDispatcher(task_queue_url=settings.redis_url, subscribers={_DummyEvent: [subscriber]})
+        envelope = {"v": WIRE_VERSION, **_encoded, "k": f"dummy:{uuid.uuid4().hex}", "w": 60}
+
+        with pytest.raises(ValueError):
+            await dispatcher.task_handler(mock.MagicMock(), envelope=envelope)
+        await dispatcher.task_handler(mock.MagicMock(), envelope=envelope)  # failed delivery released the key
+        await dispatcher.task_handler(mock.MagicMock(), envelope=envelope)
+        assert subscriber.call_count == 2
+
+    async def test_coalesce(self) -> None:
+        dispatcher = EventDispatcher(task_queue_url="", subscribers={_DummyEvent: []})
+        dispatcher._task_queue = mock.AsyncMock()
+        async with dispatcher.coalesce():
+            await dispatcher.emit(_DummyEvent())
+            await dispatcher.emit(_DummyEvent())
+            dispatcher._task_queue.enqueue.assert_not_called()
+
+        dispatcher._task_queue.enqueue.assert_called_once_with(
+            TASK_NAME, batch={"v": WIRE_VERSION, "events": [_encoded, _encoded]}
+        )
+
+    async def test_coalesce_enqueues_events_when_block_raises(self) -> None:
+        dispatcher = EventDispatcher(task_queue_url="", subscribers={_DummyEvent: []})
+        dispatcher._task_queue = task_queue = mock.AsyncMock()
+        with pytest.raises(ValueError):
+            async with dispatcher.coalesce():
+                await dispatcher.emit(_DummyEvent())
+                raise ValueError
+
+        task_queue.enqueue.assert_called_once_with(TASK_NAME, envelope={"v": WIRE_VERSION, **_encoded})
+
     async def test_dispatches_single_handlers_sync(self) -> None:
         subscriber = mock.AsyncMock()
         dispatcher = EventDispatcher(
@@ -75,9 +175,98 @@ class TestEventDispatcher:
             sync=False,
         )
         event = _DummyEvent()
-        await dispatcher.task_handler(mock.MagicMock(), envelope={"type": event.event_type(), "event": {}})
+        await dispatcher.task_handler(mock.MagicMock(), envelope={"v": WIRE_VERSION, **_encoded})
         subscriber.assert_called_once_with(event)
 
+    async def test_dispatches_legacy_envelope_from_queue(self) -> None:
+        """Jobs queued before the wire format was versioned are still handled."""
+        subscriber = mock.AsyncMock()
+        dispatcher = EventDispatcher(task_queue_url="", subscribers={_DummyEvent: [subscriber]})
+        envelope = {"type": _DummyEvent.event_type(), "event": {}}
+        await dispatcher.task_handler(mock.MagicMock(), envelope=envelope)
+        await dispatcher.task_handler(mock.MagicMock(), batch={"events": [envelope]})
+        assert subscriber.call_count == 2
+
+    async def test_dispatches_batch_from_queue(self) -> None:
+        subscriber = mock.AsyncMock()
+        dispatcher = EventDispatcher(task_queue_url="", subscribers={_DummyEvent: [subscriber]})
+        await dispatcher.task_handler(mock.MagicMock(), batch={"v": WIRE_VERSION, "events": [_encoded, _encoded]})
+        assert subscriber.call_count == 2
+
+    async def test_skips_unknown_and_unsubscribed_events(self) -> None:
+        subscriber = mock.AsyncMock()
+        dispatcher = EventDispatcher(task_queue_url="", subscribers={_DummyEvent: [subscriber]})
+        unsubscribed = {"t": _UnsubscribedEvent.event_type(), "d": {"name": "x"}}
+        unknown = {"t": "app.removed:Event", "d": {}}
+        await dispatcher.task_handler(
+            mock.MagicMock(), batch={"v": WIRE_VERSION, "events": [unknown, unsubscribed, _encoded]}
+        )
+        subscriber.assert_called_once_with(_DummyEvent())
+
+    async def test_rejects_newer_wire_format(self) -> None:
+        dispatcher = EventDispatcher(task_queue_url="", subscribers={_DummyEvent: []})
+        with pytest.raises(ValueError, match="version"):
+            await dispatcher.task_handler(mock.MagicMock(), envelope={"v": WIRE_VERSION + 1, **_encoded})
+
+    async def test_fans_out_to_subscriber_jobs(self) -> None:
+        dispatcher = EventDispatcher(
+            task_queue_url="",
+            subscribers={
+                _DummyEvent: [Subscriber(_send_mail, queue="mail", timeout=60, retries=5), _track],
+            },
+            fan_out=True,
+        )
+        dispatcher._task_queue = task_queue = mock.AsyncMock()
+        dispatcher._queues["mail"] = mail_queue = mock.AsyncMock()
+        ctx = {"job": saq.Job(function=TASK_NAME, key="dispatch")}
+        await dispatcher.task_handler(ctx, envelope={"v": WIRE_VERSION, **_encoded})  # type: ignore[arg-type]
+
+        mail_job = mail_queue.enqueue.call_args.args[0]
+        assert mail_job.function == HANDLER_TASK_NAME
+        assert mail_job.kwargs == {
+            "handler": Subscriber(_send_mail).name,
+            "batch": {"v": WIRE_VERSION, "events": [_encoded]},
+        }
+        assert mail_job.key == f"dispatch:{Subscriber(_send_mail).name}"
+        assert (mail_job.timeout, mail_job.retries) == (60, 5)
+
+        track_job = task_queue.enqueue.call_args.args[0]
+        assert track_job.kwargs == {
+            "handler": Subscriber(_track).name,
+            "batch": {"v": WIRE_VERSION, "events": [_encoded]},
+        }
+
+    async def test_handles_fanned_out_job(self) -> None:
+        _handled.clear()
+        dispatcher = EventDispatcher(task_queue_url="", subscribers={_DummyEvent: [_send_mail, _track]}, fan_out=True)
+        await dispatcher.handler_task_handler(
+            mock.MagicMock(), handler=Subscriber(_track).name, batch={"v": WIRE_VERSION, "events": [_encoded]}
+        )
+        assert _handled == [("track", _DummyEvent())]
+
+    async def test_skips_unknown_fanned_out_handler(self) -> None:
+        _handled.clear()
+        dispatcher = EventDispatcher(task_queue_url="", subscribers={_DummyEvent: [_track]}, fan_out=True)
+        await dispatcher.handler_task_handler(
+            mock.MagicMock(), handler="tests:_removed", batch={"v": WIRE_VERSION, "events": [_encoded]}
+        )
+        assert _handled == []
+
+    async def test_reports_handled_events(self) -> None:
+        on_handled = mock.MagicMock()
+        error = ValueError("failed")
+        failing = mock.AsyncMock(side_effect=error)
+        dispatcher = EventDispatcher(task_queue_url="", subscribers={_DummyEvent: [_track]}, on_handled=on_handled)
+
+        await dispatcher.dispatch(_DummyEvent())
+        with pytest.raises(ValueError):
+            await dispatcher.call_handler(_DummyEvent(), failing)
+
+        assert on_handled.call_args_list[0].args[:2] == (_DummyEvent.event_type(), Subscriber(_track).name)
+        assert on_handled.call_args_list[0].args[3] is None
+        assert on_handled.call_args_list[1].args[3] is error
+
     def test_task_function(self) -> None:
         dispatcher = EventDispatcher(task_queue_url="", subscribers={})
         assert dispatcher.task == (TASK_NAME, dispatcher.task_handler)
+        assert dispatcher.tasks == [dispatcher.task, (HANDLER_TASK_NAME, dispatcher.handler_task_handler)]
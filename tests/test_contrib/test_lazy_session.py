@@ -0,0 +1,65 @@
+from unittest import mock
+
+import sqlalchemy as sa
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.config.database import async_dbsession
+from app.contexts.users.models import User
+from app.contrib.events import Event, EventDispatcher
+from app.contrib.lazy_session import LazyDbSessionMiddleware, LazySession
+
+
+class _LazySessionEvent(Event): ...
+
+
+class TestLazySession:
+    async def test_creates_session_on_first_use(self) -> None:
+        dbsession = LazySession(async_dbsession)
+        assert not dbsession.started
+        await dbsession.execute(sa.select(sa.literal(1)))
+        assert dbsession.started
+        await dbsession.close()
+
+    async def test_release_ends_read_only_transaction(self) -> None:
+        dbsession = LazySession(async_dbsession)
+        await dbsession.execute(sa.select(sa.literal(1)))
+        assert dbsession.in_transaction()
+
+        await dbsession.release()
+        assert not dbsession.in_transaction()
+        await dbsession.close()
+
+    async def test_release_keeps_transaction_with_writes(self) -> None:
+        dbsession = LazySession(async_dbsession)
+        await dbsession.execute(sa.update(User).where(User.id == -1).values(first_name="name"))
+
+        await dbsession.release()
+        assert dbsession.in_transaction()
+        await dbsession.close()
+
+    async def test_release_keeps_transaction_with_pending_events(self) -> None:
+        dbsession = LazySession(async_dbsession)
+        dispatcher = EventDispatcher(task_queue_url="", subscribers={}, outbox=mock.MagicMock())
+        await dispatcher.emit(_LazySessionEvent(), dbsession=dbsession.get_session())
+
+        await dbsession.release()
+        assert dbsession.in_transaction()
+        await dbsession.close()
+
+
+class TestLazyDbSessionMiddleware:
+    def test_no_session_for_requests_without_db(self) -> None:
+        sessions: list[LazySession] = []
+
+        async def view(request: Request) -> Response:
+            sessions.append(request.state.dbsession)
+            return Response("ok")
+
+        app = Starlette(routes=[Route("/", view)])
+        with TestClient(LazyDbSessionMiddleware(app, session_factory=async_dbsession)) as client:
+            assert client.get("/").status_code == 200
+        assert not sessions[0].started
@@ -0,0 +1,28 @@
+import decimal
+
+import pytest
+
+from app.contrib.money import Money, totals_from_rows
+
+
+class TestMoney:
+    def test_from_amount(self) -> None:
+        assert Money.from_amount("19.99", "USD") == Money(1999, "usd")
+        assert Money.from_amount(decimal.Decimal("0.005"), "usd") == Money(1, "usd")
+        assert Money.from_amount(5, "usd") == Money(500, "usd")
+
+    def test_amount(self) -> None:
+        assert Money(1999, "usd").amount == decimal.Decimal("19.99")
+        assert str(Money(1999, "usd")) == "19.99 USD"
+
+    def test_add(self) -> None:
+        assert Money(100, "usd") + Money(250, "usd") == Money(350, "usd")
+        with pytest.raises(ValueError, match="Cannot add"):
+            Money(100, "usd") + Money(100, "eur")
+
+
+def test_totals_from_rows() -> None:
+    assert totals_from_rows([("eur", 100), ("usd", decimal.Decimal(250))]) == {
+        "eur": Money(100, "eur"),
+        "usd": Money(250, "usd"),
+    }
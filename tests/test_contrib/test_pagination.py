@@ -0,0 +1,112 @@
+from unittest import mock
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.contexts.teams.models import Team, TeamMember
+from app.contrib.cache import Cache
+from app.contrib.cache.backends.memory import MemoryCacheBackend
+from app.contrib.pagination import CursorPaginator, EstimatedCountPaginator
+from tests.factories import TeamMemberFactory, UserFactory
+
+
+class TestCursorPaginator:
+    async def test_paginates_forward_and_backward(self, dbsession: AsyncSession, team: Team) -> None:
+        members = [TeamMemberFactory(team=team, user=UserFactory()) for _ in range(5)]
+        stmt = sa.select(TeamMember).where(TeamMember.team_id == team.id)
+        paginator = CursorPaginator(dbsession, secret_key="secret")
+
+        first_page = await paginator.paginate(stmt, [TeamMember.id], page_size=2)
+        assert [m.id for m in first_page] == [m.id for m in members[:2]]
+        assert first_page.has_next
+        assert not first_page.has_previous
+
+        second_page = await paginator.paginate(stmt, [TeamMember.id], cursor=first_page.next_cursor, page_size=2)
+        assert [m.id for m in second_page] == [m.id for m in members[2:4]]
+        assert second_page.has_next
+        assert second_page.has_previous
+
+        last_page = await paginator.paginate(stmt, [TeamMember.id], cursor=second_page.next_cursor, page_size=2)
+        assert [m.id for m in last_page] == [members[4].id]
+        assert not last_page.has_next
+
+        page = await paginator.paginate(stmt, [TeamMember.id], cursor=last_page.previous_cursor, page_size=2)
+        assert [m.id for m in page] == [m.id for m in members[2:4]]
+
+        page = await paginator.paginate(stmt, [TeamMember.id], cursor=page.previous_cursor, page_size=2)
+        assert [m.id for m in page] == [m.id for m in members[:2]]
+        assert not page.has_previous
+
+    async def test_total(self, dbsession: AsyncSession, team: Team) -> None:
+        for _ in range(3):
+            TeamMemberFactory(team=team, user=UserFactory())
+        stmt = sa.select(TeamMember).where(TeamMember.team_id == team.id)
+        paginator = CursorPaginator(dbsession, secret_key="secret")
+
+        assert (await paginator.paginate(stmt, [TeamMember.id], page_size=2)).total is None
+        assert (await paginator.paginate(stmt, [TeamMember.id], page_size=2, with_total=True)).total == 3
+
+    async def test_tampered_cursor_returns_first_page(self, dbsession: AsyncSession, team: Team) -> None:
+        members = [TeamMemberFactory(team=team, user=UserFactory()) for _ in range(3)]
+        stmt = sa.select(TeamMember).where(TeamMember.team_id == team.id)
+        paginator = CursorPaginator(dbsession, secret_key="secret")
+        forged = CursorPaginator(dbsession, secret_key="other").encode_cursor([TeamMember.id], members[1], "next")
+
+        page = await paginator.paginate(stmt, [TeamMember.id], cursor=forged, page_size=2)
+        assert [m.id for m in page] == [m.id for m in members[:2]]
+
+
+class TestEstimatedCountPaginator:
+    async def test_exact_count_below_threshold(self, dbsession: AsyncSession, team: Team) -> None:
+        for _ in range(3):
+            TeamMemberFactory(team=team, user=UserFactory())
+        stmt = sa.select(TeamMember).where(TeamMember.team_id == team.id)
+        paginator = EstimatedCountPaginator(dbsession, threshold=1_000_000)
+
+        page = await paginator.paginate(stmt, page=1, page_size=2)
+        assert page.total == 3
+        assert not page.total_is_approximate
+        assert len(page) == 2
+
+    async def test_estimated_count_above_threshold(self, dbsession: AsyncSession, team: Team) -> None:
+        TeamMemberFactory(team=team, user=UserFactory())
+        stmt = sa.select(TeamMember).where(TeamMember.team_id == team.id)
+        paginator = EstimatedCountPaginator(dbsession, threshold=0)
+
+        page = await paginator.paginate(stmt, page=1, page_size=2)
+        assert page.total_is_approximate
+
+    async def test_caches_exact_count(self, dbsession: AsyncSession, team: Team) -> None:
+        TeamMemberFactory(team=team, user=UserFactory())
+        stmt = sa.select(TeamMember).where(TeamMember.team_id == team.id)
+        cache = Cache(MemoryCacheBackend())
+        paginator = EstimatedCountPaginator(dbsession, threshold=1_000_000, cache=cache, cache_key="count")
+
+        assert (await paginator.paginate(stmt, page=1, page_size=2)).total == 1
+        assert await cache.get("count") == {paginator.filter_key(stmt): 1}
+
+        TeamMemberFactory(team=team, user=UserFactory())
+        assert (await paginator.paginate(stmt, page=1, page_size=2)).total == 1
+
+    async def test_caches_counts_by_filter(self, dbsession: AsyncSession, team: Team) -> None:
+        member = TeamMemberFactory(team=team, user=UserFactory())
+        TeamMemberFactory(team=team, user=UserFactory())
+        stmt = sa.select(TeamMember).where(TeamMember.team_id == team.id)
+        cache = Cache(MemoryCacheBackend())
+        paginator = EstimatedCountPaginator(dbsession, threshold=1_000_000, cache=cache, cache_key="count")
+
+        assert (await paginator.paginate(stmt, page=1, page_size=2)).total == 2
+        filtered = stmt.where(TeamMember.user_id == member.user_id)
+        assert (await paginator.paginate(filtered, page=1, page_size=2)).total == 1
+
+    async def test_skips_estimate_after_small_count(self, dbsession: AsyncSession, team: Team) -> None:
+        TeamMemberFactory(team=team, user=UserFactory())
+        stmt = sa.select(TeamMember).where(TeamMember.team_id == team.id)
+        cache = Cache(MemoryCacheBackend())
+        paginator = EstimatedCountPaginator(dbsession, threshold=1_000_000, cache=cache, cache_key="count")
+        await paginator.paginate(stmt, page=1, page_size=2)
+        await cache.delete("count")
+
+        with mock.patch.object(paginator, "estimate") as estimate:
+            assert (await paginator.paginate(stmt, page=1, page_size=2)).total == 1
+        estimate.assert_not_called()
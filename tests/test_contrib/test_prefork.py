@@ -0,0 +1,78 @@
+import os
+import pathlib
+import signal
+import time
+
+from app.contrib.prefork import Supervisor, get_rss
+
+
+def _supervise(supervisor: Supervisor, seconds: float) -> None:
+    handler = signal.signal(signal.SIGALRM, lambda *args: supervisor.stop())
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        supervisor.run()
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, handler)
+
+
+def _record_start(path: pathlib.Path, slot: int) -> None:
+    with path.open("a") as f:
+        f.write(f"{slot}\n")
+
+
+def test_restarts_crashed_children_with_backoff(tmp_path: pathlib.Path) -> None:
+    starts = tmp_path / "starts"
+
+    def target(slot: int) -> None:
+        _record_start(starts, slot)
+        raise RuntimeError("crash")
+
+    supervisor = Supervisor(target, processes=1, backoff=0.2, check_interval=0.05)
+    _supervise(supervisor, 1.1)
+
+    # restarts after 0.2 and 0.4 seconds, the next one would be 0.8 seconds later
+    assert starts.read_text().splitlines() == ["0", "0", "0"]
+    assert not supervisor.children
+
+
+def test_replaces_exited_children_at_once(tmp_path: pathlib.Path) -> None:
+    starts = tmp_path / "starts"
+
+    def target(slot: int) -> None:
+        _record_start(starts, slot)
+        time.sleep(0.2)
+
+    supervisor = Supervisor(target, processes=2, backoff=10, check_interval=0.05)
+    _supervise(supervisor, 0.5)
+
+    lines = starts.read_text().splitlines()
+    assert lines.count("0") >= 2
+    assert lines.count("1") >= 2
+
+
+def test_recycles_large_children(tmp_path: pathlib.Path) -> None:
+    starts = tmp_path / "starts"
+
+    def target(slot: int) -> None:
+        _record_start(starts, slot)
+        time.sleep(10)
+
+    supervisor = Supervisor(target, processes=1, max_rss=1, backoff=10, check_interval=0.1)
+    _supervise(supervisor, 0.5)
+
+    assert len(starts.read_text().splitlines()) >= 2
+
+
+def test_stops_children_on_shutdown(tmp_path: pathlib.Path) -> None:
+    pids = tmp_path / "pids"
+
+    def target(slot: int) -> None:
+        pids.write_text(str(os.getpid()))
+        time.sleep(10)
+
+    supervisor = Supervisor(target, processes=1, check_interval=0.05)
+    _supervise(supervisor, 0.3)
+
+    pid = int(pids.read_text())
+    assert get_rss(pid) is None
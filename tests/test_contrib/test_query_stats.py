@@ -0,0 +1,28 @@
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.contrib.query_stats import QueryStats, collect_query_stats, get_query_stats
+
+
+class TestQueryStats:
+    def test_record(self) -> None:
+        stats = QueryStats()
+        stats.record("select 1", (1,), 0.5)
+        stats.record("select 1", (1,), 0.5)
+        stats.record("select 1", (2,), 0.5)
+        assert stats.statements == 3
+        assert stats.duplicates == 1
+        assert stats.duration == 1.5
+        assert stats.repeated_statements(3) == [("select 1", 3)]
+        assert stats.repeated_statements(4) == []
+
+    async def test_collects_executed_statements(self, dbsession: AsyncSession) -> None:
+        with collect_query_stats() as stats:
+            await dbsession.execute(sa.select(sa.literal(1)))
+            await dbsession.execute(sa.select(sa.literal(1)))
+            assert get_query_stats() is stats
+
+        assert get_query_stats() is None
+        assert stats.statements >= 2
+        assert stats.duplicates >= 1
+        assert stats.duration > 0
@@ -0,0 +1,61 @@
+import asyncio
+import datetime
+import uuid
+from unittest import mock
+
+import pytest
+import saq
+
+from app.config.settings import Config
+from app.contrib.queues import enqueue_unique, serve_workers
+
+
+class _Worker:
+    SIGNALS = saq.Worker.SIGNALS
+
+    def __init__(self, error: Exception | None = None) -> None:
+        self.queue = mock.AsyncMock()
+        self.error = error
+        self.stopped = False
+
+    async def start(self) -> None:
+        try:
+            await asyncio.sleep(0)
+            if self.error:
+                raise self.error
+            await asyncio.Event().wait()
+        except asyncio.CancelledError:
+            self.stopped = True
+
+
+async def test_serve_workers_stops_all_when_one_fails() -> None:
+    healthy, failing = _Worker(), _Worker(error=ConnectionError("down"))
+    with pytest.raises(ConnectionError):
+        await serve_workers([healthy, failing])  # type: ignore[list-item]
+
+    assert healthy.stopped
+    assert healthy.SIGNALS == []
+    healthy.queue.connect.assert_awaited_once()
+    healthy.queue.disconnect.assert_awaited_once()
+
+
+async def test_enqueue_unique(settings: Config) -> None:
+    queue = saq.Queue.from_url(settings.redis_url, name=f"test-{uuid.uuid4().hex}")
+    window = datetime.timedelta(minutes=1)
+    job = await enqueue_unique(queue, "resend_invite", key="invite:1", window=window, invite_id=1)
+    assert job
+    assert job.kwargs == {"invite_id": 1}
+
+    await queue.finish(job, saq.Status.COMPLETE)
+    assert not await enqueue_unique(queue, "resend_invite", key="invite:1", window=window, invite_id=1)
+    await queue.disconnect()
+
+
+async def test_enqueue_unique_debounced(settings: Config) -> None:
+    queue = saq.Queue.from_url(settings.redis_url, name=f"test-{uuid.uuid4().hex}")
+    debounce = datetime.timedelta(seconds=30)
+    job = await enqueue_unique(queue, "sync_profile", key="profile:1", debounce=debounce)
+    assert job
+    assert job.scheduled > 0
+    assert not await enqueue_unique(queue, "sync_profile", key="profile:1", debounce=debounce)
+    await queue.disconnect()
@@ -0,0 +1,73 @@
+import asyncio
+from unittest import mock
+
+import sqlalchemy as sa
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from app.config.settings import Config
+from app.contexts.users.models import User
+from app.contrib.replicas import ReplicaSet, RoutingSession, track_writes, use_primary
+
+
+def make_session(primary: AsyncEngine, replicas: ReplicaSet | None) -> RoutingSession:
+    return RoutingSession(bind=primary.sync_engine, replicas=replicas)
+
+
+class TestRoutingSession:
+    def test_routes_reads_to_replica(self, settings: Config) -> None:
+        primary = create_async_engine(settings.database_url)
+        replica = create_async_engine(settings.database_url)
+        session = make_session(primary, ReplicaSet([replica]))
+
+        assert session.get_bind(clause=sa.select(User)) is replica.sync_engine
+        assert session.get_bind(clause=sa.update(User).values(first_name="x")) is primary.sync_engine
+        assert session.get_bind(clause=sa.select(User).with_for_update()) is primary.sync_engine
+        assert session.get_bind() is primary.sync_engine
+
+    def test_without_replicas(self, settings: Config) -> None:
+        primary = create_async_engine(settings.database_url)
+        session = make_session(primary, None)
+        assert session.get_bind(clause=sa.select(User)) is primary.sync_engine
+
+    def test_use_primary(self, settings: Config) -> None:
+        primary = create_async_engine(settings.database_url)
+        replica = create_async_engine(settings.database_url)
+        session = make_session(primary, ReplicaSet([replica]))
+
+        with use_primary():
+            assert session.get_bind(clause=sa.select(User)) is primary.sync_engine
+        assert session.get_bind(clause=sa.select(User)) is replica.sync_engine
+
+    def test_falls_back_to_primary_when_replicas_lag(self, settings: Config) -> None:
+        primary = create_async_engine(settings.database_url)
+        replicas = ReplicaSet([create_async_engine(settings.database_url)])
+        replicas.available = []
+        session = make_session(primary, replicas)
+        assert session.get_bind(clause=sa.select(User)) is primary.sync_engine
+
+    async def test_reads_own_writes(self, settings: Config) -> None:
+        primary = create_async_engine(settings.database_url)
+        replica = create_async_engine(settings.database_url)
+        async with AsyncSession(primary, sync_session_class=RoutingSession, replicas=ReplicaSet([replica])) as session:
+            with track_writes() as tracker:
+                await session.execute(sa.select(User).where(User.id == -1))
+                await session.commit()
+                assert not tracker.committed
+
+                await session.execute(sa.update(User).where(User.id == -1).values(first_name="x"))
+                await session.commit()
+                assert tracker.committed
+
+            assert session.sync_session.get_bind(clause=sa.select(User)) is primary.sync_engine
+
+
+class TestReplicaSet:
+    async def test_start_monitor(self, settings: Config) -> None:
+        replicas = ReplicaSet([create_async_engine(settings.database_url)])
+        with mock.patch.object(replicas, "check") as check:
+            replicas.start_monitor()
+            replicas.start_monitor()  # already running
+            await asyncio.sleep(0)
+            replicas.stop_monitor()
+
+        check.assert_awaited_once()
@@ -0,0 +1,38 @@
+import datetime
+import uuid
+
+import pytest
+from redis.asyncio import Redis
+
+from app.config.settings import Config
+from app.contrib.write_behind import TimestampBuffer
+
+NOW = datetime.datetime(2024, 1, 1, tzinfo=datetime.UTC)
+
+
+@pytest.fixture
+def buffer(settings: Config) -> TimestampBuffer:
+    return TimestampBuffer(Redis.from_url(settings.redis_url), key=f"test:{uuid.uuid4().hex}")
+
+
+class TestTimestampBuffer:
+    async def test_keeps_latest_value(self, buffer: TimestampBuffer) -> None:
+        await buffer.record(1, NOW)
+        await buffer.record(1, NOW - datetime.timedelta(days=1))
+        await buffer.record(2, NOW)
+
+        async with buffer.drain() as values:
+            assert values == {"1": NOW, "2": NOW}
+
+        async with buffer.drain() as values:
+            assert values == {}
+
+    async def test_restores_values_on_error(self, buffer: TimestampBuffer) -> None:
+        await buffer.record(1, NOW)
+
+        with pytest.raises(RuntimeError):
+            async with buffer.drain():
+                raise RuntimeError
+
+        async with buffer.drain() as values:
+            assert values == {"1": NOW}
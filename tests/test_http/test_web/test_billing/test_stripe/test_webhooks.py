@@ -167,3 +167,22 @@ def test_raises_billing_error(team: Team, client: TestClient, dbsession_sync: Se
         )
         assert response.status_code == 400
         assert error_codes.SUBSCRIPTION_REQUIRED.code in response.text
+
+
+def test_skips_redelivered_event(client: TestClient, settings: Config) -> None:
+    event_data = StripeEventFactory(type="customer.subscription.deleted", data={"object": StripeSubscriptionFactory()})
+    payload = json.dumps(event_data)
+    with mock.patch(
+        "app.http.web.billing.routes_stripe_public.cancel_stripe_subscription", mock.AsyncMock(return_value=1)
+    ) as cancel:
+        for _ in range(2):
+            response = client.post(
+                "/stripe/webhook",
+                content=payload,
+                headers={
+                    "Stripe-Signature": SignatureMaker.make_signature(payload, settings.stripe_webhook_secret),
+                },
+            )
+            assert response.status_code == 200
+
+    cancel.assert_awaited_once()
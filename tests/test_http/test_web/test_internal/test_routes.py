@@ -1,5 +1,24 @@
+import pytest
 from starlette.testclient import TestClient
 
+from app.config.settings import Config
+
 
 def test_version_route(client: TestClient) -> None:
     assert client.get("/version").status_code == 200
+
+
+def test_metrics_route(client: TestClient, settings: Config) -> None:
+    response = client.get("/metrics", headers={"authorization": f"Bearer {settings.metrics_token}"})
+    assert response.status_code == 200
+    assert "db_statements" in response.text
+
+
+def test_metrics_route_requires_token(client: TestClient) -> None:
+    assert client.get("/metrics").status_code == 401
+    assert client.get("/metrics", headers={"authorization": "Bearer invalid"}).status_code == 401
+
+
+def test_metrics_route_disabled(client: TestClient, settings: Config, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(settings, "metrics_token", "")
+    assert client.get("/metrics").status_code == 404
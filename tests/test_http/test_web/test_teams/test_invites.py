@@ -16,6 +16,14 @@ class TestInvitations:
         response = auth_client.get("/app/teams/members/invite")
         assert response.status_code == 200
 
+    def test_export_invites(self, auth_client: TestClient, team: Team) -> None:
+        invite = TeamInviteFactory(team=team)
+        response = auth_client.get("/app/teams/invites/export.csv")
+        assert response.status_code == 200
+        lines = response.text.splitlines()
+        assert lines[0] == "id,email,role,invited_at"
+        assert lines[1].startswith(f"{invite.id},{invite.email},")
+
     def test_invite_member(
         self,
         auth_client: TestClient,
@@ -61,6 +69,28 @@ class TestInvitations:
         assert len(mailbox) == 0
         assert "One or more of the emails you entered is already invited." in response.text
 
+    def test_partially_duplicate_invitation(
+        self,
+        auth_client: TestClient,
+        team: Team,
+        team_user_role: TeamRole,
+        mailbox: Mailbox,
+        team_member: TeamMember,
+    ) -> None:
+        TeamInviteFactory(team=team, email="user@localhost.tld", role=team_user_role, inviter=team_member)
+
+        response = auth_client.post(
+            "/app/teams/members/invite",
+            data={
+                "email": "user@localhost.tld, user2@localhost.tld",
+                "role": str(team_user_role.id),
+            },
+        )
+        assert response.status_code == 204
+        assert len(mailbox) == 1
+        assert mailbox[0]["to"] == "user2@localhost.tld"
+        assert "user@localhost.tld" in as_htmx_response(response).events()["toast"]["message"]
+
     def test_notifies_team_owner(
         self, auth_client: TestClient, team: Team, team_user_role: TeamRole, mailbox: Mailbox, dbsession_sync: Session
     ) -> None:
@@ -1,9 +1,15 @@
+import asyncio
+import json
+
 import sqlalchemy as sa
 from sqlalchemy.orm import Session
 from starlette.testclient import TestClient
 
+from app.config.cache import cache
 from app.contexts.teams.models import Team, TeamMember
-from app.contrib.testing import TestAuthClient
+from app.contexts.teams.repo import count_cache_key
+from app.contrib.query_stats import STATEMENTS_HEADER
+from app.contrib.testing import QueryBudget, TestAuthClient
 from tests.factories import TeamMemberFactory, UserFactory
 
 
@@ -12,6 +18,38 @@ class TestMemberships:
         response = auth_client.get("/app/teams/members")
         assert response.status_code == 200
 
+    def test_members_page_query_budget(self, auth_client: TestClient, team: Team, query_budget: QueryBudget) -> None:
+        response = auth_client.get("/app/teams/members")
+        query_budget(response, max_statements=20, max_duplicates=5)
+
+        # statement count must not depend on the number of members, both requests count members
+        for _ in range(5):
+            TeamMemberFactory(team=team, user=UserFactory())
+        asyncio.run(cache.delete(count_cache_key(team.id, "members")))
+        next_response = auth_client.get("/app/teams/members")
+        assert next_response.headers[STATEMENTS_HEADER] == response.headers[STATEMENTS_HEADER]
+
+    def test_export_members_csv(self, auth_client: TestClient, team_member: TeamMember) -> None:
+        response = auth_client.get("/app/teams/members/export.csv")
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        assert 'filename="members.csv"' in response.headers["content-disposition"]
+
+        lines = response.text.splitlines()
+        assert lines[0] == "id,email,name,role,suspended_at,joined_at"
+        assert len(lines) == 2
+        assert team_member.user.email in lines[1]
+
+    def test_export_members_jsonl(self, auth_client: TestClient, team_member: TeamMember) -> None:
+        response = auth_client.get("/app/teams/members/export.jsonl")
+        assert response.status_code == 200
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        assert [row["email"] for row in rows] == [team_member.user.email]
+
+    def test_export_members_unknown_format(self, auth_client: TestClient) -> None:
+        response = auth_client.get("/app/teams/members/export.xlsx")
+        assert response.status_code == 404
+
     def test_suspend_membership(
         self, auth_client: TestAuthClient, team_member: TeamMember, dbsession_sync: Session
     ) -> None: